@@ -0,0 +1,50 @@
+import argparse
+import time
+
+import numpy as np
+
+from douzero.env.cards import CODE2CARD, DECK, JOKER, NUM_NORMAL_CARDS
+from douzero.env.score_detector import get_negative_score
+
+def get_parser():
+    parser = argparse.ArgumentParser(description='DouZero: get_negative_score latency benchmark '
+                                     '(run from the repo root: python -m benchmarks.benchmark_negative_score)')
+    parser.add_argument('--num_hands', default=3000, type=int,
+                        help='Random 7-card hands per joker count')
+    parser.add_argument('--max_jokers', default=4, type=int)
+    parser.add_argument('--repeat', default=5, type=int,
+                        help='Time each hand this many times and keep the fastest run')
+    parser.add_argument('--seed', default=0, type=int)
+    return parser
+
+def random_hands(rng, num_hands, num_jokers):
+    normal_cards = DECK[DECK < NUM_NORMAL_CARDS]
+    for _ in range(num_hands):
+        codes = rng.choice(normal_cards, 7 - num_jokers, replace=False).tolist()
+        codes += [JOKER] * num_jokers
+        yield [CODE2CARD[code] for code in codes]
+
+def benchmark(hands, repeat):
+    """Latency of each hand in microseconds, the fastest of `repeat`
+    runs so that scheduler and GC pauses do not show up as slow hands"""
+    latencies = []
+    for hand in hands:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            get_negative_score(hand)
+            best = min(best, time.perf_counter() - start)
+        latencies.append(best * 1e6)
+    return np.array(latencies)
+
+
+if __name__ == '__main__':
+    flags = get_parser().parse_args()
+    rng = np.random.default_rng(flags.seed)
+
+    print("{} random hands per joker count, latency in us".format(flags.num_hands))
+    print("jokers      mean       p50       p99     p99.9       max")
+    for num_jokers in range(flags.max_jokers + 1):
+        latencies = benchmark(random_hands(rng, flags.num_hands, num_jokers), flags.repeat)
+        print("{:6d} {:9.1f} {:9.1f} {:9.1f} {:9.1f} {:9.1f}".format(
+            num_jokers, latencies.mean(), *np.percentile(latencies, [50, 99, 99.9, 100])))
@@ -27,6 +27,14 @@ parser.add_argument('--disable_checkpoint', action='store_true',
                     help='Disable saving checkpoint')
 parser.add_argument('--savedir', default='douzero_checkpoints',
                     help='Root dir where experiment data will be saved')
+parser.add_argument('--seed', default=None, type=int,
+                    help='Base seed of the actor tables, each actor derives its own stream from it (default: fresh entropy)')
+parser.add_argument('--detector_cache_size', default=0, type=int,
+                    help='Per-actor LRU cache size of the ting/hu/negative score detectors; self-play goes through ting (0 disables it)')
+parser.add_argument('--detector_cache_log_interval', default=1000, type=int,
+                    help='Number of episodes between two detector cache stats logs')
+parser.add_argument('--shared_context', action='store_true',
+                    help='Send the context features once per step instead of once per legal action')
 
 # Hyperparameters
 parser.add_argument('--total_frames', default=100000000000, type=int,
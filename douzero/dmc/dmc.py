@@ -3,7 +3,7 @@ import threading
 import time
 import timeit
 import pprint
-from collections import deque
+from collections import defaultdict, deque
 import numpy as np
 
 import torch
@@ -12,9 +12,10 @@ from torch import nn
 
 from .file_writer import FileWriter
 from .models import Model
-from .utils import get_batch, log, create_env, create_buffers, create_optimizers, act
+from .utils import get_batch, log, create_env, create_buffers, create_optimizers, act, \
+    DOUDIZHU_POSITIONS
 
-mean_episode_return_buf = {p:deque(maxlen=100) for p in ['landlord', 'landlord_up', 'landlord_down']}
+mean_episode_return_buf = defaultdict(lambda: deque(maxlen=100))
 
 def compute_loss(logits, targets):
     loss = ((logits.squeeze(-1) - targets)**2).mean()
@@ -58,12 +59,14 @@ def learn(position,
             actor_model.get_model(position).load_state_dict(model.state_dict())
         return stats
 
-def train(flags):  
+def train(flags, positions=DOUDIZHU_POSITIONS):
     """
     This is the main funtion for training. It will first
     initilize everything, such as buffers, optimizers, etc.
     Then it will start subprocesses as actors. Then, it will call
-    learning function with  multiple threads.
+    learning function with  multiple threads. Each of `positions`
+    gets its own model, buffers, queues and stats (see act for
+    the sign of the episode returns).
     """
     if not flags.actor_device_cpu or flags.training_device != 'cpu':
         if not torch.cuda.is_available():
@@ -88,13 +91,13 @@ def train(flags):
     # Initialize actor models
     models = {}
     for device in device_iterator:
-        model = Model(device=device)
+        model = Model(device=device, positions=positions)
         model.share_memory()
         model.eval()
         models[device] = model
 
     # Initialize buffers
-    buffers = create_buffers(flags, device_iterator)
+    buffers = create_buffers(flags, device_iterator, positions)
    
     # Initialize queues
     actor_processes = []
@@ -103,35 +106,28 @@ def train(flags):
     full_queue = {}
         
     for device in device_iterator:
-        _free_queue = {'landlord': ctx.SimpleQueue(), 'landlord_up': ctx.SimpleQueue(), 'landlord_down': ctx.SimpleQueue()}
-        _full_queue = {'landlord': ctx.SimpleQueue(), 'landlord_up': ctx.SimpleQueue(), 'landlord_down': ctx.SimpleQueue()}
-        free_queue[device] = _free_queue
-        full_queue[device] = _full_queue
+        free_queue[device] = {p: ctx.SimpleQueue() for p in positions}
+        full_queue[device] = {p: ctx.SimpleQueue() for p in positions}
 
     # Learner model for training
-    learner_model = Model(device=flags.training_device)
+    learner_model = Model(device=flags.training_device, positions=positions)
 
     # Create optimizers
-    optimizers = create_optimizers(flags, learner_model)
+    optimizers = create_optimizers(flags, learner_model, positions)
 
     # Stat Keys
-    stat_keys = [
-        'mean_episode_return_landlord',
-        'loss_landlord',
-        'mean_episode_return_landlord_up',
-        'loss_landlord_up',
-        'mean_episode_return_landlord_down',
-        'loss_landlord_down',
-    ]
+    stat_keys = []
+    for position in positions:
+        stat_keys += ['mean_episode_return_' + position, 'loss_' + position]
     frames, stats = 0, {k: 0 for k in stat_keys}
-    position_frames = {'landlord':0, 'landlord_up':0, 'landlord_down':0}
+    position_frames = {p: 0 for p in positions}
 
     # Load models if any
     if flags.load_model and os.path.exists(checkpointpath):
         checkpoint_states = torch.load(
             checkpointpath, map_location=("cuda:"+str(flags.training_device) if flags.training_device != "cpu" else "cpu")
         )
-        for k in ['landlord', 'landlord_up', 'landlord_down']:
+        for k in positions:
             learner_model.get_model(k).load_state_dict(checkpoint_states["model_state_dict"][k])
             optimizers[k].load_state_dict(checkpoint_states["optimizer_state_dict"][k])
             for device in device_iterator:
@@ -147,7 +143,8 @@ def train(flags):
         for i in range(flags.num_actors):
             actor = ctx.Process(
                 target=act,
-                args=(i, device, free_queue[device], full_queue[device], models[device], buffers[device], flags))
+                args=(i, device, free_queue[device], full_queue[device], models[device], buffers[device], flags,
+                      positions))
             actor.start()
             actor_processes.append(actor)
 
@@ -170,19 +167,18 @@ def train(flags):
 
     for device in device_iterator:
         for m in range(flags.num_buffers):
-            free_queue[device]['landlord'].put(m)
-            free_queue[device]['landlord_up'].put(m)
-            free_queue[device]['landlord_down'].put(m)
+            for position in positions:
+                free_queue[device][position].put(m)
 
     threads = []
     locks = {}
     for device in device_iterator:
-        locks[device] = {'landlord': threading.Lock(), 'landlord_up': threading.Lock(), 'landlord_down': threading.Lock()}
-    position_locks = {'landlord': threading.Lock(), 'landlord_up': threading.Lock(), 'landlord_down': threading.Lock()}
+        locks[device] = {p: threading.Lock() for p in positions}
+    position_locks = {p: threading.Lock() for p in positions}
 
     for device in device_iterator:
         for i in range(flags.num_threads):
-            for position in ['landlord', 'landlord_up', 'landlord_down']:
+            for position in positions:
                 thread = threading.Thread(
                     target=batch_and_learn, name='batch-and-learn-%d' % i, args=(i,device,position,locks[device][position],position_locks[position]))
                 thread.start()
@@ -203,7 +199,7 @@ def train(flags):
         }, checkpointpath)
 
         # Save the weights for evaluation purpose
-        for position in ['landlord', 'landlord_up', 'landlord_down']:
+        for position in positions:
             model_weights_dir = os.path.expandvars(os.path.expanduser(
                 '%s/%s/%s' % (flags.savedir, flags.xpid, position+'_weights_'+str(frames)+'.ckpt')))
             torch.save(learner_model.get_model(position).state_dict(), model_weights_dir)
@@ -230,16 +226,12 @@ def train(flags):
             fps_avg = np.mean(fps_log)
 
             position_fps = {k:(position_frames[k]-position_start_frames[k])/(end_time-start_time) for k in position_frames}
-            log.info('After %i (L:%i U:%i D:%i) frames: @ %.1f fps (avg@ %.1f fps) (L:%.1f U:%.1f D:%.1f) Stats:\n%s',
+            log.info('After %i (%s) frames: @ %.1f fps (avg@ %.1f fps) (%s) Stats:\n%s',
                      frames,
-                     position_frames['landlord'],
-                     position_frames['landlord_up'],
-                     position_frames['landlord_down'],
+                     ' '.join('%s:%i' % (p, position_frames[p]) for p in positions),
                      fps,
                      fps_avg,
-                     position_fps['landlord'],
-                     position_fps['landlord_up'],
-                     position_fps['landlord_down'],
+                     ' '.join('%s:%.1f' % (p, position_fps[p]) for p in positions),
                      pprint.pformat(stats))
 
     except KeyboardInterrupt:
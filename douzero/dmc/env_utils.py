@@ -15,14 +15,26 @@ def _format_observation(obs, device):
     if not device == "cpu":
         device = 'cuda:' + str(device)
     device = torch.device(device)
-    x_batch = torch.from_numpy(obs['x_batch']).to(device)
-    z_batch = torch.from_numpy(obs['z_batch']).to(device)
     x_no_action = torch.from_numpy(obs['x_no_action'])
-    z = torch.from_numpy(obs['z'])
-    obs = {'x_batch': x_batch,
-           'z_batch': z_batch,
-           'legal_actions': obs['legal_actions'],
-           }
+    # `z` is a view of the env's history buffer, and the
+    # actor keeps it until the end of the episode
+    z = torch.from_numpy(obs['z'].copy())
+    if 'action_batch' in obs:
+        # Shared-context observation: only the context and the
+        # actions are moved, the model broadcasts the context
+        action_batch = torch.from_numpy(obs['action_batch']).to(device)
+        obs = {'x_no_action': x_no_action.to(device).float(),
+               'z': z.to(device).float(),
+               'action_batch': action_batch,
+               'legal_actions': obs['legal_actions'],
+               }
+    else:
+        x_batch = torch.from_numpy(obs['x_batch']).to(device)
+        z_batch = torch.from_numpy(obs['z_batch']).to(device)
+        obs = {'x_batch': x_batch,
+               'z_batch': z_batch,
+               'legal_actions': obs['legal_actions'],
+               }
     return position, obs, x_no_action, z
 
 class Environment:
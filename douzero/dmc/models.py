@@ -7,12 +7,22 @@ import numpy as np
 
 import torch
 from torch import nn
+from torch.nn import functional as F
 
-class LandlordLstmModel(nn.Module):
-    def __init__(self):
+from douzero.env.features import get_feature_set
+
+class LstmModel(nn.Module):
+    """
+    The model of one position: an LSTM encodes the historical
+    moves `z`, and an MLP scores each legal action from the
+    LSTM output and the features `x` (context and action).
+    The input widths come from the feature set of the
+    position (see douzero/env/features.py).
+    """
+    def __init__(self, feature_set):
         super().__init__()
-        self.lstm = nn.LSTM(162, 128, batch_first=True)
-        self.dense1 = nn.Linear(373 + 128, 512)
+        self.lstm = nn.LSTM(feature_set.z_shape[-1], 128, batch_first=True)
+        self.dense1 = nn.Linear(feature_set.model_input_dim + 128, 512)
         self.dense2 = nn.Linear(512, 512)
         self.dense3 = nn.Linear(512, 512)
         self.dense4 = nn.Linear(512, 512)
@@ -24,6 +34,24 @@ class LandlordLstmModel(nn.Module):
         lstm_out = lstm_out[:,-1,:]
         x = torch.cat([lstm_out,x], dim=-1)
         x = self.dense1(x)
+        return self._score(x, return_value, flags)
+
+    def forward_shared(self, z, x_no_action, actions, return_value=False, flags=None):
+        """
+        Same as `forward` for a shared-context observation:
+        `z` and `x_no_action` are given once and `actions`
+        is (N, action_dim). The LSTM runs once, and the
+        context part of the first layer is computed once and
+        broadcast over the actions.
+        """
+        lstm_out, (h_n, _) = self.lstm(z.unsqueeze(0))
+        context = torch.cat([lstm_out[:,-1,:], x_no_action.unsqueeze(0)], dim=-1)
+        split = context.shape[-1]
+        x = F.linear(context, self.dense1.weight[:, :split], self.dense1.bias) + \
+            F.linear(actions, self.dense1.weight[:, split:])
+        return self._score(x, return_value, flags)
+
+    def _score(self, x, return_value, flags):
         x = torch.relu(x)
         x = self.dense2(x)
         x = torch.relu(x)
@@ -43,40 +71,13 @@ class LandlordLstmModel(nn.Module):
                 action = torch.argmax(x,dim=0)[0]
             return dict(action=action)
 
-class FarmerLstmModel(nn.Module):
+class LandlordLstmModel(LstmModel):
     def __init__(self):
-        super().__init__()
-        self.lstm = nn.LSTM(162, 128, batch_first=True)
-        self.dense1 = nn.Linear(484 + 128, 512)
-        self.dense2 = nn.Linear(512, 512)
-        self.dense3 = nn.Linear(512, 512)
-        self.dense4 = nn.Linear(512, 512)
-        self.dense5 = nn.Linear(512, 512)
-        self.dense6 = nn.Linear(512, 1)
+        super().__init__(get_feature_set('landlord'))
 
-    def forward(self, z, x, return_value=False, flags=None):
-        lstm_out, (h_n, _) = self.lstm(z)
-        lstm_out = lstm_out[:,-1,:]
-        x = torch.cat([lstm_out,x], dim=-1)
-        x = self.dense1(x)
-        x = torch.relu(x)
-        x = self.dense2(x)
-        x = torch.relu(x)
-        x = self.dense3(x)
-        x = torch.relu(x)
-        x = self.dense4(x)
-        x = torch.relu(x)
-        x = self.dense5(x)
-        x = torch.relu(x)
-        x = self.dense6(x)
-        if return_value:
-            return dict(values=x)
-        else:
-            if flags is not None and flags.exp_epsilon > 0 and np.random.rand() < flags.exp_epsilon:
-                action = torch.randint(x.shape[0], (1,))[0]
-            else:
-                action = torch.argmax(x,dim=0)[0]
-            return dict(action=action)
+class FarmerLstmModel(LstmModel):
+    def __init__(self):
+        super().__init__(get_feature_set('landlord_up'))
 
 # Model dict is only used in evaluation but not training
 model_dict = {}
@@ -86,30 +87,33 @@ model_dict['landlord_down'] = FarmerLstmModel
 
 class Model:
     """
-    The wrapper for the three models. We also wrap several
+    The wrapper for the models of the positions, one per
+    position with a registered feature set (the three
+    DouDizhu positions by default). We also wrap several
     interfaces such as share_memory, eval, etc.
     """
-    def __init__(self, device=0):
+    def __init__(self, device=0, positions=('landlord', 'landlord_up', 'landlord_down')):
         self.models = {}
         if not device == "cpu":
             device = 'cuda:' + str(device)
-        self.models['landlord'] = LandlordLstmModel().to(torch.device(device))
-        self.models['landlord_up'] = FarmerLstmModel().to(torch.device(device))
-        self.models['landlord_down'] = FarmerLstmModel().to(torch.device(device))
+        for position in positions:
+            self.models[position] = LstmModel(get_feature_set(position)).to(torch.device(device))
 
     def forward(self, position, z, x, training=False, flags=None):
         model = self.models[position]
         return model.forward(z, x, training, flags)
 
+    def forward_shared(self, position, z, x_no_action, actions, training=False, flags=None):
+        model = self.models[position]
+        return model.forward_shared(z, x_no_action, actions, training, flags)
+
     def share_memory(self):
-        self.models['landlord'].share_memory()
-        self.models['landlord_up'].share_memory()
-        self.models['landlord_down'].share_memory()
+        for model in self.models.values():
+            model.share_memory()
 
     def eval(self):
-        self.models['landlord'].eval()
-        self.models['landlord_up'].eval()
-        self.models['landlord_down'].eval()
+        for model in self.models.values():
+            model.eval()
 
     def parameters(self, position):
         return self.models[position].parameters()
@@ -11,16 +11,8 @@ from torch import multiprocessing as mp
 
 from .env_utils import Environment
 from douzero.env import Env
-from douzero.env.env import _cards2array
-
-Card2Column = {3: 0, 4: 1, 5: 2, 6: 3, 7: 4, 8: 5, 9: 6, 10: 7,
-               11: 8, 12: 9, 13: 10, 14: 11, 17: 12}
-
-NumOnes2Array = {0: np.array([0, 0, 0, 0]),
-                 1: np.array([1, 0, 0, 0]),
-                 2: np.array([1, 1, 0, 0]),
-                 3: np.array([1, 1, 1, 0]),
-                 4: np.array([1, 1, 1, 1])}
+from douzero.env.features import get_feature_set
+from douzero.env.detector_cache import enable_detector_cache, get_detector_cache_stats
 
 shandle = logging.StreamHandler()
 shandle.setFormatter(
@@ -36,8 +28,21 @@ log.setLevel(logging.INFO)
 # and learner processes. They are shared tensors in GPU
 Buffers = typing.Dict[str, typing.List[torch.Tensor]]
 
-def create_env(flags):
-    return Env(flags.objective)
+# The positions trained by default. The episode return of the
+# env is the one of the first position (the landlord), and the
+# other positions play against it
+DOUDIZHU_POSITIONS = ('landlord', 'landlord_up', 'landlord_down')
+
+def create_env(flags, actor_key=()):
+    """
+    Create a table for an actor. With --seed set, every
+    actor gets its own reproducible stream derived from
+    the seed and `actor_key`; otherwise fresh entropy.
+    """
+    seed = None
+    if flags.seed is not None:
+        seed = np.random.SeedSequence(flags.seed, spawn_key=actor_key)
+    return Env(flags.objective, seed=seed, shared_context=flags.shared_context)
 
 def get_batch(free_queue,
               full_queue,
@@ -59,11 +64,10 @@ def get_batch(free_queue,
         free_queue.put(m)
     return batch
 
-def create_optimizers(flags, learner_model):
+def create_optimizers(flags, learner_model, positions=DOUDIZHU_POSITIONS):
     """
-    Create three optimizers for the three positions
+    Create one optimizer per position
     """
-    positions = ['landlord', 'landlord_up', 'landlord_down']
     optimizers = {}
     for position in positions:
         optimizer = torch.optim.RMSprop(
@@ -75,27 +79,26 @@ def create_optimizers(flags, learner_model):
         optimizers[position] = optimizer
     return optimizers
 
-def create_buffers(flags, device_iterator):
+def create_buffers(flags, device_iterator, positions=DOUDIZHU_POSITIONS):
     """
     We create buffers for different positions as well as
     for different devices (i.e., GPU). That is, each device
-    will have three buffers for the three positions.
+    will have one buffer per position, shaped by the feature
+    set of the position.
     """
     T = flags.unroll_length
-    positions = ['landlord', 'landlord_up', 'landlord_down']
     buffers = {}
     for device in device_iterator:
         buffers[device] = {}
         for position in positions:
-            x_dim = 319 if position == 'landlord' else 430
             specs = dict(
                 done=dict(size=(T,), dtype=torch.bool),
                 episode_return=dict(size=(T,), dtype=torch.float32),
                 target=dict(size=(T,), dtype=torch.float32),
-                obs_x_no_action=dict(size=(T, x_dim), dtype=torch.int8),
-                obs_action=dict(size=(T, 54), dtype=torch.int8),
-                obs_z=dict(size=(T, 5, 162), dtype=torch.int8),
             )
+            # The feature, action and history shapes come from the feature set
+            for key, spec in get_feature_set(position).buffer_specs(T).items():
+                specs[key] = dict(size=spec['size'], dtype=_torch_dtype(spec['dtype']))
             _buffers: Buffers = {key: [] for key in specs}
             for _ in range(flags.num_buffers):
                 for key in _buffers:
@@ -107,18 +110,29 @@ def create_buffers(flags, device_iterator):
             buffers[device][position] = _buffers
     return buffers
 
-def act(i, device, free_queue, full_queue, model, buffers, flags):
+def _torch_dtype(dtype):
+    """The torch dtype of a numpy dtype"""
+    return torch.from_numpy(np.empty(0, dtype=dtype)).dtype
+
+def act(i, device, free_queue, full_queue, model, buffers, flags,
+        positions=DOUDIZHU_POSITIONS):
     """
     This function will run forever until we stop it. It will generate
     data from the environment and send the data to buffer. It uses
     a free queue and full queue to syncup with the main process.
+    `positions` are the positions with a queue and a buffer; the
+    episode return is the one of the first position, negated for
+    the others.
     """
-    positions = ['landlord', 'landlord_up', 'landlord_down']
     try:
         T = flags.unroll_length
         log.info('Device %s Actor %i started.', str(device), i)
 
-        env = create_env(flags)
+        if flags.detector_cache_size > 0:
+            enable_detector_cache(flags.detector_cache_size)
+        num_episodes = 0
+
+        env = create_env(flags, (0 if device == 'cpu' else int(device), i))
         env = Environment(env, device)
 
         done_buf = {p: [] for p in positions}
@@ -136,10 +150,14 @@ def act(i, device, free_queue, full_queue, model, buffers, flags):
                 obs_x_no_action_buf[position].append(env_output['obs_x_no_action'])
                 obs_z_buf[position].append(env_output['obs_z'])
                 with torch.no_grad():
-                    agent_output = model.forward(position, obs['z_batch'], obs['x_batch'], flags=flags)
+                    if flags.shared_context:
+                        agent_output = model.forward_shared(
+                            position, obs['z'], obs['x_no_action'], obs['action_batch'], flags=flags)
+                    else:
+                        agent_output = model.forward(position, obs['z_batch'], obs['x_batch'], flags=flags)
                 _action_idx = int(agent_output['action'].cpu().detach().numpy())
                 action = obs['legal_actions'][_action_idx]
-                obs_action_buf[position].append(_cards2tensor(action))
+                obs_action_buf[position].append(_cards2tensor(position, action))
                 size[position] += 1
                 position, obs, env_output = env.step(action)
                 if env_output['done']:
@@ -149,10 +167,15 @@ def act(i, device, free_queue, full_queue, model, buffers, flags):
                             done_buf[p].extend([False for _ in range(diff-1)])
                             done_buf[p].append(True)
 
-                            episode_return = env_output['episode_return'] if p == 'landlord' else -env_output['episode_return']
+                            episode_return = env_output['episode_return'] if p == positions[0] else -env_output['episode_return']
                             episode_return_buf[p].extend([0.0 for _ in range(diff-1)])
                             episode_return_buf[p].append(episode_return)
                             target_buf[p].extend([episode_return for _ in range(diff)])
+                    num_episodes += 1
+                    if flags.detector_cache_size > 0 and \
+                            num_episodes % flags.detector_cache_log_interval == 0:
+                        log.info('Device %s Actor %i detector cache stats after %i episodes: %s',
+                                 str(device), i, num_episodes, get_detector_cache_stats())
                     break
 
             for p in positions:
@@ -184,12 +207,13 @@ def act(i, device, free_queue, full_queue, model, buffers, flags):
         print()
         raise e
 
-def _cards2tensor(list_cards):
+def _cards2tensor(position, list_cards):
     """
     Convert a list of integers to the tensor
-    representation
+    representation, encoded by the feature set of
+    the position
     See Figure 2 in https://arxiv.org/pdf/2106.06135.pdf
     """
-    matrix = _cards2array(list_cards)
+    matrix = get_feature_set(position).encode_actions([list_cards])[0]
     matrix = torch.from_numpy(matrix)
     return matrix
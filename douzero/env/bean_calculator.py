@@ -1,58 +1,87 @@
-from douzero.env.score_detector import get_negative_score
-from douzero.env.hu_pattern_detector import get_hu_multiplier
+import numpy as np
+
+from douzero.env.cards import JOKER
+from douzero.env.hu_pattern_detector import get_ting_multipliers
+
+POSITIONS = ['first', 'first_up', 'first_across', 'first_down']
+BASE_SCORE = 450  # 底分
+MAX_WIN_BEANS = 6000000  # 系统赢豆上限(600万)
+
 
 def calculate_beans(game_env, position, card, is_self_draw, is_first_round):
-    """计算胡牌时的豆子变化"""
+    """计算胡牌时的豆子变化，card 是牌的编码"""
+    result = calculate_beans_batch(game_env, position, [card],
+                                   is_self_draw, is_first_round)
+    return {pos: int(beans[0]) for pos, beans in result.items()}
+
+
+def calculate_beans_batch(game_env, position, cards, is_self_draw, is_first_round):
+    """一次计算胡多张候选牌时的豆子变化
+    与候选牌无关的系数(硬胡、金牌、自摸、海底、地胡和赢豆上限)只算一次，
+    所有候选牌的番型倍数一起批量判断
+    Args:
+        game_env: 游戏环境
+        position: 胡牌玩家的位置
+        cards: 候选牌的编码列表(见 cards.py)
+        is_self_draw: 是否自摸
+        is_first_round: 是否地胡
+    Returns:
+        dict: 玩家位置 -> (N,) int64数组，胡第i张候选牌时该玩家的豆子变化
+    """
     # 1. 获取基础信息
-    hand_cards = game_env.info_sets[position].player_hand_cards
+    hand = game_env.info_sets[position].hand
     gold_cards = game_env.gold_cards
-    base_score = 450  # 底分
-    
+
     # 2. 计算各种系数
     # 2.1 硬胡系数：检查手牌中是否有癞子
-    has_joker = any(card[0] == 0 and card[1] == -1 for card in hand_cards)
+    has_joker = JOKER in hand
     hard_hu_factor = 1 if has_joker else 2
-    
+
     # 2.2 金牌系数：计算手牌中金牌的数量
-    gold_count = sum(1 for card in hand_cards if card[0] in gold_cards)
+    gold_count = sum(hand.count_point(point) for point in set(gold_cards))
     gold_factor = max(1, gold_count)
-    
+
     # 2.3 自摸系数
     self_draw_factor = 3 if is_self_draw else 1
-    
+
     # 2.4 海底系数：检查牌堆是否只剩1张
     is_last_card = len(game_env.remaining_cards) == 1
     last_card_factor = 4 if is_last_card and is_self_draw else 1
-    
+
     # 2.5 地胡系数
     first_round_factor = 16 if is_first_round else 1
-    
+
+    shared_factor = (BASE_SCORE * gold_factor * self_draw_factor *
+                     last_card_factor * first_round_factor)
+
     # 3. 计算分数
-    # 3.1 计算胡牌玩家的正分
-    hu_cards = hand_cards + [card]
-    hu_multiplier, _ = get_hu_multiplier(hu_cards)
-    
-    # 3.2 计算其他玩家的负分
-    other_positions = [pos for pos in ['down', 'right', 'up', 'left'] 
-                      if pos != position]
-    result = {}
-    
-    # 计算基础赢豆上限(系统600万和玩家豆子数的较小值)
-    base_limit = min(game_env.beans[position], 6000000)
-    
-    # 计算基础豆子(不含硬胡)
-    base_beans = min(base_limit, 
-                    base_score * hu_multiplier * gold_factor * 
-                    self_draw_factor * last_card_factor * first_round_factor)
-    
-    # 加上硬胡倍数
+    # 3.1 批量计算每张候选牌的番型倍数
+    hu_multipliers = _get_hu_multipliers(hand, cards)
+
+    # 3.2 计算基础赢豆上限(系统600万和玩家豆子数的较小值)
+    base_limit = min(game_env.beans[position], MAX_WIN_BEANS)
+
+    # 计算基础豆子(不含硬胡)，再加上硬胡倍数
+    base_beans = np.minimum(base_limit, shared_factor * hu_multipliers)
     total_beans = base_beans * hard_hu_factor
-    
-    # 计算每个玩家应输的豆子
-    for pos in other_positions:
-        # 输家豆子不足则全输
-        actual_lose = min(game_env.beans[pos], total_beans)
+
+    # 3.3 计算每个玩家应输的豆子，输家豆子不足则全输
+    result = {}
+    total_win = np.zeros(len(cards), dtype=np.int64)
+    for pos in POSITIONS:
+        if pos == position:
+            continue
+        actual_lose = np.minimum(game_env.beans[pos], total_beans)
         result[pos] = -actual_lose
-        result[position] = result.get(position, 0) + actual_lose
-    
-    return result
\ No newline at end of file
+        total_win += actual_lose
+    result[position] = total_win
+
+    return result
+
+
+def _get_hu_multipliers(hand, cards):
+    """手牌分别加上每张候选牌后的番型倍数，手牌不是7张时都不能胡
+    直接查手牌的听牌(见 get_ting_multipliers)，和听牌索引共用检测器缓存
+    """
+    ting_cards = get_ting_multipliers(tuple(hand.codes().tolist()))
+    return np.array([ting_cards.get(card, 0) for card in cards], dtype=np.int64)
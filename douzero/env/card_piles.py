@@ -0,0 +1,179 @@
+"""
+牌堆和公共牌区。
+
+1. DrawPile: 牌堆，用数组加牌堆顶指针表示，摸牌只移动指针，
+   从顶部4张中选一张也只挪动它上面的几张牌，都是O(1)；
+   快照直接共用底层数组，之后第一次选牌时才复制(写时复制)
+2. PublicCards: 4个位置的公共牌区，用环形缓冲区表示，
+   整体右移只需要移动起点，被挤出最右边的牌直接返回给调用方放进废牌区
+
+两者都提供Zobrist哈希(见 zobrist.py)：牌堆在摸牌、选牌时增量更新，
+公共牌区只有4个位置，需要时直接计算。
+"""
+from douzero.env import zobrist
+
+
+class DrawPile(object):
+    """牌堆，下标0是牌堆顶"""
+
+    def __init__(self, cards=()):
+        self._cards = list(cards)
+        self._head = 0
+        # 底层数组是否被快照共用，共用时要先复制才能修改
+        self._shared = False
+        # 剩余牌的Zobrist哈希，每张牌按离牌堆底的距离取键
+        self.zobrist = zobrist.pile_hash(self._cards)
+
+    def __len__(self):
+        return len(self._cards) - self._head
+
+    def __iter__(self):
+        # 直接按下标读底层数组，不复制剩余的牌
+        cards = self._cards
+        for i in range(self._head, len(cards)):
+            yield cards[i]
+
+    def __getitem__(self, index):
+        """按离牌堆顶的位置取牌，也支持切片(返回列表)
+        切片只复制取到的牌，remaining_cards[:4] 是O(1)
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self._cards[self._head + start:self._head + max(start, stop)]
+            return [self._cards[self._head + i] for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('draw pile index out of range')
+        return self._cards[self._head + index]
+
+    def __repr__(self):
+        return 'DrawPile({})'.format(self.to_list())
+
+    def pop(self):
+        """摸走牌堆顶的牌"""
+        if self._head >= len(self._cards):
+            raise IndexError('pop from empty draw pile')
+        card = self._cards[self._head]
+        self.zobrist ^= zobrist.PILE_KEYS[len(self) - 1][card]
+        self._head += 1
+        return card
+
+    def take(self, index):
+        """拿走离牌堆顶第index张牌，其他牌保持原顺序
+        只需要把它上面的index张牌各往下挪一位，问号选牌时index不超过3
+        """
+        card = self[index]
+        if self._shared:
+            self._cards = self._cards[self._head:]
+            self._head = 0
+            self._shared = False
+        cards = self._cards
+        # 拿走的牌上面的牌各往下挪一位，离牌堆底的距离都减1
+        depth = len(self) - 1 - index
+        self.zobrist ^= zobrist.PILE_KEYS[depth][card]
+        for i in range(self._head + index, self._head, -1):
+            moved = cards[i - 1]
+            self.zobrist ^= zobrist.PILE_KEYS[depth][moved] ^ zobrist.PILE_KEYS[depth + 1][moved]
+            depth += 1
+            cards[i] = moved
+        self._head += 1
+        return card
+
+    def to_list(self):
+        return self._cards[self._head:]
+
+    def get_state(self):
+        """导出状态，用于牌局快照，和牌堆共用底层数组"""
+        self._shared = True
+        return self._cards, self._head, self.zobrist
+
+    def set_state(self, state):
+        """从 get_state 导出的状态恢复"""
+        self._cards, self._head, self.zobrist = state
+        self._shared = True
+
+
+class PublicCards(object):
+    """公共牌区的4个位置，下标0是最左边，空位是None"""
+    SIZE = 4
+
+    def __init__(self, cards=None):
+        self._slots = [None] * self.SIZE
+        self._start = 0
+        if cards is not None:
+            for i, card in enumerate(cards):
+                self[i] = card
+
+    def __len__(self):
+        return self.SIZE
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.to_list()[index]
+        return self._slots[(self._start + self._check(index)) % self.SIZE]
+
+    def __setitem__(self, index, card):
+        self._slots[(self._start + self._check(index)) % self.SIZE] = card
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __eq__(self, other):
+        if isinstance(other, PublicCards):
+            return self.to_list() == other.to_list()
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'PublicCards({})'.format(self.to_list())
+
+    def _check(self, index):
+        if index < 0:
+            index += self.SIZE
+        if not 0 <= index < self.SIZE:
+            raise IndexError('public card index out of range')
+        return index
+
+    def shift_right(self):
+        """所有牌右移一位，最左边空出来
+        Returns:
+            被挤出最右边的牌，没有时返回None
+        """
+        self._start = (self._start - 1) % self.SIZE
+        rightmost_card = self._slots[self._start]
+        self._slots[self._start] = None
+        return rightmost_card
+
+    def take(self, index):
+        """拿走index处的牌，它左边的牌右移一位，右边的牌不动"""
+        card = self[index]
+        for i in range(index, 0, -1):
+            self[i] = self[i - 1]
+        self[0] = None
+        return card
+
+    def to_list(self):
+        start = self._start
+        return self._slots[start:] + self._slots[:start]
+
+    @property
+    def zobrist(self):
+        """4个位置上的牌的Zobrist哈希"""
+        return zobrist.public_hash(self.get_state())
+
+    def get_state(self):
+        """导出不可变的状态，用于牌局快照"""
+        slots = self._slots
+        start = self._start
+        return (slots[start], slots[(start + 1) % 4],
+                slots[(start + 2) % 4], slots[(start + 3) % 4])
+
+    def set_state(self, state):
+        """从 get_state 导出的状态恢复"""
+        self._slots = list(state)
+        self._start = 0
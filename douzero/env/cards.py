@@ -0,0 +1,164 @@
+"""
+牌的整数编码。
+
+普通牌(点数,花色)编码为 (点数-6)*4+花色，范围0-35，
+编码顺序与(点数,花色)元组的大小顺序一致；
+癞子(0,-1)编码为36，问号(1,-1)编码为37。
+
+引擎内部(发牌、牌堆、公共牌区、手牌、检测器)只使用整数编码，
+点数、花色、颜色、负分都用下面以编码为下标的查找表得到；
+(点数,花色)元组只在和外部交互的地方(智能体看到的信息集、
+get_hu_multiplier/get_negative_score 的参数等)转换。
+"""
+import numpy as np
+
+NUM_NORMAL_CARDS = 36
+JOKER = 36
+QUESTION_MARK = 37
+NUM_CARD_CODES = 38
+
+JOKER_CARD = (0, -1)
+QUESTION_MARK_CARD = (1, -1)
+
+# 编码 -> 牌
+CODE2CARD = tuple([(point, suit) for point in range(6, 15) for suit in range(4)]
+                  + [JOKER_CARD, QUESTION_MARK_CARD])
+# 牌 -> 编码
+CARD2CODE = {card: code for code, card in enumerate(CODE2CARD)}
+
+# 普通牌的点数下标(0-8对应6-A)和花色，特殊牌为-1
+CODE_POINT_INDEX = np.array([code // 4 for code in range(NUM_NORMAL_CARDS)]
+                            + [-1, -1], dtype=np.int8)
+CODE_SUIT = np.array([code % 4 for code in range(NUM_NORMAL_CARDS)]
+                     + [-1, -1], dtype=np.int8)
+# 点数，和(点数,花色)元组的第一项相同：普通牌6-14，癞子0，问号1
+CODE_POINT = np.array([card[0] for card in CODE2CARD], dtype=np.int8)
+# 颜色：0=黑(♠♣)，1=红(♥♦)，特殊牌为-1
+CODE_COLOR = np.where(CODE_SUIT >= 0, CODE_SUIT % 2, -1).astype(np.int8)
+# 负分：6-10=10分，J-K=20分，A=30分，癞子和问号0分
+CODE_SCORE = np.array([10 if point <= 10 else 20 if point <= 13 else 30
+                       for point in CODE_POINT[:NUM_NORMAL_CARDS]] + [0, 0],
+                      dtype=np.int8)
+# 点数直方图的下标：普通牌0-8，癞子9，问号10
+NUM_POINT_SLOTS = 11
+CODE_POINT_SLOT = tuple(code // 4 for code in range(NUM_NORMAL_CARDS)) + (9, 10)
+# 点数 -> 点数直方图的下标
+POINT2SLOT = {point: point - 6 for point in range(6, 15)}
+POINT2SLOT[JOKER_CARD[0]] = 9
+POINT2SLOT[QUESTION_MARK_CARD[0]] = 10
+
+# 一副牌(84张)的编码：癞子和问号各4张，8每个花色3张，其他点数每个花色2张
+DECK = np.array([JOKER] * 4 + [QUESTION_MARK] * 4
+                + [code for code in range(NUM_NORMAL_CARDS)
+                   for _ in range(3 if CODE_POINT[code] == 8 else 2)],
+                dtype=np.int8)
+
+
+def card2code(card):
+    """把(点数,花色)元组转换成整数编码"""
+    return CARD2CODE[card]
+
+
+def code2card(code):
+    """把整数编码转换成(点数,花色)元组"""
+    return CODE2CARD[code]
+
+
+def cards2codes(cards):
+    """把一组牌转换成整数编码数组"""
+    return np.array([CARD2CODE[card] for card in cards], dtype=np.int8)
+
+
+class HandCards(object):
+    """用计数向量表示的手牌
+    counts[i]是编码为i的牌的张数(见模块说明)，同时维护点数直方图，
+    加牌、减牌、判断是否有某张牌、取直方图都是O(1)。
+    所有方法都用整数编码表示牌，需要(点数,花色)元组列表时再调用 to_list 生成。
+    """
+
+    def __init__(self, codes=()):
+        self._set_data(np.zeros(NUM_CARD_CODES + NUM_POINT_SLOTS, dtype=np.int8), 0)
+        for code in codes:
+            self.add(code)
+
+    @classmethod
+    def from_cards(cls, cards):
+        """用(点数,花色)元组列表生成手牌"""
+        return cls(CARD2CODE[card] for card in cards)
+
+    def _set_data(self, data, size):
+        # 计数向量和点数直方图放在同一个数组里，保存和恢复状态时只需要复制一次
+        self._data = data
+        self.counts = data[:NUM_CARD_CODES]
+        # 点数直方图：下标0-8对应6-A，9是癞子，10是问号
+        self.point_counts = data[NUM_CARD_CODES:]
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, code):
+        return 0 <= code < NUM_CARD_CODES and self.counts[code] > 0
+
+    def __iter__(self):
+        """按编码从小到大遍历手牌的编码"""
+        return iter(self.codes().tolist())
+
+    def __eq__(self, other):
+        if not isinstance(other, HandCards):
+            return NotImplemented
+        return np.array_equal(self.counts, other.counts)
+
+    def __repr__(self):
+        return 'HandCards({})'.format(self.to_list())
+
+    def add(self, code):
+        """加一张牌"""
+        self.counts[code] += 1
+        self.point_counts[CODE_POINT_SLOT[code]] += 1
+        self.size += 1
+
+    def remove(self, code):
+        """减一张牌，没有这张牌时和list.remove一样抛出ValueError"""
+        if code not in self:
+            raise ValueError('{} not in hand'.format(code))
+        self.counts[code] -= 1
+        self.point_counts[CODE_POINT_SLOT[code]] -= 1
+        self.size -= 1
+
+    def count(self, code):
+        """某张牌的张数"""
+        return int(self.counts[code]) if 0 <= code < NUM_CARD_CODES else 0
+
+    def count_point(self, point):
+        """某个点数的牌的张数，癞子的点数是0，问号是1"""
+        slot = POINT2SLOT.get(point)
+        return 0 if slot is None else int(self.point_counts[slot])
+
+    def histogram(self):
+        """点数直方图(只读视图)，下标0-8对应6-A，9是癞子，10是问号"""
+        view = self.point_counts.view()
+        view.flags.writeable = False
+        return view
+
+    def codes(self):
+        """按编码从小到大排列的整数编码数组，可以直接交给检测器"""
+        return np.repeat(np.arange(NUM_CARD_CODES, dtype=np.int8), self.counts)
+
+    def to_list(self):
+        """按编码从小到大排列的(点数,花色)元组列表"""
+        return [CODE2CARD[code] for code in self.codes()]
+
+    def copy(self):
+        hand = HandCards.__new__(HandCards)
+        hand._set_data(self._data.copy(), self.size)
+        return hand
+
+    def get_state(self):
+        """导出不可变的状态，用于牌局快照"""
+        return self._data.tobytes(), self.size
+
+    def set_state(self, state):
+        """从 get_state 导出的状态恢复"""
+        data, size = state
+        self._set_data(np.frombuffer(data, dtype=np.int8).copy(), size)
@@ -0,0 +1,129 @@
+"""
+检测器缓存模块。
+在 get_hu_multiplier、get_ting_multipliers 和 get_negative_score 前面
+加一层有大小上限的LRU缓存，默认关闭，调用 enable_detector_cache 之后才生效。
+
+缓存的键是规范化后的牌型：
+1. 胡牌检测：排序后的手牌，与出牌顺序无关。键里保留了花色，不能只留点数：
+   番型取决于花色情况(同花、同色、杂色)
+2. 听牌：排序后的7张手牌的编码，同样保留花色。引擎(听牌索引、豆子结算)
+   只通过它判断胡牌，自我对弈时看这一项的命中率
+3. 负分检测：负分只取决于每种花色各有哪些点数以及癞子数量，
+   与花色的具体编号无关，所以把各花色的点数序列排序后作为键。
+   引擎目前不调用负分检测，这一项只统计外部直接调用
+每个进程有自己的缓存，统计命中、未命中和淘汰次数，供训练日志输出。
+"""
+from collections import OrderedDict
+import functools
+
+
+class LRUCache(object):
+    """有大小上限的LRU缓存，带命中统计"""
+
+    def __init__(self, maxsize):
+        if maxsize <= 0:
+            raise ValueError('maxsize should be positive')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """查缓存，未命中返回None"""
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """写入缓存，超过上限时淘汰最久未使用的项"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._data),
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+# 检测器名称 -> LRUCache，None表示关闭
+_caches = {'hu': None,
+           'ting': None,
+           'negative_score': None}
+
+
+def enable_detector_cache(maxsize):
+    """打开检测器缓存，每个检测器最多缓存maxsize个牌型"""
+    for name in _caches:
+        _caches[name] = LRUCache(maxsize)
+
+
+def disable_detector_cache():
+    """关闭检测器缓存并丢弃已缓存的结果"""
+    for name in _caches:
+        _caches[name] = None
+
+
+def get_detector_cache_stats():
+    """获取各检测器缓存的统计，缓存关闭时返回空字典"""
+    return {name: cache.stats()
+            for name, cache in _caches.items() if cache is not None}
+
+
+def hu_cache_key(hand_cards):
+    """胡牌检测的缓存键：排序后的手牌，保留花色(见模块说明)"""
+    return tuple(sorted(hand_cards))
+
+
+def ting_cache_key(hand_codes):
+    """听牌的缓存键：排序后的手牌编码"""
+    return tuple(sorted(hand_codes))
+
+
+def negative_score_cache_key(input_cards):
+    """负分检测的缓存键：排序后的各花色点数序列和癞子数量"""
+    suits = ([], [], [], [])
+    joker_count = 0
+    for point, suit in input_cards:
+        if suit == -1:  # 和 get_negative_score 一样，花色为-1的都按癞子处理
+            joker_count += 1
+        elif point != 0:
+            suits[suit].append(point)
+    return tuple(sorted(tuple(sorted(points)) for points in suits)), joker_count
+
+
+def cached_detector(name, make_key):
+    """给检测器函数加上缓存，缓存关闭时直接调用原函数"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(cards):
+            cache = _caches[name]
+            if cache is None:
+                return func(cards)
+            key = make_key(cards)
+            result = cache.get(key)
+            if result is None:
+                result = func(cards)
+                cache.put(key, result)
+            return result
+        return wrapper
+    return decorator
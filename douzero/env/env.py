@@ -1,40 +1,16 @@
-from collections import Counter
 import numpy as np
 
+from douzero.env.cards import DECK, code2card
+from douzero.env.features import get_feature_set
+# The card encoding and its cache moved to features.py with
+# the DouDizhu feature sets
+from douzero.env.features import (enable_cards2array_cache, disable_cards2array_cache,
+                                  get_cards2array_cache_stats)
 from douzero.env.game import GameEnv
+from douzero.env.readonly import unwrap
 
-Card2Column = {3: 0, 4: 1, 5: 2, 6: 3, 7: 4, 8: 5, 9: 6, 10: 7,
-               11: 8, 12: 9, 13: 10, 14: 11, 17: 12}
-
-NumOnes2Array = {0: np.array([0, 0, 0, 0]),
-                 1: np.array([1, 0, 0, 0]),
-                 2: np.array([1, 1, 0, 0]),
-                 3: np.array([1, 1, 1, 0]),
-                 4: np.array([1, 1, 1, 1])}
-
-deck = []
-card_ids = 1  # 用于生成唯一编号
-
-# 添加癞子(0)和问号(1)，各4张，花色用-1表示
-for _ in range(4):
-    deck.append(((0, -1), card_ids))  # 4张癞子
-    card_ids += 1
-for _ in range(4):
-    deck.append(((1, -1), card_ids))  # 4张问号
-    card_ids += 1
-
-# 添加8，每个花色三张
-for suit in range(4):
-    for _ in range(3):
-        deck.append(((8, suit), card_ids))  # 每个花色3张8
-        card_ids += 1
-
-# 添加其他点数牌，每个花色两张
-for point in [6, 7, 9, 10, 11, 12, 13, 14]:
-    for suit in range(4):
-        for _ in range(2):
-            deck.append(((point, suit), card_ids))  # 每个花色2张
-            card_ids += 1
+# 一副牌是整数编码的数组(见 cards.py)，洗牌就是对它做一次随机排列
+deck = DECK
 
 # 判断特殊牌的函数
 def is_special_card(card):
@@ -62,7 +38,7 @@ class Env:
     """
     Doudizhu multi-agent wrapper
     """
-    def __init__(self, objective):
+    def __init__(self, objective, seed=None, shared_context=False):
         """
         Objective is wp/adp/logadp. It indicates whether considers
         bomb in reward calculation. Here, we use dummy agents.
@@ -73,9 +49,30 @@ class Env:
         to play. For each move, we tell the corresponding
         dummy player which action to play, then the player
         will perform the actual action in the game engine.
+
+        Each table owns its random generators, so actors never
+        share the global random state. A table built with the
+        same `seed` (an int or a numpy SeedSequence) and fed the
+        same actions replays the same games.
+
+        With `shared_context`, observations carry the context
+        once plus an action matrix instead of per-action
+        batches (see ObservationBuilder).
         """
         self.objective = objective
 
+        # One stream for shuffling, one for the game engine. The
+        # children are derived like seed.spawn(2) would on a fresh
+        # sequence, without advancing the caller's sequence, so
+        # the same SeedSequence can seed several identical tables
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        deck_seed, game_seed = [
+            np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (i,),
+                                   pool_size=seed.pool_size)
+            for i in range(2)]
+        self._rng = np.random.default_rng(deck_seed)
+
         # Initialize players
         # We use three dummy player for the target position
         self.players = {}
@@ -83,7 +80,10 @@ class Env:
             self.players[position] = DummyAgent(position)
 
         # Initialize the internal environment
-        self._env = GameEnv(self.players)
+        self._env = GameEnv(self.players, seed=game_seed)
+
+        # Reusable observation buffers (see ObservationBuilder)
+        self._obs_builder = ObservationBuilder(shared_context=shared_context)
 
         self.infoset = None
 
@@ -95,17 +95,15 @@ class Env:
         """
         self._env.reset()
 
-        # Randomly shuffle the deck
-        _deck = deck.copy()
-        np.random.shuffle(_deck)
+        # Randomly shuffle the deck: a permutation of the card codes
+        _deck = self._rng.permutation(deck).tolist()
         card_play_data =  {
-                            'down': _deck[0:7],
-                            'right': _deck[7:14],
-                            'up': _deck[14:21],
-                            'left': _deck[21:28],
-                            'public': [_deck[28:29], None, None, None],
-                            'remaining': _deck[29:],
-                            'discard': []
+                            'first': _deck[0:7],
+                            'first_up': _deck[7:14],
+                            'first_across': _deck[14:21],
+                            'first_down': _deck[21:28],
+                            'first_public_card': _deck[28],
+                            'remaining': _deck[29:]
                           }
         
 
@@ -115,19 +113,34 @@ class Env:
         self._env.card_play_init(card_play_data)
         self.infoset = self._game_infoset
 
-        return get_obs(self.infoset)
+        return self._obs_builder(self.infoset)
 
     def step(self, action):
         """
         Step function takes as input the action, which
         is a list of integers, and output the next obervation,
         reward, and a Boolean variable indicating whether the
-        current game is finished. It also returns an empty
-        dictionary that is reserved to pass useful information.
+        current game is finished. It also returns a dictionary
+        whose 'forced_events' lists the moves the engine played
+        on its own after this action (see GameEnv.fast_forward),
+        with the cards as (point, suit) tuples.
+
+        The `x_batch`, `z_batch` and `z` of the returned
+        observation are views of buffers owned by this
+        environment, valid until the next call to `step` or
+        `reset`. `z` is read from the rolling encoding of the
+        game's moves (see ActionHistory), which only encodes
+        the moves played since the last observation.
         """
         assert action in self.infoset.legal_actions
         self.players[self._acting_player_position].set_action(action)
         self._env.step()
+        # Resolve the forced moves (auto-hu turns, bu-hu phase)
+        # in one go so that we only return at real decisions
+        forced_events = [(position, forced_action,
+                          None if card is None else code2card(card))
+                         for position, forced_action, card
+                         in self._env.fast_forward()]
         self.infoset = self._game_infoset
         done = False
         reward = 0.0
@@ -136,8 +149,8 @@ class Env:
             reward = self._get_reward()
             obs = None
         else:
-            obs = get_obs(self.infoset)
-        return obs, reward, done, {}
+            obs = self._obs_builder(self.infoset)
+        return obs, reward, done, {'forced_events': forced_events}
 
     def _get_reward(self):
         """
@@ -221,17 +234,18 @@ class DummyAgent(object):
         """
         self.action = action
 
-def get_obs(infoset):
+def get_obs(infoset, history=None):
     """
     This function obtains observations with imperfect information
-    from the infoset. It has three branches since we encode
-    different features for different positions.
+    from the infoset, encoded by the feature set registered for
+    the position (see features.py).
     
     This function will return dictionary named `obs`. It contains
     several fields. These fields will be used to train the model.
     One can play with those features to improve the performance.
 
-    `position` is a string that can be landlord/landlord_down/landlord_up
+    `position` is the position of the infoset, any position
+    with a registered feature set
 
     `x_batch` is a batch of features (excluding the hisorical moves).
     It also encodes the action feature
@@ -244,161 +258,27 @@ def get_obs(infoset):
     the action features). It does not have the batch dim.
 
     `z`: same as z_batch but not a batch.
-    """
-    if infoset.player_position == 'landlord':
-        return _get_obs_landlord(infoset)
-    elif infoset.player_position == 'landlord_up':
-        return _get_obs_landlord_up(infoset)
-    elif infoset.player_position == 'landlord_down':
-        return _get_obs_landlord_down(infoset)
-    else:
-        raise ValueError('')
-
-def _get_one_hot_array(num_left_cards, max_num_cards):
-    """
-    A utility function to obtain one-hot endoding
-    """
-    one_hot = np.zeros(max_num_cards)
-    one_hot[num_left_cards - 1] = 1
-
-    return one_hot
 
-def _cards2array(list_cards):
-    """
-    A utility function that transforms the actions, i.e.,
-    A list of integers into card matrix. Here we remove
-    the six entries that are always zero and flatten the
-    the representations.
-    """
-    if len(list_cards) == 0:
-        return np.zeros(54, dtype=np.int8)
-
-    matrix = np.zeros([4, 13], dtype=np.int8)
-    jokers = np.zeros(2, dtype=np.int8)
-    counter = Counter(list_cards)
-    for card, num_times in counter.items():
-        if card < 20:
-            matrix[:, Card2Column[card]] = NumOnes2Array[num_times]
-        elif card == 20:
-            jokers[0] = 1
-        elif card == 30:
-            jokers[1] = 1
-    return np.concatenate((matrix.flatten('F'), jokers))
-
-def _action_seq_list2array(action_seq_list):
-    """
-    A utility function to encode the historical moves.
-    We encode the historical 15 actions. If there is
-    no 15 actions, we pad the features with 0. Since
-    three moves is a round in DouDizhu, we concatenate
-    the representations for each consecutive three moves.
-    Finally, we obtain a 5x162 matrix, which will be fed
-    into LSTM for encoding.
-    """
-    action_seq_array = np.zeros((len(action_seq_list), 54))
-    for row, list_cards in enumerate(action_seq_list):
-        action_seq_array[row, :] = _cards2array(list_cards)
-    action_seq_array = action_seq_array.reshape(5, 162)
-    return action_seq_array
+    `history` is the ActionHistory following the game, if
+    any; without it the historical moves are encoded from
+    scratch.
 
-def _process_action_seq(sequence, length=15):
-    """
-    A utility function encoding historical moves. We
-    encode 15 moves. If there is no 15 moves, we pad
-    with zeros.
-    """
-    sequence = sequence[-length:].copy()
-    if len(sequence) < length:
-        empty_sequence = [[] for _ in range(length - len(sequence))]
-        empty_sequence.extend(sequence)
-        sequence = empty_sequence
-    return sequence
-
-def _get_one_hot_bomb(bomb_num):
-    """
-    A utility function to encode the number of bombs
-    into one-hot representation.
-    """
-    one_hot = np.zeros(15)
-    one_hot[bomb_num] = 1
-    return one_hot
-
-def _get_obs_landlord(infoset):
-    """
-    Obttain the landlord features. See Table 4 in
-    https://arxiv.org/pdf/2106.06135.pdf
+    Raises ValueError when no feature set is registered for
+    the position.
     """
+    feature_set = get_feature_set(infoset.player_position)
     num_legal_actions = len(infoset.legal_actions)
-    my_handcards = _cards2array(infoset.player_hand_cards)
-    my_handcards_batch = np.repeat(my_handcards[np.newaxis, :],
-                                   num_legal_actions, axis=0)
-
-    other_handcards = _cards2array(infoset.other_hand_cards)
-    other_handcards_batch = np.repeat(other_handcards[np.newaxis, :],
-                                      num_legal_actions, axis=0)
-
-    last_action = _cards2array(infoset.last_move)
-    last_action_batch = np.repeat(last_action[np.newaxis, :],
-                                  num_legal_actions, axis=0)
-
-    my_action_batch = np.zeros(my_handcards_batch.shape)
-    for j, action in enumerate(infoset.legal_actions):
-        my_action_batch[j, :] = _cards2array(action)
-
-    landlord_up_num_cards_left = _get_one_hot_array(
-        infoset.num_cards_left_dict['landlord_up'], 17)
-    landlord_up_num_cards_left_batch = np.repeat(
-        landlord_up_num_cards_left[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    landlord_down_num_cards_left = _get_one_hot_array(
-        infoset.num_cards_left_dict['landlord_down'], 17)
-    landlord_down_num_cards_left_batch = np.repeat(
-        landlord_down_num_cards_left[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    landlord_up_played_cards = _cards2array(
-        infoset.played_cards['landlord_up'])
-    landlord_up_played_cards_batch = np.repeat(
-        landlord_up_played_cards[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    landlord_down_played_cards = _cards2array(
-        infoset.played_cards['landlord_down'])
-    landlord_down_played_cards_batch = np.repeat(
-        landlord_down_played_cards[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    bomb_num = _get_one_hot_bomb(
-        infoset.bomb_num)
-    bomb_num_batch = np.repeat(
-        bomb_num[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    x_batch = np.hstack((my_handcards_batch,
-                         other_handcards_batch,
-                         last_action_batch,
-                         landlord_up_played_cards_batch,
-                         landlord_down_played_cards_batch,
-                         landlord_up_num_cards_left_batch,
-                         landlord_down_num_cards_left_batch,
-                         bomb_num_batch,
+    x_no_action = feature_set.encode(infoset)
+    my_action_batch = feature_set.encode_actions(infoset.legal_actions)
+    x_batch = np.hstack((np.repeat(x_no_action[np.newaxis, :],
+                                   num_legal_actions, axis=0),
                          my_action_batch))
-    x_no_action = np.hstack((my_handcards,
-                             other_handcards,
-                             last_action,
-                             landlord_up_played_cards,
-                             landlord_down_played_cards,
-                             landlord_up_num_cards_left,
-                             landlord_down_num_cards_left,
-                             bomb_num))
-    z = _action_seq_list2array(_process_action_seq(
-        infoset.card_play_action_seq))
+    z = _get_history_z(infoset, history)
     z_batch = np.repeat(
         z[np.newaxis, :, :],
         num_legal_actions, axis=0)
     obs = {
-            'position': 'landlord',
+            'position': infoset.player_position,
             'x_batch': x_batch.astype(np.float32),
             'z_batch': z_batch.astype(np.float32),
             'legal_actions': infoset.legal_actions,
@@ -407,204 +287,195 @@ def _get_obs_landlord(infoset):
           }
     return obs
 
-def _get_obs_landlord_up(infoset):
+class ObservationBuilder(object):
     """
-    Obttain the landlord_up features. See Table 5 in
-    https://arxiv.org/pdf/2106.06135.pdf
+    Builds the same observations as `get_obs`, but writes them
+    into buffers it owns instead of allocating a dozen arrays
+    per call. Each position has an `x_batch` and a `z_batch`
+    buffer with one row per legal action; every feature is
+    written in place into its column slice, and the returned
+    `x_batch`/`z_batch` are views of the first N rows.
+
+    Everything position-specific comes from the feature set
+    registered for the position (see features.py): the context
+    columns, the width and encoder of the action features and
+    the shape of `z`. Any registered position can be encoded,
+    and the buffers of a position are allocated the first time
+    it is seen.
+
+    With `shared_context=True` the observation is not repeated
+    per action at all: it has the context `x_no_action` and
+    the history `z` once, plus an (N, action_dim)
+    `action_batch`, and the models broadcast the context
+    themselves (see `forward_shared` in douzero/dmc/models.py).
+
+    The historical moves are kept encoded in an ActionHistory
+    that follows the game, so each call only encodes the
+    moves played since the previous one. Feature sets with the
+    same action encoder and `z` shape share one history.
+
+    The views are overwritten by the next call for the same
+    position, so use (or copy) them before building the next
+    observation. `z` is a view of the history buffer and is
+    overwritten by the next call for any position; copy it to
+    keep it. `x_no_action` is returned as a fresh array.
+
+    The buffers start with room for `max_legal_actions` rows
+    and grow (doubling) when a step has more legal actions.
     """
-    num_legal_actions = len(infoset.legal_actions)
-    my_handcards = _cards2array(infoset.player_hand_cards)
-    my_handcards_batch = np.repeat(my_handcards[np.newaxis, :],
-                                   num_legal_actions, axis=0)
-
-    other_handcards = _cards2array(infoset.other_hand_cards)
-    other_handcards_batch = np.repeat(other_handcards[np.newaxis, :],
-                                      num_legal_actions, axis=0)
-
-    last_action = _cards2array(infoset.last_move)
-    last_action_batch = np.repeat(last_action[np.newaxis, :],
-                                  num_legal_actions, axis=0)
-
-    my_action_batch = np.zeros(my_handcards_batch.shape)
-    for j, action in enumerate(infoset.legal_actions):
-        my_action_batch[j, :] = _cards2array(action)
-
-    last_landlord_action = _cards2array(
-        infoset.last_move_dict['landlord'])
-    last_landlord_action_batch = np.repeat(
-        last_landlord_action[np.newaxis, :],
-        num_legal_actions, axis=0)
-    landlord_num_cards_left = _get_one_hot_array(
-        infoset.num_cards_left_dict['landlord'], 20)
-    landlord_num_cards_left_batch = np.repeat(
-        landlord_num_cards_left[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    landlord_played_cards = _cards2array(
-        infoset.played_cards['landlord'])
-    landlord_played_cards_batch = np.repeat(
-        landlord_played_cards[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    last_teammate_action = _cards2array(
-        infoset.last_move_dict['landlord_down'])
-    last_teammate_action_batch = np.repeat(
-        last_teammate_action[np.newaxis, :],
-        num_legal_actions, axis=0)
-    teammate_num_cards_left = _get_one_hot_array(
-        infoset.num_cards_left_dict['landlord_down'], 17)
-    teammate_num_cards_left_batch = np.repeat(
-        teammate_num_cards_left[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    teammate_played_cards = _cards2array(
-        infoset.played_cards['landlord_down'])
-    teammate_played_cards_batch = np.repeat(
-        teammate_played_cards[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    bomb_num = _get_one_hot_bomb(
-        infoset.bomb_num)
-    bomb_num_batch = np.repeat(
-        bomb_num[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    x_batch = np.hstack((my_handcards_batch,
-                         other_handcards_batch,
-                         landlord_played_cards_batch,
-                         teammate_played_cards_batch,
-                         last_action_batch,
-                         last_landlord_action_batch,
-                         last_teammate_action_batch,
-                         landlord_num_cards_left_batch,
-                         teammate_num_cards_left_batch,
-                         bomb_num_batch,
-                         my_action_batch))
-    x_no_action = np.hstack((my_handcards,
-                             other_handcards,
-                             landlord_played_cards,
-                             teammate_played_cards,
-                             last_action,
-                             last_landlord_action,
-                             last_teammate_action,
-                             landlord_num_cards_left,
-                             teammate_num_cards_left,
-                             bomb_num))
-    z = _action_seq_list2array(_process_action_seq(
-        infoset.card_play_action_seq))
-    z_batch = np.repeat(
-        z[np.newaxis, :, :],
-        num_legal_actions, axis=0)
-    obs = {
-            'position': 'landlord_up',
-            'x_batch': x_batch.astype(np.float32),
-            'z_batch': z_batch.astype(np.float32),
-            'legal_actions': infoset.legal_actions,
-            'x_no_action': x_no_action.astype(np.int8),
-            'z': z.astype(np.int8),
-          }
-    return obs
-
-def _get_obs_landlord_down(infoset):
+    def __init__(self, max_legal_actions=256, shared_context=False):
+        self.shared_context = shared_context
+        self._capacity = max_legal_actions
+        self._x_buffers = {}
+        self._z_buffers = {}
+        self._action_buffers = {}
+        self._histories = {}
+
+    def _reserve(self, num_legal_actions):
+        if num_legal_actions <= self._capacity:
+            return
+        # The buffers are reallocated with the new capacity on demand
+        self._capacity = max(num_legal_actions, 2 * self._capacity)
+        self._x_buffers = {}
+        self._z_buffers = {}
+        self._action_buffers = {}
+
+    def _history(self, feature_set):
+        key = (feature_set.action_encoder, feature_set.z_shape)
+        history = self._histories.get(key)
+        if history is None:
+            history = self._histories[key] = ActionHistory(feature_set)
+        return history
+
+    def __call__(self, infoset):
+        """
+        Build the observation of `infoset`. By default it has
+        the same fields and values as `get_obs(infoset)`; in
+        shared-context mode `x_batch`/`z_batch` are replaced
+        by `action_batch`. Raises ValueError when no feature
+        set is registered for the position.
+        """
+        position = infoset.player_position
+        feature_set = get_feature_set(position)
+        legal_actions = infoset.legal_actions
+        num_legal_actions = len(legal_actions)
+        self._reserve(num_legal_actions)
+
+        # Context features, computed once in a single pass
+        x_no_action = feature_set.encode(infoset)
+        start = feature_set.width
+        # Only the moves played since the last call are encoded
+        z = self._history(feature_set).sync(infoset.card_play_action_seq)
+
+        obs = {
+                'position': position,
+                'legal_actions': legal_actions,
+                'x_no_action': x_no_action,
+                'z': z,
+              }
+        if self.shared_context:
+            action_buffer = self._action_buffers.get(feature_set.action_dim)
+            if action_buffer is None:
+                action_buffer = self._action_buffers[feature_set.action_dim] = np.zeros(
+                    (self._capacity, feature_set.action_dim), dtype=np.float32)
+            actions = action_buffer[:num_legal_actions]
+            obs['action_batch'] = actions
+        else:
+            if position not in self._x_buffers:
+                self._x_buffers[position] = np.zeros(
+                    feature_set.batch_shape(self._capacity), dtype=np.float32)
+                self._z_buffers[position] = np.zeros(
+                    (self._capacity,) + feature_set.z_shape, dtype=np.float32)
+            # Broadcast the context and the history into every row
+            x_batch = self._x_buffers[position][:num_legal_actions]
+            z_batch = self._z_buffers[position][:num_legal_actions]
+            x_batch[:, :start] = x_no_action
+            z_batch[:] = z
+            actions = x_batch[:, start:]
+            obs['x_batch'] = x_batch
+            obs['z_batch'] = z_batch
+
+        # Action features: one row per legal action, written in place
+        feature_set.encode_actions(legal_actions, actions)
+        return obs
+
+class ActionHistory(object):
     """
-    Obttain the landlord_down features. See Table 5 in
-    https://arxiv.org/pdf/2106.06135.pdf
+    Rolling encoding of the historical moves. We encode
+    the last `history_length` moves of the feature set with
+    its action encoder, padded with zeros in front when there
+    are fewer, and concatenate each `moves_per_row` moves (a
+    round) into a row of `z`, which is fed into the LSTM. In
+    DouDizhu that is the last 15 moves, three moves per row:
+    a 5x162 matrix.
+
+    Instead of re-encoding the moves on every step, the
+    encoded moves are kept in a ring buffer and each new
+    move only writes its own row. The buffer is doubled,
+    so every move is written twice (row i and row i +
+    history_length) and the last moves are always
+    consecutive rows: `z` is a reshaped view of them,
+    without any copy.
+
+    `sync` follows the `card_play_action_seq` of a game:
+    it appends the moves played since the last call, and
+    starts over when it is given the sequence of another
+    game (or one that got shorter).
     """
-    num_legal_actions = len(infoset.legal_actions)
-    my_handcards = _cards2array(infoset.player_hand_cards)
-    my_handcards_batch = np.repeat(my_handcards[np.newaxis, :],
-                                   num_legal_actions, axis=0)
-
-    other_handcards = _cards2array(infoset.other_hand_cards)
-    other_handcards_batch = np.repeat(other_handcards[np.newaxis, :],
-                                      num_legal_actions, axis=0)
-
-    last_action = _cards2array(infoset.last_move)
-    last_action_batch = np.repeat(last_action[np.newaxis, :],
-                                  num_legal_actions, axis=0)
-
-    my_action_batch = np.zeros(my_handcards_batch.shape)
-    for j, action in enumerate(infoset.legal_actions):
-        my_action_batch[j, :] = _cards2array(action)
-
-    last_landlord_action = _cards2array(
-        infoset.last_move_dict['landlord'])
-    last_landlord_action_batch = np.repeat(
-        last_landlord_action[np.newaxis, :],
-        num_legal_actions, axis=0)
-    landlord_num_cards_left = _get_one_hot_array(
-        infoset.num_cards_left_dict['landlord'], 20)
-    landlord_num_cards_left_batch = np.repeat(
-        landlord_num_cards_left[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    landlord_played_cards = _cards2array(
-        infoset.played_cards['landlord'])
-    landlord_played_cards_batch = np.repeat(
-        landlord_played_cards[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    last_teammate_action = _cards2array(
-        infoset.last_move_dict['landlord_up'])
-    last_teammate_action_batch = np.repeat(
-        last_teammate_action[np.newaxis, :],
-        num_legal_actions, axis=0)
-    teammate_num_cards_left = _get_one_hot_array(
-        infoset.num_cards_left_dict['landlord_up'], 17)
-    teammate_num_cards_left_batch = np.repeat(
-        teammate_num_cards_left[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    teammate_played_cards = _cards2array(
-        infoset.played_cards['landlord_up'])
-    teammate_played_cards_batch = np.repeat(
-        teammate_played_cards[np.newaxis, :],
-        num_legal_actions, axis=0)
-
-    landlord_played_cards = _cards2array(
-        infoset.played_cards['landlord'])
-    landlord_played_cards_batch = np.repeat(
-        landlord_played_cards[np.newaxis, :],
-        num_legal_actions, axis=0)
+    def __init__(self, feature_set):
+        # The moves are encoded and laid out as the feature set says
+        self._feature_set = feature_set
+        self._length = feature_set.history_length
+        self._buffer = np.zeros((2 * self._length, feature_set.action_dim), dtype=np.int8)
+        self._source = None
+        self._num_moves = 0
+
+    def reset(self, source=None):
+        """Forget all moves, optionally following `source`."""
+        self._buffer[:] = 0
+        self._source = source
+        self._num_moves = 0
+
+    def append(self, move):
+        """Encode one move, overwriting the oldest one."""
+        slot = self._num_moves % self._length
+        self._feature_set.encode_actions([move], self._buffer[slot:slot + 1])
+        self._buffer[slot + self._length] = self._buffer[slot]
+        self._num_moves += 1
+
+    def sync(self, sequence):
+        """
+        Catch up with `sequence`, the list of moves played
+        so far (or a read-only view of it), and return `z`.
+        """
+        sequence = unwrap(sequence)
+        if sequence is not self._source or len(sequence) < self._num_moves:
+            self.reset(sequence)
+        # Only the last moves are encoded; when skipping
+        # ahead all the rows get overwritten
+        start = max(self._num_moves, len(sequence) - self._length)
+        self._num_moves = start
+        for move in sequence[start:]:
+            self.append(move)
+        return self.z
 
-    bomb_num = _get_one_hot_bomb(
-        infoset.bomb_num)
-    bomb_num_batch = np.repeat(
-        bomb_num[np.newaxis, :],
-        num_legal_actions, axis=0)
+    @property
+    def z(self):
+        """
+        The int8 encoding of the last moves, oldest first,
+        shaped like the feature set's `z_shape` ((5, 162) in
+        DouDizhu). It is a view of the buffer and changes with
+        the next `append`/`sync`.
+        """
+        start = self._num_moves % self._length
+        return self._buffer[start:start + self._length].reshape(self._feature_set.z_shape)
 
-    x_batch = np.hstack((my_handcards_batch,
-                         other_handcards_batch,
-                         landlord_played_cards_batch,
-                         teammate_played_cards_batch,
-                         last_action_batch,
-                         last_landlord_action_batch,
-                         last_teammate_action_batch,
-                         landlord_num_cards_left_batch,
-                         teammate_num_cards_left_batch,
-                         bomb_num_batch,
-                         my_action_batch))
-    x_no_action = np.hstack((my_handcards,
-                             other_handcards,
-                             landlord_played_cards,
-                             teammate_played_cards,
-                             last_action,
-                             last_landlord_action,
-                             last_teammate_action,
-                             landlord_num_cards_left,
-                             teammate_num_cards_left,
-                             bomb_num))
-    z = _action_seq_list2array(_process_action_seq(
-        infoset.card_play_action_seq))
-    z_batch = np.repeat(
-        z[np.newaxis, :, :],
-        num_legal_actions, axis=0)
-    obs = {
-            'position': 'landlord_down',
-            'x_batch': x_batch.astype(np.float32),
-            'z_batch': z_batch.astype(np.float32),
-            'legal_actions': infoset.legal_actions,
-            'x_no_action': x_no_action.astype(np.int8),
-            'z': z.astype(np.int8),
-          }
-    return obs
+def _get_history_z(infoset, history=None):
+    """
+    The history encoding `z` of `infoset`, read from the
+    ActionHistory of the game when there is one, otherwise
+    encoded from scratch.
+    """
+    if history is None:
+        history = ActionHistory(get_feature_set(infoset.player_position))
+    return history.sync(infoset.card_play_action_seq)
@@ -0,0 +1,384 @@
+"""
+观测特征的声明式定义。
+
+每个特征用 Feature 声明名字、宽度、类型和提取函数，一个座位的特征按顺序组成 FeatureSet，
+由它统一算出：
+1. 每个特征在 x_no_action 中的位置(offsets)
+2. 输出数组的形状(shape、batch_shape、z_shape)和类型
+3. 训练缓冲区的规格(buffer_specs，见 dmc/utils.py 的 create_buffers)
+4. 模型输入的宽度(model_input_dim、z_shape，见 dmc/models.py)
+增删特征只改特征列表，不需要手改任何维度常数。
+
+动作(合法动作和历史出牌)也由特征集合编码：注册时给出动作特征的宽度和编码函数，
+历史出牌 z 是最近 history_length 步动作的编码，每 moves_per_row 步一行。
+env.py 的 ObservationBuilder 按座位取出特征集合，用它编码观测、动作和历史出牌。
+
+编码时按顺序把每个特征的提取函数作用在同一个预先清零的数组的对应切片上，一遍写完，
+不需要先生成各自的数组再拼接。
+
+注册表按座位保存特征集合：
+1. 四人座位(first/first_up/first_across/first_down)的特征在本模块注册，
+   牌用整数编码的计数向量表示(见 cards.py)，其他座位按上家、对家、下家的顺序排列
+2. 旧的三人座位(landlord/landlord_up/landlord_down)的特征也在本模块注册，
+   牌用54维编码(4x13矩阵加两张王)，列顺序和原来的斗地主观测一致
+env.py 的 get_obs 和 ObservationBuilder 都只通过注册的特征集合编码。
+"""
+import collections
+
+import numpy as np
+
+from douzero.env.cards import CARD2CODE, NUM_CARD_CODES
+from douzero.env.detector_cache import LRUCache
+from douzero.env.game import POSITIONS
+
+# name: 特征名，同一个特征集合中不能重复
+# width: 宽度
+# dtype: 类型
+# extractor: extractor(infoset, out)，把特征写进已清零的长度为width的数组out
+Feature = collections.namedtuple('Feature', ['name', 'width', 'dtype', 'extractor'])
+
+
+class FeatureSet(object):
+    """一个座位的特征集合，特征按声明的顺序排列"""
+
+    def __init__(self, features, action_dim, action_encoder,
+                 history_length=15, moves_per_row=3):
+        """
+        Args:
+            features: Feature 列表
+            action_dim: 动作特征的宽度，模型输入是特征后面接上动作特征
+            action_encoder: action_encoder(actions, out)，把动作列表编码进
+                已清零的(len(actions), action_dim)数组out，每个动作一行
+            history_length: 历史出牌 z 编码的步数
+            moves_per_row: z 每一行的步数(一轮出牌的步数)
+        """
+        if history_length % moves_per_row != 0:
+            raise ValueError('history_length should be a multiple of moves_per_row')
+        self.features = tuple(features)
+        names = [feature.name for feature in self.features]
+        if len(set(names)) != len(names):
+            raise ValueError('duplicate feature names: {}'.format(names))
+        self.action_dim = action_dim
+        self.action_encoder = action_encoder
+        self.history_length = history_length
+        self.moves_per_row = moves_per_row
+        self.offsets = collections.OrderedDict()
+        start = 0
+        for feature in self.features:
+            self.offsets[feature.name] = slice(start, start + feature.width)
+            start += feature.width
+        self.width = start
+        self.dtype = np.result_type(*[feature.dtype for feature in self.features])
+        # 编码时依次执行的(提取函数, 切片)
+        self._plan = [(feature.extractor, self.offsets[feature.name])
+                      for feature in self.features]
+
+    def __repr__(self):
+        return 'FeatureSet({})'.format(
+            ', '.join('{}:{}'.format(feature.name, feature.width)
+                      for feature in self.features))
+
+    @property
+    def shape(self):
+        """x_no_action 的形状"""
+        return (self.width,)
+
+    @property
+    def model_input_dim(self):
+        """模型输入 x 的宽度：特征加动作特征"""
+        return self.width + self.action_dim
+
+    @property
+    def z_shape(self):
+        """历史出牌 z 的形状"""
+        return (self.history_length // self.moves_per_row,
+                self.moves_per_row * self.action_dim)
+
+    def batch_shape(self, num_actions):
+        """x_batch 的形状，每个合法动作一行"""
+        return (num_actions, self.model_input_dim)
+
+    def buffer_specs(self, unroll_length):
+        """训练缓冲区中特征、动作和历史出牌的规格，dtype是numpy类型"""
+        return dict(
+            obs_x_no_action=dict(size=(unroll_length, self.width), dtype=self.dtype),
+            obs_action=dict(size=(unroll_length, self.action_dim), dtype=np.dtype(np.int8)),
+            obs_z=dict(size=(unroll_length,) + self.z_shape, dtype=np.dtype(np.int8)),
+        )
+
+    def encode(self, infoset, out=None):
+        """
+        把信息集编码成 x_no_action
+        Args:
+            infoset: 信息集
+            out: 写入的数组，长度为width，默认新建
+        Returns:
+            np.ndarray: 编码结果
+        """
+        if out is None:
+            out = np.zeros(self.width, dtype=self.dtype)
+        else:
+            out[:] = 0
+        for extractor, columns in self._plan:
+            extractor(infoset, out[columns])
+        return out
+
+    def encode_actions(self, actions, out=None):
+        """
+        把动作列表编码成每个动作一行的数组
+        Args:
+            actions: 动作列表
+            out: 写入的数组，形状为(len(actions), action_dim)，默认新建int8数组
+        Returns:
+            np.ndarray: 编码结果
+        """
+        if out is None:
+            out = np.zeros((len(actions), self.action_dim), dtype=np.int8)
+        else:
+            out[:] = 0
+        self.action_encoder(actions, out)
+        return out
+
+    def split(self, x):
+        """按特征拆分编码结果(最后一维)，返回 特征名 -> 视图"""
+        return collections.OrderedDict(
+            (name, x[..., columns]) for name, columns in self.offsets.items())
+
+
+FEATURE_SETS = {}
+
+
+def register_feature_set(position, features, action_dim, action_encoder, **kwargs):
+    """注册(或替换)一个座位的特征集合，参数同 FeatureSet
+    Returns:
+        FeatureSet: 注册的特征集合
+    """
+    feature_set = FeatureSet(features, action_dim, action_encoder, **kwargs)
+    FEATURE_SETS[position] = feature_set
+    return feature_set
+
+
+def get_feature_set(position):
+    """取出一个座位的特征集合"""
+    try:
+        return FEATURE_SETS[position]
+    except KeyError:
+        raise ValueError('no feature set registered for {}'.format(position))
+
+
+# 四人座位的特征
+
+def _count_codes(out, codes):
+    for code in codes:
+        out[code] += 1
+
+
+def _hand_feature(infoset, out):
+    out[:] = infoset.hand.counts
+
+
+def _other_hand_feature(infoset, out):
+    # other_hand_cards 是(点数,花色)元组
+    _count_codes(out, [CARD2CODE[card] for card in infoset.other_hand_cards])
+
+
+def _played_cards_feature(position):
+    def extract(infoset, out):
+        _count_codes(out, infoset.played_cards[position])
+    return extract
+
+
+def _last_move_feature(position):
+    def extract(infoset, out):
+        _count_codes(out, infoset.last_move_dict[position])
+    return extract
+
+
+def _num_cards_left_feature(positions):
+    def extract(infoset, out):
+        num_cards_left = infoset.num_cards_left_dict
+        for i, position in enumerate(positions):
+            out[i] = num_cards_left[position]
+    return extract
+
+
+def _relative_positions(position):
+    """上家、对家、下家，和 GameEnv.get_relative_position 一致"""
+    index = POSITIONS.index(position)
+    return (POSITIONS[(index - 1) % 4], POSITIONS[(index + 2) % 4],
+            POSITIONS[(index + 1) % 4])
+
+
+def seat_features(position):
+    """四人座位的特征列表
+    1. 自己的手牌、其他玩家的手牌
+    2. 上家、对家、下家打出的牌
+    3. 上家、对家、下家最近一次出的牌
+    4. 上家、对家、下家剩余的牌数
+    """
+    others = _relative_positions(position)
+    features = [Feature('my_handcards', NUM_CARD_CODES, np.int8, _hand_feature),
+                Feature('other_handcards', NUM_CARD_CODES, np.int8, _other_hand_feature)]
+    for relation, other in zip(('up', 'across', 'down'), others):
+        features.append(Feature('{}_played_cards'.format(relation), NUM_CARD_CODES,
+                                np.int8, _played_cards_feature(other)))
+    for relation, other in zip(('up', 'across', 'down'), others):
+        features.append(Feature('{}_last_move'.format(relation), NUM_CARD_CODES,
+                                np.int8, _last_move_feature(other)))
+    features.append(Feature('num_cards_left', len(others), np.int8,
+                            _num_cards_left_feature(others)))
+    return features
+
+
+def _count_actions(actions, out):
+    """每个动作(牌的编码列表)编码成计数向量"""
+    for row, action in zip(out, actions):
+        _count_codes(row, action)
+
+
+# 四人座位一次只出一张牌，动作特征是这张牌的计数向量；一轮是4步，z 每行一轮，共4轮
+for _position in POSITIONS:
+    register_feature_set(_position, seat_features(_position), NUM_CARD_CODES,
+                         _count_actions, history_length=16, moves_per_row=4)
+
+
+# 旧的三人座位(斗地主)的特征
+# 牌是点数(3-14、17，小王20、大王30)，编码成54维：4x13矩阵按列展开，再接两张王，
+# 一种牌的第n张占它那一列的第n行，王只有一个位置
+
+ACTION_DIM = 54
+HISTORY_LENGTH = 15
+
+Card2Column = {3: 0, 4: 1, 5: 2, 6: 3, 7: 4, 8: 5, 9: 6, 10: 7,
+               11: 8, 12: 9, 13: 10, 14: 11, 17: 12}
+
+# 每种牌第n张在54维编码中的位置
+_CARD_SLOTS = {card: tuple(column * 4 + n for n in range(4))
+               for card, column in Card2Column.items()}
+_CARD_SLOTS[20] = (52,) * 4
+_CARD_SLOTS[30] = (53,) * 4
+
+# 可选的编码缓存，键是排好序的牌，None表示不缓存(见 enable_cards2array_cache)
+_cards2array_cache = None
+
+
+def enable_cards2array_cache(maxsize):
+    """缓存最多 maxsize 个牌的编码，缓存的编码是共享的，_cards2array 返回只读数组"""
+    global _cards2array_cache
+    _cards2array_cache = LRUCache(maxsize)
+
+
+def disable_cards2array_cache():
+    global _cards2array_cache
+    _cards2array_cache = None
+
+
+def get_cards2array_cache_stats():
+    """编码缓存的命中统计，不缓存时返回None"""
+    if _cards2array_cache is None:
+        return None
+    return _cards2array_cache.stats()
+
+
+def _write_cards(out, list_cards):
+    """把牌的54维编码写进已清零的数组out，不分配内存"""
+    seen = {}
+    for card in list_cards:
+        num_seen = seen.get(card, 0)
+        seen[card] = num_seen + 1
+        out[_CARD_SLOTS[card][num_seen]] = 1
+
+
+def _cards2array(list_cards):
+    """牌的54维int8编码"""
+    cache = _cards2array_cache
+    if cache is not None:
+        key = tuple(sorted(list_cards))
+        array = cache.get(key)
+        if array is None:
+            array = np.zeros(ACTION_DIM, dtype=np.int8)
+            _write_cards(array, key)
+            array.flags.writeable = False
+            cache.put(key, array)
+        return array
+    array = np.zeros(ACTION_DIM, dtype=np.int8)
+    _write_cards(array, list_cards)
+    return array
+
+
+def _cards2array_batch(list_of_cards, out=None):
+    """
+    每组牌编码成(N, 54)数组的一行，三人座位的动作编码函数
+    Args:
+        list_of_cards: 牌的列表的列表
+        out: 写入的数组，任意类型，正好N行，默认新建int8数组
+    """
+    if out is None:
+        out = np.zeros((len(list_of_cards), ACTION_DIM), dtype=np.int8)
+    else:
+        out.fill(0)
+    if _cards2array_cache is not None:
+        for row, list_cards in zip(out, list_of_cards):
+            row[:] = _cards2array(list_cards)
+    else:
+        for row, list_cards in zip(out, list_of_cards):
+            _write_cards(row, list_cards)
+    return out
+
+
+def _card_feature(name, get_cards):
+    def extract(infoset, out):
+        _write_cards(out, get_cards(infoset))
+    return Feature(name, ACTION_DIM, np.int8, extract)
+
+
+def _one_hot_cards_left_feature(name, position, max_num_cards):
+    """剩余牌数的one-hot编码"""
+    def extract(infoset, out):
+        out[infoset.num_cards_left_dict[position] - 1] = 1
+    return Feature(name, max_num_cards, np.int8, extract)
+
+
+def _bomb_num_feature(infoset, out):
+    out[infoset.bomb_num] = 1
+
+
+def landlord_features():
+    """地主的特征列表"""
+    return [_card_feature('my_handcards', lambda infoset: infoset.player_hand_cards),
+            _card_feature('other_handcards', lambda infoset: infoset.other_hand_cards),
+            _card_feature('last_action', lambda infoset: infoset.last_move),
+            _card_feature('landlord_up_played_cards',
+                          lambda infoset: infoset.played_cards['landlord_up']),
+            _card_feature('landlord_down_played_cards',
+                          lambda infoset: infoset.played_cards['landlord_down']),
+            _one_hot_cards_left_feature('landlord_up_num_cards_left', 'landlord_up', 17),
+            _one_hot_cards_left_feature('landlord_down_num_cards_left', 'landlord_down', 17),
+            Feature('bomb_num', 15, np.int8, _bomb_num_feature)]
+
+
+def peasant_features(teammate):
+    """农民(地主上家、下家)的特征列表，teammate 是另一个农民"""
+    return [_card_feature('my_handcards', lambda infoset: infoset.player_hand_cards),
+            _card_feature('other_handcards', lambda infoset: infoset.other_hand_cards),
+            _card_feature('landlord_played_cards',
+                          lambda infoset: infoset.played_cards['landlord']),
+            _card_feature('teammate_played_cards',
+                          lambda infoset: infoset.played_cards[teammate]),
+            _card_feature('last_action', lambda infoset: infoset.last_move),
+            _card_feature('last_landlord_action',
+                          lambda infoset: infoset.last_move_dict['landlord']),
+            _card_feature('last_teammate_action',
+                          lambda infoset: infoset.last_move_dict[teammate]),
+            _one_hot_cards_left_feature('landlord_num_cards_left', 'landlord', 20),
+            _one_hot_cards_left_feature('teammate_num_cards_left', teammate, 17),
+            Feature('bomb_num', 15, np.int8, _bomb_num_feature)]
+
+
+# 三人座位一次出一组牌，z 是最近15步，每行一轮3步
+register_feature_set('landlord', landlord_features(), ACTION_DIM, _cards2array_batch,
+                     history_length=HISTORY_LENGTH, moves_per_row=3)
+register_feature_set('landlord_up', peasant_features('landlord_down'), ACTION_DIM,
+                     _cards2array_batch, history_length=HISTORY_LENGTH, moves_per_row=3)
+register_feature_set('landlord_down', peasant_features('landlord_up'), ACTION_DIM,
+                     _cards2array_batch, history_length=HISTORY_LENGTH, moves_per_row=3)
@@ -1,19 +1,39 @@
-from copy import deepcopy
-from . import move_detector as md, move_selector as ms
+import numpy as np
+
+from . import move_selector as ms
 from .move_generator import MovesGener
+from .bean_calculator import calculate_beans_batch
+from .card_piles import DrawPile, PublicCards
+from .cards import (JOKER, QUESTION_MARK, CARD2CODE, CODE2CARD,
+                    HandCards)
+from .hu_pattern_detector import get_ting_multipliers
+from .readonly import freeze, thaw
+from . import game_record as gr
+from . import zobrist
 
 EnvCard2RealCard = {3: '3', 4: '4', 5: '5', 6: '6', 7: '7',
                     8: '8', 9: '9', 10: '10', 11: 'J', 12: 'Q',
                     13: 'K', 14: 'A', 17: '2', 20: 'X', 30: 'D'}
 
+POSITIONS = ('first', 'first_up', 'first_across', 'first_down')
+SEAT_INDEX = {pos: i for i, pos in enumerate(POSITIONS)}
+
 RealCard2EnvCard = {'3': 3, '4': 4, '5': 5, '6': 6, '7': 7,
                     '8': 8, '9': 9, '10': 10, 'J': 11, 'Q': 12,
                     'K': 13, 'A': 14, '2': 17, 'X': 20, 'D': 30}
 
 
+def _insert_card(cards, code):
+    """把一张牌按编码顺序插入(点数,花色)元组的有序列表，和 HandCards.to_list 的顺序一致"""
+    i = len(cards)
+    while i and CARD2CODE[cards[i - 1]] > code:
+        i -= 1
+    cards.insert(i, CODE2CARD[code])
+
+
 class GameEnv(object):
 
-    def __init__(self, players, recharge_positions):
+    def __init__(self, players, recharge_positions=(), seed=None):
 
         self.card_play_action_seq = []
         self.game_over = False
@@ -39,6 +59,14 @@ class GameEnv(object):
                          'first_down': InfoSet('first_down'),
                          'first_across': InfoSet('first_across')}
 
+        # 本桌自己的随机数生成器(发豆子、换牌)，按seed初始化，不碰全局的随机状态；
+        # 状态随牌局快照一起保存，每次通过 rng 取用都增加版本号，
+        # 快照时版本号没变就直接复用上次导出的状态
+        self._rng = np.random.default_rng(seed)
+        self._rng_version = 0
+        self._rng_state = None
+        self._rng_state_version = -1
+
         # 添加豆子相关属性
         self.min_beans = 150000  # 最低豆子数(15万)
         self.max_beans = 1000000000  # 最高豆子数(10亿) 
@@ -46,7 +74,7 @@ class GameEnv(object):
         
         # 随机初始化每个玩家的豆子数量(15万到10亿之间)
         self.beans = {
-            pos: random.randint(self.min_beans, self.max_beans)
+            pos: int(self.rng.integers(self.min_beans, self.max_beans, endpoint=True))
             for pos in ['first', 'first_up', 'first_across', 'first_down']
         }
         
@@ -83,97 +111,235 @@ class GameEnv(object):
             'first_across': []
         }
 
+        # 听牌索引：每个玩家当前7张手牌能胡的牌及其番型倍数，
+        # None表示手牌变化后还没有重新计算
+        self.ting_cards = {
+            'first': None,
+            'first_up': None,
+            'first_down': None,
+            'first_across': None
+        }
+
+        # 牌堆、公共牌区和废牌区
+        self.remaining_cards = DrawPile()
+        self.public_cards = PublicCards()
+        self.discard_cards = []
+
+        # 牌局记录器(见 game_record.py)，None表示不记录
+        self.recorder = None
+
+        # 信息集里由手牌派生的字段，随手牌变化增量维护(见 _rebuild_hand_views)
+        self._rebuild_hand_views()
+        # 手牌和废牌区的Zobrist哈希，随牌的移动增量维护(见 state_hash)
+        self._rebuild_state_hash()
+
+    @property
+    def rng(self):
+        """本桌的随机数生成器，取用后可能会抽随机数，版本号加一"""
+        self._rng_version += 1
+        return self._rng
+
+    def _record(self, position, action, card=None):
+        """有记录器时把事件写入牌局记录"""
+        if self.recorder is not None:
+            self.recorder.record(position, action, card)
+
+    def get_ting_cards(self, position):
+        """获取玩家的听牌索引，手牌变化后第一次调用时才重新计算
+        Args:
+            position: 玩家位置
+        Returns:
+            dict: 能胡的牌的编码 -> 番型倍数
+        """
+        ting_cards = self.ting_cards[position]
+        if ting_cards is None:
+            ting_cards = get_ting_multipliers(
+                tuple(self.info_sets[position].hand.codes().tolist()))
+            self.ting_cards[position] = ting_cards
+        return ting_cards
+
+    def _hand_changed(self, position):
+        """玩家手牌变化(摸牌、吃牌、出牌、换牌)后使听牌索引失效"""
+        self.ting_cards[position] = None
+
+    def _rebuild_hand_views(self):
+        """按当前手牌重新生成信息集里由手牌派生的字段：
+        1. num_cards_left_dict: 每个玩家的手牌数
+        2. all_handcards: 每个玩家的手牌，(点数,花色)元组的有序列表
+        3. _other_hand_cards: 每个玩家看到的其他三家手牌的并集，同样是有序列表
+        之后手牌每次变化只由 _add_hand_card/_remove_hand_card 增量更新变化的那张牌，
+        get_infoset 直接引用这些字段，不再每次拼接所有玩家的手牌
+        """
+        hands = {pos: self.info_sets[pos].hand for pos in POSITIONS}
+        self.num_cards_left_dict = {pos: len(hands[pos]) for pos in POSITIONS}
+        self.all_handcards = {pos: hands[pos].to_list() for pos in POSITIONS}
+        self._other_hand_cards = {
+            pos: sorted((card for other in POSITIONS if other != pos
+                         for card in self.all_handcards[other]),
+                        key=CARD2CODE.__getitem__)
+            for pos in POSITIONS}
+        self._hand_views_valid = True
+
+    def _rebuild_state_hash(self):
+        """按当前手牌和废牌区重新计算这两部分的Zobrist哈希，之后随牌的移动增量更新"""
+        self._hands_hash = 0
+        for seat, pos in enumerate(POSITIONS):
+            self._hands_hash ^= zobrist.hand_hash(
+                seat, self.info_sets[pos].hand.counts.tolist())
+        self._discard_hash = zobrist.discard_hash(self.discard_cards)
+
+    @property
+    def state_hash(self):
+        """当前局面的64位Zobrist哈希
+        包括手牌、公共牌区、牌堆、废牌区、当前玩家、已胡牌玩家和补胡状态。
+        牌的部分随牌的移动O(1)增量维护，其余部分取值时直接异或上对应的键，
+        相同的局面哈希相同，可以直接作为置换表、缓存的键
+        """
+        h = (self._hands_hash ^ self._discard_hash ^
+             self.remaining_cards.zobrist ^ self.public_cards.zobrist)
+        if self.acting_player_position is not None:
+            h ^= zobrist.SEAT_KEYS[SEAT_INDEX[self.acting_player_position]]
+        for pos in self.auto_hu_players:
+            h ^= zobrist.AUTO_HU_KEYS[SEAT_INDEX[pos]]
+        if self.bu_hu_state:
+            h ^= zobrist.BU_HU_KEY
+        if self.bu_hu_starter is not None:
+            h ^= zobrist.BU_HU_STARTER_KEYS[SEAT_INDEX[self.bu_hu_starter]]
+        if self.game_over:
+            h ^= zobrist.GAME_OVER_KEY
+        return h
+
+    def _add_hand_card(self, position, card):
+        """把一张牌(编码)加入玩家手牌，并增量更新派生字段和哈希"""
+        hand = self.info_sets[position].hand
+        hand.add(card)
+        self._hands_hash ^= zobrist.HAND_KEYS[SEAT_INDEX[position]][card][
+            int(hand.counts[card]) - 1]
+        self._hand_changed(position)
+        if self._hand_views_valid:
+            self.num_cards_left_dict[position] += 1
+            _insert_card(self.all_handcards[position], card)
+            for pos, cards in self._other_hand_cards.items():
+                if pos != position:
+                    _insert_card(cards, card)
+
+    def can_hu(self, position, card):
+        """判断玩家当前手牌能否胡这张牌(编码)"""
+        return card in self.get_ting_cards(position)
+
     def calculate_hu_value(self, position, card):
         """计算胡某张牌的价值（赢豆数/硬胡系数）"""
-        hand_cards = self.info_sets[position].player_hand_cards
-        has_joker = any(c[0] == 0 and c[1] == -1 for c in hand_cards)
+        return float(self.calculate_hu_values(position, [card])[0])
+
+    def calculate_hu_values(self, position, cards):
+        """一次计算胡多张候选牌的价值（赢豆数/硬胡系数）
+        Returns:
+            (N,) float数组，第i个是胡第i张候选牌的价值
+        """
+        has_joker = JOKER in self.info_sets[position].hand
         hard_hu_factor = 1 if has_joker else 2
-        beans = calculate_beans(self, position, card, False, False)
-        total_win = sum(v for v in beans.values() if v > 0)
-        return total_win / hard_hu_factor
-        
+        beans = calculate_beans_batch(self, position, cards, False, False)
+        return beans[position] / hard_hu_factor
+
     def handle_auto_hu(self, position, is_bu_hu=False):
         """处理自动胡牌的玩家行动
         Args:
             position: 玩家位置
             is_bu_hu: 是否是补胡状态
+        Returns:
+            (动作, 牌)：动作是'hu'(胡牌)或'play'(打出)，牌是整数编码，
+            没有动作(补胡时没有能胡的牌、牌堆空了)时是(None, None)
         """
-        # 1. 检查公共牌区是否有能胡的牌
-        best_value = -1
-        best_card = None
-        best_index = -1
-        
-        for i, card in enumerate(self.public_cards):
-            if card is None:
-                continue
-            if self.can_hu(position, card):
-                value = self.calculate_hu_value(position, card)
-                if value >= best_value:
-                    best_value = value
-                    best_card = card
-                    best_index = i
-                    
-        if best_card:
+        # 摸牌后手牌会变成8张，所以先取出当前7张手牌的听牌索引
+        ting_cards = self.get_ting_cards(position)
+
+        # 1. 检查公共牌区是否有能胡的牌，价值相同时取最右边的
+        candidates = [(i, card) for i, card in enumerate(self.public_cards)
+                      if card is not None and card in ting_cards]
+        if candidates:
+            values = self.calculate_hu_values(
+                position, [card for _, card in candidates])
+            best = len(values) - 1 - int(np.argmax(values[::-1]))
+            best_index, best_card = candidates[best]
             self.hu_sequences[position].append(best_card)
             self.hu_card(position, best_card, card_index=best_index, is_bu_hu=is_bu_hu)
-            return
+            return 'hu', best_card
             
         # 如果是补胡状态，到这里就结束了（不需要摸牌）
         if is_bu_hu:
-            return
+            return None, None
             
         # 2. 摸牌
-        card = self.draw_card()
-        if not card:
-            return  # 牌堆空了
+        card = self.draw_card(position)
+        if card is None:
+            return None, None  # 牌堆空了
             
-        if self.can_hu(position, card):
+        if card in ting_cards:
+            # 胡掉的牌不留在手牌里
+            self._remove_hand_card(position, card)
             self.hu_sequences[position].append(card)
             self.hu_card(position, card)
-        elif card[0] == -1:  # 问号牌的点数是-1
-            # 从牌堆顶部4张牌中选择价值最高的
-            values = []
-            for i, possible_card in enumerate(self.remaining_cards[:4]):
-                if self.can_hu(position, possible_card):
-                    values.append((i, possible_card, 
-                                 self.calculate_hu_value(position, possible_card)))
-                else:
-                    values.append((i, possible_card, -1))
+            return 'hu', card
+        elif card == QUESTION_MARK and len(self.remaining_cards) > 0:
+            # (牌堆已经摸完时没有牌可选，问号和普通牌一样直接打出)
+            # 问号用来选牌，先从手牌中拿掉，候选牌按摸牌前的7张手牌估值
+            self.use_question_mark(position)
+            # 从牌堆顶部4张牌中选择价值最高的，不能胡的牌价值记为-1
+            top_cards = self.remaining_cards[:4]
+            values = np.full(len(top_cards), -1.0)
+            hu_indices = [i for i, possible_card in enumerate(top_cards)
+                          if possible_card in ting_cards]
+            if hu_indices:
+                values[hu_indices] = self.calculate_hu_values(
+                    position, [top_cards[i] for i in hu_indices])
             
             # 选择价值最高的牌的索引
-            best_index, best_card, best_value = max(values, key=lambda x: x[2])
+            best_index = int(np.argmax(values))
+            best_card = top_cards[best_index]
+            best_value = values[best_index]
             
             # 选择这张牌并从牌堆中移除
             self.select_from_top_four(position, best_index)
             
             # 如果可以胡，就胡掉
             if best_value > -1:
+                self._remove_hand_card(position, best_card)
                 self.hu_sequences[position].append(best_card)
                 self.hu_card(position, best_card)
-            else:
-                # 否则打出去
-                self.play_card(position, best_card)
-        else:
-            # 直接打出
-            self.play_card(position, card)
+                return 'hu', best_card
+            # 否则打出去
+            self.play_card(position, best_card)
+            return 'play', best_card
+        # 直接打出
+        self.play_card(position, card)
+        return 'play', card
 
     def card_play_init(self, card_play_data):
-        self.info_sets['first'].player_hand_cards = \
-            card_play_data['first'][:7]
-        self.info_sets['first_up'].player_hand_cards = \
-            card_play_data['first_up'][:7]
-        self.info_sets['first_down'].player_hand_cards = \
-            card_play_data['first_down'][:7]
-        self.info_sets['first_across'].player_hand_cards = \
-            card_play_data['first_across'][:7]
-        
+        """发牌，card_play_data 中的牌都是整数编码(见 cards.py)"""
+        self.info_sets['first'].hand = \
+            HandCards(card_play_data['first'][:7])
+        self.info_sets['first_up'].hand = \
+            HandCards(card_play_data['first_up'][:7])
+        self.info_sets['first_down'].hand = \
+            HandCards(card_play_data['first_down'][:7])
+        self.info_sets['first_across'].hand = \
+            HandCards(card_play_data['first_across'][:7])
+        for position in self.info_sets:
+            self._hand_changed(position)
+        self._rebuild_hand_views()
+        self.discard_cards = []
+        # 换牌时增量更新手牌哈希，先按发好的手牌算一次
+        self._rebuild_state_hash()
+        if self.recorder is not None:
+            self.recorder.begin_game(card_play_data, self.beans)
         
         # 执行换牌
         self.exchange_cards()
         
         # 发一张牌到公共牌区最左边
-        self.public_cards = [None] * 4
+        self.public_cards = PublicCards()
         self.public_cards[0] = card_play_data['first_public_card']
+        self.remaining_cards = DrawPile(card_play_data['remaining'])
         
         # ... 原有代码保持不变 ...
         self.get_acting_player_position()
@@ -183,20 +349,27 @@ class GameEnv(object):
     def exchange_cards(self):
         """执行换牌操作"""
         # 1. 随机决定换牌方向
-        exchange_direction = random.choice([
+        exchange_directions = [
             self.EXCHANGE_UP,
             self.EXCHANGE_ACROSS,
             self.EXCHANGE_DOWN
-        ])
+        ]
+        exchange_direction = exchange_directions[
+            self.rng.integers(len(exchange_directions))]
+        if self.recorder is not None:
+            self.recorder.set_exchange_direction(exchange_direction)
         
         # 2. 每个玩家选择两张牌换出去
         exchange_cards = {}
         for position in ['first', 'first_up', 'first_across', 'first_down']:
-            hand_cards = self.info_sets[position].player_hand_cards
-            cards_to_exchange = random.sample(hand_cards, 2)
+            hand = self.info_sets[position].hand
+            hand_cards = hand.codes().tolist()
+            cards_to_exchange = [hand_cards[i] for i in
+                                 self.rng.choice(len(hand_cards), 2, replace=False)]
             exchange_cards[position] = cards_to_exchange
             for card in cards_to_exchange:
-                hand_cards.remove(card)
+                self._remove_hand_card(position, card)
+                self._record(position, gr.EXCHANGE, card)
         
         # 3. 执行换牌
         for position in ['first', 'first_up', 'first_across', 'first_down']:
@@ -204,9 +377,8 @@ class GameEnv(object):
             # 比如 position 是 'first'，exchange_direction 是 'up'
             # 那么 target_position 就会是 'first_up'
             target_position = self.get_relative_position(position, exchange_direction)
-            self.info_sets[target_position].player_hand_cards.extend(
-                exchange_cards[position]
-            )
+            for card in exchange_cards[position]:
+                self._add_hand_card(target_position, card)
 
     def game_done(self):
         if len(self.info_sets['landlord'].player_hand_cards) == 0 or \
@@ -245,67 +417,84 @@ class GameEnv(object):
         
         # 检查是否需要进入补胡状态
         if len(self.remaining_cards) == 0 and not self.bu_hu_state:
-            self.bu_hu_state = True
-            self.bu_hu_starter = current_player
+            self._start_bu_hu(current_player)
             
         # 补胡状态的处理
         if self.bu_hu_state:
-            self.handle_auto_hu(current_player, is_bu_hu=True)
-            
-            # 找下一个活跃玩家
-            next_player = self.get_relative_position(current_player, self.EXCHANGE_DOWN)
-            while next_player not in self.active_players:
-                next_player = self.get_relative_position(next_player, self.EXCHANGE_DOWN)
-            self.acting_player_position = next_player
-            
-            # 如果回到了开始补胡的玩家，结束补胡
-            if next_player == self.bu_hu_starter:
-                self.bu_hu_state = False
-                self.game_over = True
+            self._bu_hu_turn(current_player)
             return
             
         # 正常游戏流程
         if current_player in self.auto_hu_players:
-            self.handle_auto_hu(current_player)
-        else:
-            # 原有的step逻辑
-            action = self.players[current_player].act(self.game_infoset)
-            if action[1] == 'hu':
-                self.auto_hu_players.add(current_player)
-
-    def bu_hu_step(self):
-        """处理补胡阶段"""
-        # 直接让当前玩家尝试胡牌
-        self.handle_auto_hu(self.acting_player_position)
-        
-        # 找下一个活跃玩家
-        next_player = self.get_relative_position(self.acting_player_position, self.EXCHANGE_DOWN)
-        while next_player not in self.active_players:
-            next_player = self.get_relative_position(next_player, self.EXCHANGE_DOWN)
-        self.acting_player_position = next_player
-        
-        # 如果回到了开始补胡的玩家，结束补胡
-        if self.acting_player_position == self.bu_hu_starter:
-            self.bu_hu_state = False
-            self.game_over = True
-                # ... 原有代码继续 ...
+            self._auto_hu_turn(current_player)
+            return
+        # 原有的step逻辑
+        action = self.players[current_player].act(self.game_infoset)
+        if action[1] == 'hu':
+            self.auto_hu_players.add(current_player)
+            self._record(current_player, gr.DECLARE_HU)
+        self.get_acting_player_position()
+
+    def _auto_hu_turn(self, position):
+        """已胡牌玩家的自动回合：自动摸牌、胡牌或出牌，然后轮到下家
+        Returns:
+            handle_auto_hu 的结果
+        """
+        event = self.handle_auto_hu(position)
+        self.get_acting_player_position()
+        return event
+
+    def _start_bu_hu(self, position):
+        """牌堆摸完，从这个玩家开始补胡"""
+        self.bu_hu_state = True
+        self.bu_hu_starter = position
+        self._record(position, gr.BU_HU_START)
+
+    def _bu_hu_turn(self, position):
+        """补胡阶段的一个回合：玩家只从公共牌区胡牌，然后轮到下一个活跃玩家，
+        回到开始补胡的玩家时牌局结束
+        Returns:
+            handle_auto_hu 的结果
+        """
+        event = self.handle_auto_hu(position, is_bu_hu=True)
 
-    def bu_hu_step(self):
-        """处理补胡阶段"""
-        # 直接让当前玩家尝试胡牌（传入is_bu_hu=True）
-        self.handle_auto_hu(self.acting_player_position, is_bu_hu=True)
-        
         # 找下一个活跃玩家
-        next_player = self.get_relative_position(self.acting_player_position, self.EXCHANGE_DOWN)
+        next_player = self.get_relative_position(position, self.EXCHANGE_DOWN)
         while next_player not in self.active_players:
             next_player = self.get_relative_position(next_player, self.EXCHANGE_DOWN)
         self.acting_player_position = next_player
-        
+        self._record(next_player, gr.TURN)
+
         # 如果回到了开始补胡的玩家，结束补胡
-        if self.acting_player_position == self.bu_hu_starter:
+        if next_player == self.bu_hu_starter:
             self.bu_hu_state = False
             self.game_over = True
+            self._record(position, gr.BU_HU_END)
+        return event
 
+    def fast_forward(self):
+        """连续处理所有不需要智能体决策的回合(已胡牌玩家的自动回合和补胡阶段)，
+        直到轮到需要决策的玩家或者牌局结束，省去逐步调用 step 和生成观测的开销
+        Returns:
+            list: 按顺序发生的事件，每个是(玩家位置, 动作, 牌)，
+                  动作和牌见 handle_auto_hu 的返回值
+        """
+        events = []
+        while not self.game_over:
+            position = self.acting_player_position
+
+            # 检查是否需要进入补胡状态
+            if len(self.remaining_cards) == 0 and not self.bu_hu_state:
+                self._start_bu_hu(position)
+
+            if self.bu_hu_state:
+                action, card = self._bu_hu_turn(position)
+            elif position in self.auto_hu_players:
+                action, card = self._auto_hu_turn(position)
+            else:
+                break  # 需要智能体决策
+            events.append((position, action, card))
+        return events
 
     def get_relative_position(self, position, relation):
         """获取玩家的相对位置
@@ -344,6 +533,7 @@ class GameEnv(object):
                 self.acting_player_position, 
                 self.EXCHANGE_DOWN
             )
+            self._record(self.acting_player_position, gr.TURN)
         
         return self.acting_player_position
 
@@ -351,9 +541,7 @@ class GameEnv(object):
     def update_acting_player_hand_cards(self, action):
         if action != []:
             for card in action:
-                self.info_sets[
-                    self.acting_player_position].player_hand_cards.remove(card)
-            self.info_sets[self.acting_player_position].player_hand_cards.sort()
+                self._remove_hand_card(self.acting_player_position, card)
 
 
 
@@ -365,6 +553,11 @@ class GameEnv(object):
         self.acting_player_position = None
         self.player_utility_dict = None
 
+        # 上一局的胡牌玩家和补胡状态
+        self.auto_hu_players = set()
+        self.bu_hu_state = False
+        self.bu_hu_starter = None
+
         self.last_move_dict = {'first': [],
                                'first_up': [],
                                'first_down': [],
@@ -391,7 +584,85 @@ class GameEnv(object):
             'first_across': []
         }
 
+        self.ting_cards = {
+            'first': None,
+            'first_up': None,
+            'first_down': None,
+            'first_across': None
+        }
+
+        # 牌堆、公共牌区和废牌区
+        self.remaining_cards = DrawPile()
+        self.public_cards = PublicCards()
+        self.discard_cards = []
+
+        self._rebuild_hand_views()
+        self._rebuild_state_hash()
 
+    def snapshot(self):
+        """保存当前牌局状态，用于搜索和模拟时反复回到同一个局面
+        保存的内容：手牌、听牌索引、牌堆、公共牌区、废牌区、出牌记录、胡牌序列、豆子、
+        已胡牌玩家、补胡状态、当前玩家、是否结束、Zobrist哈希以及随机数生成器的状态，
+        全部是不可变的扁平元组，可以多次交给 restore
+        Returns:
+            tuple: 快照
+        """
+        if self._rng_state_version != self._rng_version:
+            self._rng_state = self._rng.bit_generator.state
+            self._rng_state_version = self._rng_version
+        info_sets = self.info_sets
+        beans = self.beans
+        hu_sequences = self.hu_sequences
+        ting_cards = self.ting_cards
+        return (tuple([info_sets[pos].hand.get_state() for pos in POSITIONS]),
+                tuple([ting_cards[pos] for pos in POSITIONS]),
+                self.remaining_cards.get_state(),
+                self.public_cards.get_state(),
+                tuple(self.discard_cards),
+                tuple([tuple(self.played_cards[pos]) for pos in POSITIONS]),
+                tuple([tuple(self.last_move_dict[pos]) for pos in POSITIONS]),
+                tuple([tuple(move) for move in self.card_play_action_seq]),
+                tuple([tuple(hu_sequences[pos]) for pos in POSITIONS]),
+                tuple([beans[pos] for pos in POSITIONS]),
+                frozenset(self.auto_hu_players),
+                self.bu_hu_state,
+                self.bu_hu_starter,
+                self.acting_player_position,
+                self.game_over,
+                self._hands_hash,
+                self._discard_hash,
+                self._rng_state)
+
+    def restore(self, token):
+        """恢复到 snapshot 保存的牌局状态
+        Args:
+            token: snapshot 的返回值
+        """
+        (hands, ting_cards, remaining_cards, public_cards, discard_cards,
+         played_cards, last_moves, card_play_action_seq, hu_sequences, beans, auto_hu_players, self.bu_hu_state,
+         self.bu_hu_starter, self.acting_player_position, self.game_over,
+         self._hands_hash, self._discard_hash, rng_state) = token
+        for i, pos in enumerate(POSITIONS):
+            self.info_sets[pos].hand.set_state(hands[i])
+            self.ting_cards[pos] = ting_cards[i]
+            self.hu_sequences[pos] = list(hu_sequences[i])
+            self.beans[pos] = beans[i]
+            self.played_cards[pos] = list(played_cards[i])
+            self.last_move_dict[pos] = list(last_moves[i])
+        self.remaining_cards.set_state(remaining_cards)
+        self.public_cards.set_state(public_cards)
+        self.discard_cards = list(discard_cards)
+        # 换一个新列表，观测的历史编码(ActionHistory)会从头同步
+        self.card_play_action_seq = [list(move) for move in card_play_action_seq]
+        self.auto_hu_players = set(auto_hu_players)
+        # 派生字段等到下次 get_infoset 时再按恢复后的手牌重新生成
+        self._hand_views_valid = False
+        if rng_state is not self._rng_state or \
+                self._rng_state_version != self._rng_version:
+            self._rng.bit_generator.state = rng_state
+            self._rng_version += 1
+            self._rng_state = rng_state
+            self._rng_state_version = self._rng_version
 
     def get_infoset(self):
 
@@ -412,16 +683,15 @@ class GameEnv(object):
         self.info_sets[
             self.acting_player_position].last_move_dict = self.last_move_dict
 
+        # 由手牌派生的字段是增量维护的，直接引用
+        if not self._hand_views_valid:
+            self._rebuild_hand_views()
+
         self.info_sets[self.acting_player_position].num_cards_left_dict = \
-            {pos: len(self.info_sets[pos].player_hand_cards)
-             for pos in ['first', 'first_up', 'first_down', 'first_across']}
+            self.num_cards_left_dict
 
-        self.info_sets[self.acting_player_position].other_hand_cards = []
-        for pos in ['first', 'first_up', 'first_down', 'first_across']:
-            if pos != self.acting_player_position:
-                self.info_sets[
-                    self.acting_player_position].other_hand_cards += \
-                    self.info_sets[pos].player_hand_cards
+        self.info_sets[self.acting_player_position].other_hand_cards = \
+            self._other_hand_cards[self.acting_player_position]
 
         self.info_sets[self.acting_player_position].played_cards = \
             self.played_cards
@@ -430,35 +700,45 @@ class GameEnv(object):
             self.card_play_action_seq
 
         self.info_sets[
-            self.acting_player_position].all_handcards = \
-            {pos: self.info_sets[pos].player_hand_cards
-             for pos in ['first', 'first_up', 'first_down', 'first_across']}
+            self.acting_player_position].all_handcards = self.all_handcards
 
-        return deepcopy(self.info_sets[self.acting_player_position])
+        return self.info_sets[self.acting_player_position].view()
 
     def draw_card(self, position):
         """从牌堆摸一张牌
         1. 从牌堆顶部摸一张牌加入手牌
         2. 公共牌区的牌右移一位
         3. 最右边的牌进入废牌区
+        Returns:
+            摸到的牌，牌堆已空时返回None
         """
+        if len(self.remaining_cards) == 0:
+            return None
+
         # 1. 摸牌
-        card = self.remaining_cards[0]  # 获取牌堆顶部的牌
-        self.remaining_cards = self.remaining_cards[1:]  # 移除牌堆顶部的牌
-        self.info_sets[position].player_hand_cards.append(card)  # 将摸到的牌加入玩家手牌
-
-        # 2. 公共牌区右移
-        # 保存最右边的牌（如果有的话）
-        rightmost_card = self.public_cards[3]
-        # 右移操作
-        for i in range(3, 0, -1):  # 从右往左移动
-            self.public_cards[i] = self.public_cards[i-1]
-        # 最左边设为空
-        self.public_cards[0] = None
+        card = self.remaining_cards.pop()  # 摸走牌堆顶部的牌
+        self._add_hand_card(position, card)  # 将摸到的牌加入玩家手牌
+        self._record(position, gr.DRAW, card)
+
+        # 2. 公共牌区右移，最左边空出来，最右边的牌被挤出
+        rightmost_card = self.public_cards.shift_right()
 
         # 3. 最右边的牌进入废牌区（如果有的话）
         if rightmost_card is not None:
-            self.discard_cards.append(rightmost_card)
+            self._discard_card(rightmost_card)
+
+        return card
+
+    def _discard_card(self, card):
+        """把一张牌放进废牌区，并增量更新哈希"""
+        self._discard_hash ^= zobrist.DISCARD_KEYS[len(self.discard_cards)][card]
+        self.discard_cards.append(card)
+
+    def use_question_mark(self, position):
+        """用掉手里的问号：问号从手牌进入废牌区，之后从牌堆顶部4张牌中选一张(见 select_from_top_four)"""
+        self._remove_hand_card(position, QUESTION_MARK)
+        self._discard_card(QUESTION_MARK)
+        self._record(position, gr.USE_QUESTION_MARK, QUESTION_MARK)
 
     def eat_card(self, position, card_index):
         """从公共牌区吃牌
@@ -470,15 +750,10 @@ class GameEnv(object):
         2. 该位置左边的牌右移一位
         3. 该位置右边的牌保持不动
         """
-        # 1. 将指定位置的牌加入手牌
-        eaten_card = self.public_cards[card_index]  # 获取指定位置的牌
-        self.info_sets[position].player_hand_cards.append(eaten_card)  # 加入手牌
-
-        # 2. 该位置左边的牌右移
-        for i in range(card_index, 0, -1):  # 从被吃牌的位置向左遍历
-            self.public_cards[i] = self.public_cards[i-1]
-        # 最左边设为空
-        self.public_cards[0] = None
+        # 1. 取走指定位置的牌加入手牌，该位置左边的牌右移
+        eaten_card = self.public_cards.take(card_index)
+        self._add_hand_card(position, eaten_card)  # 加入手牌
+        self._record(position, gr.EAT + card_index, eaten_card)
 
         # 3. 该位置右边的牌保持不动
         # (不需要额外操作)
@@ -493,21 +768,40 @@ class GameEnv(object):
         """
         # 将玩家加入自动胡牌集合
         self.auto_hu_players.add(position)
+
+        if card_index is None:
+            self._record(position, gr.HU_HAND, card)
+        elif is_bu_hu:
+            self._record(position, gr.BU_HU + card_index, card)
+        else:
+            self._record(position, gr.HU_PUBLIC, card)
         
         if is_bu_hu and card_index is not None:
             # 补胡时，和吃牌一样：左边的牌右移，右边的牌不动
-            for i in range(card_index, 0, -1):
-                self.public_cards[i] = self.public_cards[i-1]
-            self.public_cards[0] = None
+            self.public_cards.take(card_index)
         elif len(self.remaining_cards) > 0:
             # 非补胡时，摸新牌到最左边
-            self.public_cards[0] = self.remaining_cards[0]
-            self.remaining_cards = self.remaining_cards[1:]
+            self.public_cards[0] = self.remaining_cards.pop()
         
         # 检查是否游戏结束
         if len(self.auto_hu_players) == len(self.active_players):
             self.game_over = True
 
+    def _remove_hand_card(self, position, card):
+        """从玩家手牌中移除一张牌(编码)，并增量更新派生字段和哈希"""
+        hand = self.info_sets[position].hand
+        hand.remove(card)
+        self._hands_hash ^= zobrist.HAND_KEYS[SEAT_INDEX[position]][card][
+            int(hand.counts[card])]
+        self._hand_changed(position)
+        if self._hand_views_valid:
+            card = CODE2CARD[card]
+            self.num_cards_left_dict[position] -= 1
+            self.all_handcards[position].remove(card)
+            for pos, cards in self._other_hand_cards.items():
+                if pos != position:
+                    cards.remove(card)
+
     def play_card(self, position, card):
         """打出一张牌
         Args:
@@ -518,40 +812,40 @@ class GameEnv(object):
         2. 将这张牌放到公共牌区最左边
         3. 如果是问号，返回True表示需要进行问号的选牌
         """
-        # 1. 从玩家手牌中移除打出的牌
-        self.info_sets[position].player_hand_cards.remove(card)
+        # 1. 从玩家手牌中移除打出的牌，记进出牌记录(观测特征用)
+        self._remove_hand_card(position, card)
+        self._record(position, gr.PLAY, card)
+        self.played_cards[position].append(card)
+        self.last_move_dict[position] = [card]
+        self.card_play_action_seq.append([card])
         
         # 2. 将打出的牌放到公共牌区最左边
         self.public_cards[0] = card
         
         # 3. 如果是问号，返回True
-        return card == (1, -1)  # 问号的表示是(1, -1)
+        return card == QUESTION_MARK
             
     def select_from_top_four(self, position, card_choice):
-    """     
-   在游戏流程中：
-    result = env.play_card(position, card)
-    if result == "question_mark":
-        # 玩家选择一张牌（0-3）
-        chosen_card = env.handle_question_mark(position, card_choice)
-        # 玩家选择胡牌或出牌
-        if want_to_hu:
-            env.hu_card(position, chosen_card)
-        else:
-            env.play_card(position, chosen_card) 
-        """
         """问号的选牌流程：从牌堆顶部4张牌中选择一张
         Args:
             position: 玩家位置
             card_choice: 选择的牌的索引(0-3)
+
+        在游戏流程中：
+            result = env.play_card(position, card)
+            if result == "question_mark":
+                # 玩家选择一张牌（0-3）
+                chosen_card = env.handle_question_mark(position, card_choice)
+                # 玩家选择胡牌或出牌
+                if want_to_hu:
+                    env.hu_card(position, chosen_card)
+                else:
+                    env.play_card(position, chosen_card)
         """
-        # 获取牌堆顶部4张牌，选择一张加入手牌
-        chosen_card = self.remaining_cards[card_choice]
-        self.info_sets[position].player_hand_cards.append(chosen_card)
-        
-        # 从牌堆中移除被选中的牌，其他牌保持原顺序
-        self.remaining_cards = (self.remaining_cards[:card_choice] + 
-                              self.remaining_cards[card_choice + 1:])
+        # 从牌堆顶部4张牌中取走选中的牌加入手牌，其他牌保持原顺序
+        chosen_card = self.remaining_cards.take(card_choice)
+        self._add_hand_card(position, chosen_card)
+        self._record(position, gr.SELECT + card_choice, chosen_card)
 
     def get_relative_position(self, position, relation):
         """获取玩家的相对位置
@@ -579,17 +873,34 @@ class InfoSet(object):
     includes all the information in the current situation,
     such as the hand cards of the three players, the
     historical moves, etc.
+
+    The engine keeps one InfoSet per position and hands
+    agents a read-only view of it (see `view`), so nothing
+    is copied per step. Agents that need to modify the
+    infoset should take a `snapshot` first.
     """
+    __slots__ = ('player_position', 'hand', 'num_cards_left_dict',
+                 'card_play_action_seq', 'other_hand_cards',
+                 'legal_actions', 'last_move', 'last_two_moves',
+                 'last_move_dict', 'played_cards', 'all_handcards',
+                 'bomb_num')
+
+    # The fields holding lists or dicts, wrapped in views
+    _container_fields = ('num_cards_left_dict', 'card_play_action_seq',
+                         'other_hand_cards', 'legal_actions', 'last_move',
+                         'last_two_moves', 'last_move_dict', 'played_cards',
+                         'all_handcards')
+
     def __init__(self, player_position):
-        # The player position, i.e., landlord, landlord_down, or landlord_up
+        # The player position, i.e., first, first_up, first_across or first_down
         self.player_position = player_position
-        # The hand cands of the current player. A list.
-        self.player_hand_cards = None
+        # The hand cards of the current player. A HandCards count vector.
+        self.hand = HandCards()
         # The number of cards left for each player. It is a dict with str-->int 
         self.num_cards_left_dict = None
         # The historical moves. It is a list of list
         self.card_play_action_seq = None
-        # The union of the hand cards of the other two players for the current player 
+        # The union of the hand cards of the other players for the current player 
         self.other_hand_cards = None
         # The legal actions for the current move. It is a list of list
         self.legal_actions = None
@@ -606,7 +917,41 @@ class InfoSet(object):
         # The number of bombs played so far
         self.bomb_num = None
 
-        self.bomb_num = None
+    @property
+    def player_hand_cards(self):
+        """The hand cards of the current player as a list of
+        (point, suit) tuples, built on demand from the count vector."""
+        return self.hand.to_list()
 
-        # The number of bombs played so far
-        self.bomb_num = None
+    @player_hand_cards.setter
+    def player_hand_cards(self, cards):
+        self.hand = HandCards.from_cards(cards)
+
+    def view(self):
+        """
+        Return a read-only view of this infoset. Lists and
+        dicts are wrapped rather than copied, so the view
+        shares (and follows) the engine state. The hand is a
+        fixed-size count vector and is simply copied.
+        """
+        infoset = InfoSet.__new__(InfoSet)
+        infoset.player_position = self.player_position
+        infoset.hand = self.hand.copy()
+        infoset.bomb_num = self.bomb_num
+        for field in self._container_fields:
+            setattr(infoset, field, freeze(getattr(self, field)))
+        return infoset
+
+    def snapshot(self):
+        """
+        Return an independent, mutable deep copy of this
+        infoset (or of a view of it), for agents that modify
+        the infoset in place.
+        """
+        infoset = InfoSet.__new__(InfoSet)
+        infoset.player_position = self.player_position
+        infoset.hand = self.hand.copy()
+        infoset.bomb_num = self.bomb_num
+        for field in self._container_fields:
+            setattr(infoset, field, thaw(getattr(self, field)))
+        return infoset
@@ -0,0 +1,248 @@
+"""
+牌局记录模块。
+把自我对弈的牌局存成紧凑的定长二进制格式，用于回放分析和生成数据集。
+
+一份记录由两个文件组成：
+1. <path>.games: 每局一条定长记录(GAME_DTYPE)，包括发牌顺序、换牌方向、
+   开局时的豆子以及这一局的事件在事件文件中的位置
+2. <path>.events: 所有牌局的事件流，每个事件是(座位, 动作, 牌)三个uint8
+
+座位是 POSITIONS 中的下标，牌是整数编码(见 cards.py)，没有牌时是 NO_CARD。
+一局一般不到两百个事件，每局约六百多字节，一亿局在几十GB左右。
+
+用法：
+- 写：把 GameRecordWriter 赋给 GameEnv.recorder，引擎在发牌、换牌、摸牌、
+  吃牌、出牌、用问号选牌、胡牌、补胡以及轮到下一个玩家时自动写入事件，
+  下一局开始或 close 时写完上一局
+- 读：GameRecordReader 用内存映射打开文件，按下标取出 GameRecord
+- 回放：replay 在新的 GameEnv 上重新发牌并依次执行事件，可以停在任意事件之前
+"""
+import collections
+
+import numpy as np
+
+from douzero.env.cards import HandCards
+from douzero.env.card_piles import DrawPile, PublicCards
+
+# 座位顺序，和 GameEnv 一致
+POSITIONS = ('first', 'first_up', 'first_across', 'first_down')
+EXCHANGE_DIRECTIONS = ('up', 'across', 'down')
+
+HAND_SIZE = 7
+DECK_SIZE = 84  # 4张癞子、4张问号、12张8和64张其他点数的牌
+NO_CARD = 255
+NO_DIRECTION = 255
+
+# 动作编码
+EXCHANGE = 0      # 换牌：座位把这张牌换给换牌方向上的玩家
+DRAW = 1          # 从牌堆摸牌
+PLAY = 2          # 把手牌打到公共牌区最左边
+HU_HAND = 3       # 胡手里的牌(摸到或问号选到的牌)，牌离开手牌
+HU_PUBLIC = 4     # 非补胡时胡公共牌区的牌
+BU_HU = 5         # 5-8：补胡时胡公共牌区第0-3个位置的牌
+EAT = 9           # 9-12：吃公共牌区第0-3个位置的牌
+SELECT = 13       # 13-16：问号选牌时拿走牌堆顶第0-3张牌
+DECLARE_HU = 17   # 智能体选择胡牌，之后由引擎自动行动
+BU_HU_START = 18  # 牌堆摸完，从这个座位开始补胡
+BU_HU_END = 19    # 补胡轮完一圈，牌局结束
+USE_QUESTION_MARK = 20  # 用掉手里的问号，问号进入废牌区
+TURN = 21         # 轮到这个座位行动，回放时据此恢复当前玩家
+
+GAME_DTYPE = np.dtype([('deal', 'u1', (DECK_SIZE,)),
+                       ('deal_size', 'u1'),
+                       ('exchange_direction', 'u1'),
+                       ('beans', '<i8', (len(POSITIONS),)),
+                       ('event_start', '<u8'),
+                       ('num_events', '<u4')])
+EVENT_DTYPE = np.dtype([('seat', 'u1'), ('action', 'u1'), ('card', 'u1')])
+
+GameRecord = collections.namedtuple(
+    'GameRecord', ['deal', 'exchange_direction', 'beans', 'events'])
+
+
+def _card_code(card):
+    return NO_CARD if card is None else card
+
+
+def _code_card(code):
+    return None if code == NO_CARD else code
+
+
+class GameRecordWriter(object):
+    """流式写入牌局记录，每局结束后追加到文件末尾"""
+
+    def __init__(self, path):
+        self._games = open(path + '.games', 'ab')
+        self._events_file = open(path + '.events', 'ab')
+        self._event_start = self._events_file.tell() // EVENT_DTYPE.itemsize
+        self._game = None
+        self._events = bytearray()
+
+    def begin_game(self, card_play_data, beans):
+        """开始记录新的一局，上一局没写完的先写完
+        Args:
+            card_play_data: 发牌数据，同 GameEnv.card_play_init
+            beans: 开局时每个玩家的豆子
+        """
+        self.end_game()
+        deal = [card for pos in POSITIONS
+                for card in card_play_data[pos][:HAND_SIZE]]
+        deal.append(card_play_data['first_public_card'])
+        deal.extend(card_play_data['remaining'])
+        if len(deal) > DECK_SIZE:
+            raise ValueError('a deal has at most {} cards'.format(DECK_SIZE))
+        game = np.zeros((), dtype=GAME_DTYPE)
+        game['deal'][:] = NO_CARD
+        game['deal'][:len(deal)] = [_card_code(card) for card in deal]
+        game['deal_size'] = len(deal)
+        game['exchange_direction'] = NO_DIRECTION
+        game['beans'] = [beans[pos] for pos in POSITIONS]
+        self._game = game
+
+    def set_exchange_direction(self, direction):
+        if self._game is not None:
+            self._game['exchange_direction'] = EXCHANGE_DIRECTIONS.index(direction)
+
+    def record(self, position, action, card=None):
+        """记录一个事件"""
+        if self._game is not None:
+            self._events += bytes((POSITIONS.index(position), action, _card_code(card)))
+
+    def end_game(self):
+        """写完当前这一局"""
+        if self._game is None:
+            return
+        num_events = len(self._events) // EVENT_DTYPE.itemsize
+        self._game['event_start'] = self._event_start
+        self._game['num_events'] = num_events
+        self._events_file.write(self._events)
+        self._games.write(self._game.tobytes())
+        self._event_start += num_events
+        self._game = None
+        self._events = bytearray()
+
+    def close(self):
+        self.end_game()
+        self._games.close()
+        self._events_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class GameRecordReader(object):
+    """用内存映射读取牌局记录"""
+
+    def __init__(self, path):
+        self.games = _memmap(path + '.games', GAME_DTYPE)
+        self.events = _memmap(path + '.events', EVENT_DTYPE)
+
+    def __len__(self):
+        return len(self.games)
+
+    def __getitem__(self, index):
+        game = self.games[index]
+        start = int(game['event_start'])
+        deal = game['deal'][:game['deal_size']].tolist()
+        direction = int(game['exchange_direction'])
+        return GameRecord(
+            deal=deal,
+            exchange_direction=None if direction == NO_DIRECTION
+            else EXCHANGE_DIRECTIONS[direction],
+            beans={pos: int(beans) for pos, beans in zip(POSITIONS, game['beans'])},
+            events=self.events[start:start + int(game['num_events'])])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def _memmap(path, dtype):
+    # 空文件不能做内存映射
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        if f.tell() == 0:
+            return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+def replay(record, num_events=None, game_env=None):
+    """按记录重建牌局，停在第num_events个事件之前(默认执行全部事件)
+    Args:
+        record: GameRecord
+        num_events: 执行的事件数
+        game_env: 在这个 GameEnv 上回放，默认新建一个
+    Returns:
+        GameEnv: 重建的牌局
+    """
+    if game_env is None:
+        from douzero.env.game import GameEnv
+        game_env = GameEnv({})
+    env = game_env
+    # 回放时不再重复记录
+    recorder, env.recorder = env.recorder, None
+
+    # 1. 发牌
+    env.reset()
+    env.beans = dict(record.beans)
+    deal = record.deal
+    for i, pos in enumerate(POSITIONS):
+        env.info_sets[pos].hand = HandCards(deal[i * HAND_SIZE:(i + 1) * HAND_SIZE])
+        env._hand_changed(pos)
+    env._rebuild_hand_views()
+    num_dealt = len(POSITIONS) * HAND_SIZE
+    env.public_cards = PublicCards()
+    env.public_cards[0] = deal[num_dealt]
+    env.remaining_cards = DrawPile(deal[num_dealt + 1:])
+    env.discard_cards = []
+    env.acting_player_position = POSITIONS[0]
+    env._rebuild_state_hash()
+
+    # 2. 依次执行事件
+    events = record.events if num_events is None else record.events[:num_events]
+    for seat, action, code in events.tolist():
+        _apply_event(env, record, POSITIONS[seat], action, _code_card(code))
+    env.recorder = recorder
+    return env
+
+
+def _apply_event(env, record, position, action, card):
+    if action == TURN:
+        env.acting_player_position = position
+    elif action == EXCHANGE:
+        target = env.get_relative_position(position, record.exchange_direction)
+        env._remove_hand_card(position, card)
+        env._add_hand_card(target, card)
+    elif action == DRAW:
+        env.draw_card(position)
+    elif action == PLAY:
+        env.play_card(position, card)
+    elif action == HU_HAND:
+        env._remove_hand_card(position, card)
+        env.hu_sequences[position].append(card)
+        env.hu_card(position, card)
+    elif action == HU_PUBLIC:
+        env.hu_sequences[position].append(card)
+        env.hu_card(position, card, card_index=0)
+    elif BU_HU <= action < BU_HU + 4:
+        env.hu_sequences[position].append(card)
+        env.hu_card(position, card, card_index=action - BU_HU, is_bu_hu=True)
+    elif EAT <= action < EAT + 4:
+        env.eat_card(position, action - EAT)
+    elif SELECT <= action < SELECT + 4:
+        env.select_from_top_four(position, action - SELECT)
+    elif action == USE_QUESTION_MARK:
+        env.use_question_mark(position)
+    elif action == DECLARE_HU:
+        env.auto_hu_players.add(position)
+    elif action == BU_HU_START:
+        env.bu_hu_state = True
+        env.bu_hu_starter = position
+    elif action == BU_HU_END:
+        env.bu_hu_state = False
+        env.game_over = True
+    else:
+        raise ValueError('unknown action code {}'.format(action))
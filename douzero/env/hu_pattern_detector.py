@@ -6,8 +6,285 @@
 1. 检测是否可以胡牌
 2. 计算胡牌的番型倍数
 3. 判断具体的胡牌类型(如：独一无二、君临天下等)
+
+查表说明：
+不含癞子的8张牌，番型只取决于各点数的张数(点数直方图)以及花色情况
+(杂色/同色/同花)。8张牌在6-A共9个点数上的直方图只有C(16,8)=12870种，
+因此可以离线把 直方图×花色情况 的番型全部算好，存成内存映射文件，
+运行时按直方图的组合编号直接查表。
 """
+import os
+import multiprocessing as mp
+
+import numpy as np
+
+from douzero.env.cards import (NUM_NORMAL_CARDS, JOKER, QUESTION_MARK, CARD2CODE,
+                               CODE_POINT, CODE_POINT_INDEX, CODE_SUIT, CODE_COLOR)
+from douzero.env.detector_cache import cached_detector, hu_cache_key, ting_cache_key
+
+# 番型编号，编号顺序即 _check_pattern 的判断顺序，0表示不能胡牌
+PATTERN_NAMES = ("不能胡牌",
+                 "独一无二", "君临天下", "十全十美", "八方来财",
+                 "八方来贺",
+                 "顶峰相见", "心心相连", "十拿九稳", "六事兴旺",
+                 "比翼为邻", "六朝金粉",
+                 "六六大顺", "永恒相随", "五谷丰登",
+                 "五福临门", "二龙腾飞", "四季发财",
+                 "四季如春",
+                 "平胡")
+PATTERN_MULTIPLIERS = (0,
+                       100, 100, 100, 100,
+                       50,
+                       32, 32, 32, 32,
+                       16, 16,
+                       8, 8, 8,
+                       4, 4, 4,
+                       2,
+                       1)
+PATTERN_IDS = {name: i for i, name in enumerate(PATTERN_NAMES)}
+
+# 花色情况
+COLOR_MIXED = 0  # 杂色
+COLOR_SAME = 1   # 同色(全红或全黑)但不同花
+COLOR_SUIT = 2   # 同花
+NUM_COLOR_CLASSES = 3
+
+NUM_POINTS = 9  # 点数6-14
+HAND_SIZE = 8
+
+# 番型表默认位置，可以用 generate_hu_table.py 离线生成
+HU_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'hu_table.bin')
+
+
+def _num_compositions(total, parts):
+    """把total拆成parts个非负整数(有序)的方案数"""
+    if parts == 0:
+        return 1 if total == 0 else 0
+    numerator = 1
+    denominator = 1
+    for i in range(1, parts):
+        numerator *= total + i
+        denominator *= i
+    return numerator // denominator
+
+
+NUM_HISTOGRAMS = _num_compositions(HAND_SIZE, NUM_POINTS)
+
+# _RANK_OFFSETS[i][remaining][count]：第i个点数取count张时，
+# 在字典序中排在它前面的直方图数量
+_RANK_OFFSETS = [[[sum(_num_compositions(remaining - v, NUM_POINTS - 1 - i)
+                       for v in range(count))
+                   for count in range(HAND_SIZE + 1)]
+                  for remaining in range(HAND_SIZE + 1)]
+                 for i in range(NUM_POINTS)]
+
+
+def _histogram_rank(counts):
+    """直方图(9个点数的张数，总和为8)在字典序中的编号"""
+    rank = 0
+    remaining = HAND_SIZE
+    for i, count in enumerate(counts):
+        rank += _RANK_OFFSETS[i][remaining][count]
+        remaining -= count
+    return rank
+
+
+def _iter_histograms(total=HAND_SIZE, parts=NUM_POINTS):
+    """按字典序生成所有直方图，顺序与 _histogram_rank 一致"""
+    if parts == 1:
+        yield (total,)
+        return
+    for count in range(total + 1):
+        for rest in _iter_histograms(total - count, parts - 1):
+            yield (count,) + rest
+
+
+# 逐张查表时用列表比numpy数组快
+_POINT_INDEX = CODE_POINT_INDEX.tolist()
+_SUIT = CODE_SUIT.tolist()
+_COLOR = CODE_COLOR.tolist()
+
+
+def _color_class(codes):
+    """判断一组普通牌(编码)的花色情况"""
+    first_suit = _SUIT[codes[0]]
+    first_color = _COLOR[codes[0]]
+    same_suit = True
+    for code in codes:
+        if _SUIT[code] != first_suit:
+            same_suit = False
+            if _COLOR[code] != first_color:
+                return COLOR_MIXED
+    return COLOR_SUIT if same_suit else COLOR_SAME
+
+
+def _build_table_row(counts):
+    """计算一个直方图在三种花色情况下的番型编号"""
+    point_counts = {i + 6: count for i, count in enumerate(counts) if count}
+    return [_classify(point_counts, color_class)
+            for color_class in range(NUM_COLOR_CLASSES)]
+
+
+def build_hu_table(num_workers=None):
+    """离线构建番型表
+    Args:
+        num_workers: 进程池大小，None表示使用全部CPU，1表示不开进程池
+    Returns:
+        table: uint8数组，下标为 直方图编号*3+花色情况，值为番型编号
+    """
+    histograms = list(_iter_histograms())
+    if num_workers == 1:
+        rows = [_build_table_row(counts) for counts in histograms]
+    else:
+        with mp.Pool(num_workers) as pool:
+            rows = pool.map(_build_table_row, histograms, chunksize=256)
+    return np.asarray(rows, dtype=np.uint8).reshape(-1)
+
+
+def save_hu_table(table, path=HU_TABLE_PATH):
+    """把番型表写成可以内存映射的二进制文件"""
+    output = np.memmap(path, dtype=np.uint8, mode='w+', shape=table.shape)
+    output[:] = table
+    output.flush()
+    del output
+
+
+def load_hu_table(path=HU_TABLE_PATH):
+    """以内存映射方式加载番型表"""
+    table = np.memmap(path, dtype=np.uint8, mode='r')
+    if table.shape[0] != NUM_HISTOGRAMS * NUM_COLOR_CLASSES:
+        raise ValueError('Invalid hu table: {}'.format(path))
+    return table
+
+
+_hu_table = None
+
+
+def _get_hu_table():
+    """第一次使用时才加载番型表，没有离线文件时在内存中构建"""
+    global _hu_table
+    if _hu_table is None:
+        if os.path.exists(HU_TABLE_PATH):
+            _hu_table = load_hu_table(HU_TABLE_PATH)
+        else:
+            _hu_table = build_hu_table(num_workers=1)
+    return _hu_table
+
+
+def _lookup_pattern(codes):
+    """查表得到8张普通牌(编码)的番型，结果与 _check_pattern 相同"""
+    counts = [0] * NUM_POINTS
+    for code in codes:
+        counts[_POINT_INDEX[code]] += 1
+    pattern_id = int(_get_hu_table()[
+        _histogram_rank(counts) * NUM_COLOR_CLASSES + _color_class(codes)])
+    return PATTERN_MULTIPLIERS[pattern_id], PATTERN_NAMES[pattern_id]
+
+
+_shape_index = None
+
+
+def _get_shape_index():
+    """按点数集合索引的胡牌直方图目录
+
+    目录里是杂色或同色时能胡的所有直方图(最多3个点数)，同花的八方来贺
+    对任意直方图都成立，由 _solve_with_jokers 单独处理。
+    Returns:
+        dict: 点数集合(升序元组) -> [(直方图, 各花色情况下的番型编号), ...]，
+              列表里是点数集合包含该集合的所有直方图
+    """
+    global _shape_index
+    if _shape_index is None:
+        table = _get_hu_table()
+        shapes = []
+        for rank, counts in enumerate(_iter_histograms()):
+            pattern_ids = tuple(
+                int(table[rank * NUM_COLOR_CLASSES + color_class])
+                for color_class in range(NUM_COLOR_CLASSES))
+            if pattern_ids[COLOR_MIXED] or pattern_ids[COLOR_SAME]:
+                shapes.append((counts, pattern_ids))
+
+        index = {}
+        for size in range(4):
+            for support in _iter_supports(size):
+                index[support] = [
+                    shape for shape in shapes
+                    if all(shape[0][i] for i in support)]
+        _shape_index = index
+    return _shape_index
+
+
+def _iter_supports(size, start=0):
+    """生成从start开始的size个点数下标组合"""
+    if size == 0:
+        yield ()
+        return
+    for i in range(start, NUM_POINTS):
+        for rest in _iter_supports(size - 1, i + 1):
+            yield (i,) + rest
+
+
+def _solve_with_jokers(normal_codes, joker_count):
+    """把癞子当作万能牌直接补直方图，求最大番型
+
+    对每个能胡的目标直方图，只要普通牌的直方图逐点不超过目标，
+    剩下的空位就可以全部由癞子补上；癞子的花色可以任意选择，
+    所以花色情况取普通牌能达到的最好情况。
+    番型名称和逐个替换癞子时一致：倍数相同时，取替换序列
+    (按编码，即(点数,花色)的字典序)最小的那个目标。
+    Args:
+        normal_codes: 普通牌的编码列表
+        joker_count: 癞子数量
+    Returns:
+        multiplier: 番型倍数
+        pattern_name: 番型名称
+    """
+    counts = [0] * NUM_POINTS
+    for code in normal_codes:
+        counts[_POINT_INDEX[code]] += 1
+    support = tuple(i for i in range(NUM_POINTS) if counts[i])
+
+    if normal_codes:
+        color_class = _color_class(normal_codes)
+        first_suit = _SUIT[normal_codes[0]]
+    else:
+        color_class = COLOR_SUIT
+        first_suit = 0
+    # 达到各花色情况时，癞子能选的最小花色
+    min_suits = (0, first_suit % 2, first_suit)
+
+    best_multiplier = 0
+    best_pattern_id = 0
+    best_key = None
+    if color_class == COLOR_SUIT:
+        # 癞子全部补成同一花色即可胡八方来贺
+        best_multiplier = 50
+        best_pattern_id = PATTERN_IDS["八方来贺"]
 
+    for shape, pattern_ids in _get_shape_index().get(support, ()):
+        if any(shape[i] < counts[i] for i in support):
+            continue
+        multiplier = PATTERN_MULTIPLIERS[pattern_ids[color_class]]
+        if multiplier < best_multiplier or multiplier == 0:
+            continue
+        # 达到该倍数所需的最低花色情况
+        needed_class = 0
+        while PATTERN_MULTIPLIERS[pattern_ids[needed_class]] < multiplier:
+            needed_class += 1
+        suit = min_suits[needed_class]
+        key = tuple(i * 4 + suit
+                    for i in range(NUM_POINTS)
+                    for _ in range(shape[i] - counts[i]))
+        if multiplier > best_multiplier or best_key is None or key < best_key:
+            best_multiplier = multiplier
+            best_pattern_id = pattern_ids[needed_class]
+            best_key = key
+
+    return best_multiplier, PATTERN_NAMES[best_pattern_id]
+
+
+@cached_detector('hu', hu_cache_key)
 def get_hu_multiplier(hand_cards):
     """判断胡牌番型倍数
     Args:
@@ -18,231 +295,244 @@ def get_hu_multiplier(hand_cards):
         multiplier: 番型倍数，0表示不能胡牌
         pattern_name: 番型名称，如"独一无二"、"君临天下"等
     """
-    if any(card == (1, -1) for card in hand_cards):
+    if len(hand_cards) != HAND_SIZE:
+        return 0, "不能胡牌"
+    codes = [CARD2CODE[card] for card in hand_cards]
+    if QUESTION_MARK in codes:
         return 0, "不能胡牌"
 
     # 1. 分离普通牌和癞子
-    normal_cards = []
+    normal_codes = []
     joker_count = 0
-    for card in hand_cards:
-        if card[1] == -1:  # 癞子
+    for code in codes:
+        if code == JOKER:  # 癞子
             joker_count += 1
         else:  # 普通牌
-            normal_cards.append(card)
-    
-    # 2. 生成所有可能的牌（6-A的四种花色）
-    all_possible_cards = [(p, s) for p in range(6, 15) for s in range(4)]
-    
-    def try_all_replacements(remaining_jokers, current_cards):
-        """递归尝试所有可能的癞子替换方案"""
-        # 基础情况：所有癞子都已替换完
-        if remaining_jokers == 0:
-            return _check_pattern(current_cards)
-        
-        # 递归情况：尝试所有可能的替换
-        max_multiplier = 0
-        best_pattern = "不能胡牌"
-        for card in all_possible_cards:
-            multiplier, pattern = try_all_replacements(
-                remaining_jokers - 1, 
-                current_cards + [card]
-            )
-            if multiplier > max_multiplier:
-                max_multiplier = multiplier
-                best_pattern = pattern
-                if multiplier == 100:  # 已经是最大倍数，可以提前返回
-                    return multiplier, best_pattern
-        return max_multiplier, best_pattern
-    
-    # 3. 开始计算最大胡牌倍数
-    return try_all_replacements(joker_count, normal_cards)
-
-def _check_pattern(cards):
-    """检查具体牌型"""
-    # 100倍牌型
-    if _count_same_cards(cards, 14) >= 8:
-        return 100, "独一无二"
-    elif _count_same_cards(cards, 13) >= 8:
-        return 100, "君临天下"
-    elif _count_same_cards(cards, 10) >= 8:
-        return 100, "十全十美"
-    elif _count_same_cards(cards, 8) >= 8:
-        return 100, "八方来财"
-    
-    # 50倍牌型：八方来贺（8张同花色或同点数）
-    if _is_eight_same_suit(cards) or _is_eight_same_point(cards):
-        return 50, "八方来贺"
-    
-    # 32倍牌型
-    if _count_n_m_cards(cards, 13, 14) in [(6,2), (2,6)]:
-        return 32, "顶峰相见"
-    elif _count_n_m_cards(cards, 11, 12) in [(6,2), (2,6)]:
-        return 32, "心心相连"
-    elif _count_n_m_cards(cards, 9, 10) in [(6,2), (2,6)]:
-        return 32, "十拿九稳"
-    elif _count_n_m_cards(cards, 6, 7) in [(6,2), (2,6)]:
-        return 32, "六事兴旺"
-    
-    # 16倍牌型
-    if _is_six_two_adjacent(cards):
-        return 16, "比翼为邻"
-    elif _is_six_two_same_color(cards):
-        return 16, "六朝金粉"
-    
-    # 8倍牌型
-    if _is_six_two(cards):
-        return 8, "六六大顺"
-    elif _is_five_three_adjacent(cards):
-        return 8, "永恒相随"
-    elif _is_five_three_same_color(cards):
-        return 8, "五谷丰登"
-    
-    # 4倍牌型
-    if _is_five_three(cards):
-        return 4, "五福临门"
-    elif _is_four_four_adjacent(cards):
-        return 4, "二龙腾飞"
-    elif _is_four_four_same_color(cards):
-        return 4, "四季发财"
-    
-    # 2倍牌型
-    if _is_four_four(cards):
-        return 2, "四季如春"
-    
-    # 1倍牌型
-    if _is_three_three_two(cards):
-        return 1, "平胡"
-    
-    return 0, "不能胡牌"
-
-def _count_same_cards(cards, point):
-    """统计指定点数的牌数量"""
-    return sum(1 for card in cards if card[0] == point)
-
-def _count_n_m_cards(cards, point1, point2):
-    """统计两个点数的牌数量"""
-    count1 = sum(1 for card in cards if card[0] == point1)
-    count2 = sum(1 for card in cards if card[0] == point2)
-    return count1, count2
-
-def _is_eight_same_suit(cards):
-    """判断是否8张同花色"""
-    suits = [card[1] for card in cards]
-    return len(set(suits)) == 1 and len(suits) == 8
-
-def _is_eight_same_point(cards):
-    """判断是否8张同点数"""
-    points = [card[0] for card in cards]
-    return len(set(points)) == 1 and len(points) == 8
-
-def _is_same_color(cards):
-    """判断所有牌是否同色(红色或黑色)"""
-    suits = [card[1] for card in cards]
-    return all(suit % 2 == suits[0] % 2 for suit in suits)
-
-def _is_six_two_adjacent(cards):
-    """判断是否是6+2相邻的组合"""
-    point_counts = {}
-    for card in cards:
-        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
-    
-    for point in range(6, 14):
-        if (point_counts.get(point, 0) == 6 and point_counts.get(point + 1, 0) == 2) or \
-           (point_counts.get(point, 0) == 2 and point_counts.get(point + 1, 0) == 6):
-            return True
-    return False
-
-def _is_six_two_same_color(cards):
-    """判断是否是6+2同色的组合"""
-    if not _is_same_color(cards):
-        return False
-    
-    point_counts = {}
-    for card in cards:
-        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
-    
-    counts = sorted(point_counts.values())
-    return len(counts) == 2 and counts == [2, 6]
-
-def _is_six_two(cards):
-    """判断是否是6+2的组合"""
-    point_counts = {}
-    for card in cards:
-        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
-    
-    counts = sorted(point_counts.values())
-    return len(counts) == 2 and counts == [2, 6]
-
-def _is_five_three_adjacent(cards):
-    """判断是否是5+3相邻的组合"""
-    point_counts = {}
-    for card in cards:
-        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
-    
-    for point in range(6, 14):
-        if (point_counts.get(point, 0) == 5 and point_counts.get(point + 1, 0) == 3) or \
-           (point_counts.get(point, 0) == 3 and point_counts.get(point + 1, 0) == 5):
-            return True
-    return False
-
-def _is_five_three_same_color(cards):
-    """判断是否是5+3同色的组合"""
-    if not _is_same_color(cards):
-        return False
-    
-    point_counts = {}
-    for card in cards:
-        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
-    
-    counts = sorted(point_counts.values())
-    return len(counts) == 2 and counts == [3, 5]
-
-def _is_five_three(cards):
-    """判断是否是5+3的组合"""
-    point_counts = {}
-    for card in cards:
-        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
-    
-    counts = sorted(point_counts.values())
-    return len(counts) == 2 and counts == [3, 5]
-
-def _is_four_four_adjacent(cards):
-    """判断是否是4+4相邻的组合"""
-    point_counts = {}
-    for card in cards:
-        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
-    
-    for point in range(6, 14):
-        if point_counts.get(point, 0) == 4 and point_counts.get(point + 1, 0) == 4:
-            return True
-    return False
-
-def _is_four_four_same_color(cards):
-    """判断是否是4+4同色的组合"""
-    if not _is_same_color(cards):
-        return False
-    
-    point_counts = {}
-    for card in cards:
-        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
-    
-    counts = sorted(point_counts.values())
-    return len(counts) == 2 and counts == [4, 4]
-
-def _is_four_four(cards):
-    """判断是否是4+4的组合"""
-    point_counts = {}
-    for card in cards:
-        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
-    
-    counts = sorted(point_counts.values())
-    return len(counts) == 2 and counts == [4, 4]
-
-def _is_three_three_two(cards):
-    """判断是否是3+3+2的组合(平胡)"""
+            normal_codes.append(code)
+
+    # 2. 没有癞子直接查表，有癞子时把癞子当作万能牌求解
+    if joker_count == 0:
+        return _lookup_pattern(normal_codes)
+    return _solve_with_jokers(normal_codes, joker_count)
+
+_MULTIPLIER_ARRAY = np.array(PATTERN_MULTIPLIERS, dtype=np.int32)
+_RANK_OFFSET_ARRAY = np.array(_RANK_OFFSETS, dtype=np.int64)
+# 把最长8张的替换序列按字典序编码成36进制整数时，前j位权重之和
+_SEQUENCE_PREFIX = np.concatenate(
+    ([0], np.cumsum(36 ** np.arange(HAND_SIZE - 1, -1, -1, dtype=np.int64))))
+
+# 打包直方图用的字段权重：每个点数占5位，第5位是保护位
+_FIELD_WEIGHTS = np.int64(1) << (5 * np.arange(NUM_POINTS, dtype=np.int64))
+_GUARD_MASK = np.int64(_FIELD_WEIGHTS.sum() << 4)
+
+_shape_arrays = None
+
+
+def _get_shape_arrays():
+    """胡牌直方图目录的数组形式：直方图(M,9)和番型编号(M,3)"""
+    global _shape_arrays
+    if _shape_arrays is None:
+        shapes = _get_shape_index()[()]
+        _shape_arrays = (np.array([shape[0] for shape in shapes], dtype=np.int64),
+                         np.array([shape[1] for shape in shapes], dtype=np.uint8))
+    return _shape_arrays
+
+
+def get_hu_multiplier_batch(hands, chunk_size=1024):
+    """批量判断胡牌番型倍数，结果与逐手调用 get_hu_multiplier 相同
+    Args:
+        hands: (N, 8)整数数组，每行是一手牌的编码(见 cards.py)
+        chunk_size: 含癞子的手牌每批处理的行数，用来限制中间数组的大小
+    Returns:
+        multipliers: (N,) int32数组，番型倍数
+        pattern_ids: (N,) uint8数组，番型编号，名称见 PATTERN_NAMES
+    """
+    hands = np.asarray(hands, dtype=np.int64)
+    if hands.ndim != 2 or hands.shape[1] != HAND_SIZE:
+        raise ValueError('hands should have shape (N, {})'.format(HAND_SIZE))
+    num_hands = hands.shape[0]
+
+    # 1. 点数直方图和花色情况
+    normal = hands < NUM_NORMAL_CARDS
+    point_index = np.where(normal, hands // 4, NUM_POINTS)
+    row_offset = np.arange(num_hands)[:, np.newaxis] * (NUM_POINTS + 1)
+    counts = np.bincount((row_offset + point_index).ravel(),
+                         minlength=num_hands * (NUM_POINTS + 1))
+    counts = counts.reshape(num_hands, NUM_POINTS + 1)[:, :NUM_POINTS]
+
+    suits = hands % 4
+    suit_min = np.where(normal, suits, 4).min(axis=1)
+    suit_max = np.where(normal, suits, -1).max(axis=1)
+    parity_min = np.where(normal, suits % 2, 2).min(axis=1)
+    parity_max = np.where(normal, suits % 2, -1).max(axis=1)
+    color_classes = np.full(num_hands, COLOR_MIXED, dtype=np.int64)
+    color_classes[parity_max <= parity_min] = COLOR_SAME
+    color_classes[suit_max <= suit_min] = COLOR_SUIT
+
+    joker_counts = (hands == JOKER).sum(axis=1)
+    valid = ~(hands == QUESTION_MARK).any(axis=1)
+    pattern_ids = np.zeros(num_hands, dtype=np.uint8)
+
+    # 2. 没有癞子的直接查表
+    plain = np.flatnonzero(valid & (joker_counts == 0))
+    if len(plain):
+        plain_counts = counts[plain]
+        remaining = HAND_SIZE - np.cumsum(plain_counts, axis=1) + plain_counts
+        ranks = _RANK_OFFSET_ARRAY[np.arange(NUM_POINTS), remaining,
+                                   plain_counts].sum(axis=1)
+        pattern_ids[plain] = _get_hu_table()[
+            ranks * NUM_COLOR_CLASSES + color_classes[plain]]
+
+    # 3. 含癞子的分批求解
+    no_normal = suit_max < 0
+    min_suits = np.stack((np.zeros(num_hands, dtype=np.int64),
+                          np.where(no_normal, 0, parity_min),
+                          np.where(no_normal, 0, suit_min)), axis=1)
+    wild = np.flatnonzero(valid & (joker_counts > 0))
+    for start in range(0, len(wild), chunk_size):
+        rows = wild[start:start + chunk_size]
+        pattern_ids[rows] = _solve_with_jokers_batch(
+            counts[rows], color_classes[rows], min_suits[rows])
+
+    return _MULTIPLIER_ARRAY[pattern_ids], pattern_ids
+
+
+# 听牌的候选牌：36种普通牌加癞子(手里有问号时不能胡，不用试)
+TING_CANDIDATE_CODES = np.arange(NUM_NORMAL_CARDS + 1)
+
+
+@cached_detector('ting', ting_cache_key)
+def get_ting_multipliers(hand_codes):
+    """7张手牌能胡的牌及番型倍数(听牌)，所有候选牌一起批量判断
+    Args:
+        hand_codes: 7张手牌的编码
+    Returns:
+        dict: 能胡的牌的编码 -> 番型倍数，打开缓存时是共用的结果，不要修改
+    """
+    ting_cards = {}
+    if len(hand_codes) != HAND_SIZE - 1:
+        return ting_cards
+    hands = np.empty((len(TING_CANDIDATE_CODES), HAND_SIZE), dtype=np.int64)
+    hands[:, :-1] = hand_codes
+    hands[:, -1] = TING_CANDIDATE_CODES
+    multipliers, _ = get_hu_multiplier_batch(hands)
+    for code, multiplier in zip(TING_CANDIDATE_CODES.tolist(), multipliers.tolist()):
+        if multiplier > 0:
+            ting_cards[code] = multiplier
+    return ting_cards
+
+
+def _solve_with_jokers_batch(counts, color_classes, min_suits):
+    """_solve_with_jokers 的向量化版本，返回番型编号数组"""
+    shape_counts, shape_pattern_ids = _get_shape_arrays()
+    shape_multipliers = _MULTIPLIER_ARRAY[shape_pattern_ids]
+    num_hands = len(counts)
+
+    # 每个目标直方图能否由癞子补齐，以及补齐后的倍数
+    # 直方图每个点数占5位打包成一个整数，目标直方图的每个字段加上保护位，
+    # 相减后保护位仍全部保留即表示逐点不小于手牌直方图
+    guarded_shapes = shape_counts @ _FIELD_WEIGHTS + _GUARD_MASK
+    feasible = (guarded_shapes[np.newaxis]
+                - (counts @ _FIELD_WEIGHTS)[:, np.newaxis]
+                & _GUARD_MASK) == _GUARD_MASK
+    multipliers = np.where(feasible, shape_multipliers.T[color_classes], 0)
+    best = multipliers.max(axis=1)
+    suit_only = (color_classes == COLOR_SUIT) & (best < 50)
+    best[suit_only] = 50
+
+    # 倍数相同时取替换序列字典序最小的目标，只对候选目标计算
+    rows, shapes = np.nonzero((multipliers == best[:, np.newaxis])
+                              & (best[:, np.newaxis] > 0))
+    needed = (shape_multipliers[shapes]
+              >= best[rows, np.newaxis]).argmax(axis=1)
+    suits = min_suits[rows, needed]
+    completion = shape_counts[shapes] - counts[rows]
+    ends = np.cumsum(completion, axis=1)
+    weights = _SEQUENCE_PREFIX[ends] - _SEQUENCE_PREFIX[ends - completion]
+    keys = (weights * (np.arange(NUM_POINTS) * 4)).sum(axis=1) \
+        + suits * weights.sum(axis=1)
+    order = np.lexsort((keys, rows))
+    first = order[np.unique(rows[order], return_index=True)[1]]
+
+    pattern_ids = np.zeros(num_hands, dtype=np.uint8)
+    pattern_ids[rows[first]] = shape_pattern_ids[shapes[first], needed[first]]
+    pattern_ids[suit_only] = PATTERN_IDS["八方来贺"]
+    return pattern_ids
+
+
+# 8张同点数的100倍牌型，其他点数为八方来贺
+_EIGHT_OF_A_KIND_IDS = {14: PATTERN_IDS["独一无二"],
+                        13: PATTERN_IDS["君临天下"],
+                        10: PATTERN_IDS["十全十美"],
+                        8: PATTERN_IDS["八方来财"]}
+_EIGHT_SAME_ID = PATTERN_IDS["八方来贺"]
+_THREE_THREE_TWO_ID = PATTERN_IDS["平胡"]
+# 两个点数的牌型，按 (较多的张数, 较少的张数) 索引：
+# (相邻且较小点数指定时的番型, 相邻, 同色, 其他)
+_TWO_POINT_RULES = {
+    (6, 2): ({13: PATTERN_IDS["顶峰相见"],
+              11: PATTERN_IDS["心心相连"],
+              9: PATTERN_IDS["十拿九稳"],
+              6: PATTERN_IDS["六事兴旺"]},
+             PATTERN_IDS["比翼为邻"],
+             PATTERN_IDS["六朝金粉"],
+             PATTERN_IDS["六六大顺"]),
+    (5, 3): ({},
+             PATTERN_IDS["永恒相随"],
+             PATTERN_IDS["五谷丰登"],
+             PATTERN_IDS["五福临门"]),
+    (4, 4): ({},
+             PATTERN_IDS["二龙腾飞"],
+             PATTERN_IDS["四季发财"],
+             PATTERN_IDS["四季如春"]),
+}
+
+
+def _classify(point_counts, color_class):
+    """根据点数直方图和花色情况判断番型
+    Args:
+        point_counts: 点数 -> 张数，只包含张数大于0的点数，总张数为8
+        color_class: 花色情况
+    Returns:
+        pattern_id: 番型编号
+    """
+    num_points = len(point_counts)
+    if num_points == 1:
+        # 100倍牌型，否则是8张同点数的八方来贺
+        for point in point_counts:
+            return _EIGHT_OF_A_KIND_IDS.get(point, _EIGHT_SAME_ID)
+    if color_class == COLOR_SUIT:
+        return _EIGHT_SAME_ID
+    if num_points == 2:
+        (low, low_count), (high, high_count) = sorted(point_counts.items())
+        rule = _TWO_POINT_RULES.get((max(low_count, high_count),
+                                     min(low_count, high_count)))
+        if rule is None:
+            return 0
+        named_pairs, adjacent_id, same_color_id, plain_id = rule
+        if high == low + 1:
+            return named_pairs.get(low, adjacent_id)
+        return same_color_id if color_class == COLOR_SAME else plain_id
+    if num_points == 3 and sorted(point_counts.values()) == [2, 3, 3]:
+        return _THREE_THREE_TWO_ID
+    return 0
+
+
+def _check_pattern(codes):
+    """检查具体牌型，点数直方图只统计一次
+    运行时走番型表(见 _lookup_pattern)，这里逐手判断，
+    tests/test_hu_pattern_detector.py 用它和旧版的判断逐个比较
+    Args:
+        codes: 8张普通牌的编码
+    Returns:
+        multiplier: 番型倍数
+        pattern_name: 番型名称
+    """
+    if len(codes) != HAND_SIZE:
+        return 0, "不能胡牌"
     point_counts = {}
-    for card in cards:
-        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
-    
-    counts = sorted(point_counts.values())
-    return len(counts) == 3 and counts == [2, 3, 3]
\ No newline at end of file
+    for code in codes:
+        point = int(CODE_POINT[code])
+        point_counts[point] = point_counts.get(point, 0) + 1
+    pattern_id = _classify(point_counts, _color_class(codes))
+    return PATTERN_MULTIPLIERS[pattern_id], PATTERN_NAMES[pattern_id]
@@ -0,0 +1,62 @@
+"""
+牌型目录模块。
+在导入时一次性生成36种普通牌上所有可能的有效牌型(不计负分的组合)，
+供负分检测以及之后的出牌建议等代码直接查询，不再每次重新生成。
+
+牌型分两类：
+1. 同点数：同一点数任意几种花色的组合，手牌里这些牌合计3张及以上才有效
+   (8有三副，两种甚至一种牌也可能凑够3张)
+2. 同花顺：同一花色3张及以上点数连续的牌
+
+每个牌型记录：
+- mask: 包含的牌的位掩码，第i位对应编码为i的牌(见 cards.py)
+- points: 点数签名，第i位表示包含点数下标i(0-8对应6-A)
+- suits: 花色签名，第i位表示包含花色i
+- is_run: 是否是同花顺
+- codes: 包含的牌的编码，从小到大排列
+"""
+import collections
+
+from douzero.env.cards import NUM_NORMAL_CARDS
+
+Meld = collections.namedtuple('Meld', ['mask', 'points', 'suits', 'is_run', 'codes'])
+
+
+def _codes2mask(codes):
+    mask = 0
+    for code in codes:
+        mask |= 1 << code
+    return mask
+
+
+def _build_catalogue():
+    melds = []
+    # 同点数：每个点数的所有花色子集
+    for point_index in range(9):
+        for suit_subset in range(1, 16):
+            codes = tuple(point_index * 4 + suit for suit in range(4)
+                          if suit_subset >> suit & 1)
+            melds.append(Meld(_codes2mask(codes), 1 << point_index, suit_subset, False, codes))
+    # 同花顺：每种花色所有长度3及以上的连续点数
+    for suit in range(4):
+        for start in range(9):
+            for end in range(start + 3, 10):
+                codes = tuple(point_index * 4 + suit for point_index in range(start, end))
+                points = sum(1 << point_index for point_index in range(start, end))
+                melds.append(Meld(_codes2mask(codes), points, 1 << suit, True, codes))
+    return tuple(melds)
+
+
+MELDS = _build_catalogue()
+
+# 牌的编码 -> 包含这张牌的所有牌型
+CARD_MELDS = tuple(tuple(meld for meld in MELDS if meld.mask >> code & 1)
+                   for code in range(NUM_NORMAL_CARDS))
+
+
+def iter_card_codes(mask):
+    """按编码从小到大遍历位掩码中的牌"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
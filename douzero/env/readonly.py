@@ -0,0 +1,107 @@
+"""
+只读视图模块。
+GameEnv.get_infoset 不再深拷贝信息集，而是把其中的列表和字典包成只读视图交给智能体：
+1. 视图和引擎共用同一份数据，不复制，引擎之后的改动在视图里也能看到
+2. 取出的嵌套列表、字典同样是只读视图，智能体改不了引擎的状态
+3. 需要能修改的副本时调用 thaw，或者用 InfoSet.snapshot 拿整个信息集的快照
+4. 需要判断两个视图是不是同一份数据时(比如跟踪同一局的出牌序列)，用 unwrap 取出原对象
+"""
+from collections.abc import Mapping, Sequence
+
+
+class ReadOnlyList(Sequence):
+    """列表的只读视图，和原列表比较相等"""
+    __slots__ = ('_data',)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ReadOnlyList(self._data[index])
+        return freeze(self._data[index])
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, value):
+        return value in self._data
+
+    def __eq__(self, other):
+        if isinstance(other, ReadOnlyList):
+            return self._data == other._data
+        if isinstance(other, list):
+            return self._data == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def copy(self):
+        """可以修改的副本"""
+        return thaw(self._data)
+
+
+class ReadOnlyDict(Mapping):
+    """字典的只读视图，和原字典比较相等"""
+    __slots__ = ('_data',)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getitem__(self, key):
+        return freeze(self._data[key])
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __eq__(self, other):
+        if isinstance(other, ReadOnlyDict):
+            return self._data == other._data
+        if isinstance(other, dict):
+            return self._data == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def copy(self):
+        """可以修改的副本"""
+        return thaw(self._data)
+
+
+def freeze(value):
+    """把列表、字典包成只读视图，其他值原样返回"""
+    if isinstance(value, list):
+        return ReadOnlyList(value)
+    if isinstance(value, dict):
+        return ReadOnlyDict(value)
+    return value
+
+
+def thaw(value):
+    """生成可以修改的深拷贝，只读视图会换成普通的列表、字典"""
+    if isinstance(value, (ReadOnlyList, ReadOnlyDict)):
+        value = value._data
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    return value
+
+
+def unwrap(value):
+    """取出只读视图底下的原对象(不复制)，其他值原样返回"""
+    if isinstance(value, (ReadOnlyList, ReadOnlyDict)):
+        return value._data
+    return value
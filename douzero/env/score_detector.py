@@ -20,7 +20,15 @@
    - 同花顺（3张及以上）
    - 同点数（3张及以上）
 4. 会尝试所有可能的组合方式，返回最小的负分值
+5. 癞子作为牌型中的空位参与同一次搜索，不再逐个替换成36种牌，
+   耗时和癞子数无关，按癞子数统计的延迟用 benchmarks/benchmark_negative_score.py 测
 """
+from douzero.env.cards import NUM_NORMAL_CARDS, CARD2CODE, CODE_SCORE
+from douzero.env.detector_cache import cached_detector, negative_score_cache_key
+from douzero.env.meld_catalogue import CARD_MELDS, iter_card_codes
+
+
+@cached_detector('negative_score', negative_score_cache_key)
 def get_negative_score(input_cards):
     """计算7张牌的最小负分
     Args:
@@ -30,157 +38,84 @@ def get_negative_score(input_cards):
     Returns:
         int: 最小负分值
     """
-    # 1. 分离普通牌、问号和癞子
-    normal_cards = []
-    question_marks = []
+    # 1. 转换成编码，分离普通牌和癞子(花色为-1的特殊牌都按癞子处理)
+    normal_codes = []
     joker_count = 0
     for card in input_cards:
-        if card[1] == -1:  # 癞子
+        code = CARD2CODE[card]
+        if code >= NUM_NORMAL_CARDS:  # 癞子
             joker_count += 1
-        elif card[0] == 0:  # 问号
-            question_marks.append(card)
         else:  # 普通牌
-            normal_cards.append(card)
-    
-    # 2. 生成所有可能的牌（6-A的四种花色）
-    all_possible_cards = [(p, s) for p in range(6, 15) for s in range(4)]
-    
-    def try_all_replacements(remaining_jokers, current_cards):
-        """递归尝试所有可能的癞子替换方案
-        Args:
-            remaining_jokers: 剩余待替换的癞子数量
-            current_cards: 当前已经替换的牌组
-        Returns:
-            int: 当前替换方案下的最小负分
-        """
-        # 基础情况：所有癞子都已替换完
-        if remaining_jokers == 0:
-            combinations = []
-            _find_all_combinations(current_cards, [], set(), combinations)
-            
-            # 计算最小负分
-            min_score = float('inf')
-            for used_groups in combinations:
-                used_cards = set()
-                for group in used_groups:
-                    used_cards.update(group)
-                unused_cards = set(current_cards) - used_cards
-                score = sum(_get_card_score(card) for card in unused_cards)
-                if score == 0:  # 找到负分为0的组合就直接返回
-                    return 0
-                min_score = min(min_score, score)
-            return min_score
-        
-        # 递归情况：尝试所有可能的替换
-        min_score = float('inf')
-        for card in all_possible_cards:
-            score = try_all_replacements(remaining_jokers - 1, current_cards + [card])
-            if score == 0:  # 找到负分为0的组合就直接返回
-                return 0
-            min_score = min(min_score, score)
-        return min_score
-    
-    # 3. 开始计算最小负分
-    min_score = try_all_replacements(joker_count, normal_cards)
-    return min_score if min_score != float('inf') else sum(_get_card_score(card) for card in normal_cards)
+            normal_codes.append(code)
 
-def _find_all_combinations(input_cards, current_groups, used_cards, result):
-    """找出所有可能的有效牌型组合（同花顺或同点数）
-    Args:
-        input_cards: 输入的牌组
-        current_groups: 当前已找到的组合
-        used_cards: 当前已使用的牌
-        result: 存储所有找到的组合
-    """
-    # 把当前组合加入结果
-    if current_groups:
-        result.append(current_groups[:])
-    
-    # 找出所有可能的同点数和同花顺组合
-    point_groups = _find_point_groups(input_cards, used_cards)
-    straight_groups = _find_straight_groups(input_cards, used_cards)
-    
-    # 尝试添加每个可能的组合
-    for group in point_groups + straight_groups:
-        if not (set(group) & used_cards):  # 确保没有重复使用的牌
-            current_groups.append(group)
-            new_used = used_cards | set(group)
-            _find_all_combinations(input_cards, current_groups, new_used, result)
-            current_groups.pop()
+    # 2. 癞子当作牌型里的空位一起搜索，没有任何有效牌型时按普通牌计负分
+    min_score = _min_leftover_score(normal_codes, joker_count)
+    return min_score if min_score != float('inf') else sum(CARD_SCORES[code] for code in normal_codes)
 
-def _find_point_groups(input_cards, used_cards):
-    """找出所有可能的同点数组合（3张及以上）
-    Args:
-        input_cards: 输入的牌组
-        used_cards: 已使用的牌
-    Returns:
-        list: 所有可能的同点数组合列表
-    """
-    result = []
-    # 按点数分组
-    point_groups = {}
-    for card in input_cards:
-        if card not in used_cards:
-            point_groups.setdefault(card[0], []).append(card)
-    
-    # 对每个点数，找出所有可能的组合（3-7张）
-    for _, same_cards in point_groups.items():
-        for i in range(len(same_cards)):
-            for j in range(i + 2, len(same_cards) + 1):
-                group = same_cards[i:j]
-                if len(group) >= 3:
-                    result.append(tuple(sorted(group)))
-    return result
+def _min_leftover_score(input_codes, joker_count=0):
+    """用位掩码动态规划求组成牌型后剩余牌的最小负分
+    相同的牌只算一张：组成牌型时同一张牌的所有副本一起用掉，
+    剩余的牌也只计一次负分。候选牌型直接从牌型目录中查询。
 
-def _find_straight_groups(input_cards, used_cards):
-    """找出所有可能的同花顺组合（3张及以上）
+    癞子不再逐个替换成36种牌，而是当作牌型中的空位：
+    - 同花顺中手牌里没有的牌各用一个癞子补上
+    - 同点数的牌型张数不够3张时用癞子补足
+    - 用剩的癞子可以当作任意一张已有的牌，不计负分
+    - 3个癞子本身就能组成一个牌型
     Args:
-        input_cards: 输入的牌组
-        used_cards: 已使用的牌
+        input_codes: 输入的牌的编码(不含癞子和问号)
+        joker_count: 癞子数量
     Returns:
-        list: 所有可能的同花顺组合列表
+        最小负分，没有任何有效牌型时返回inf
     """
-    result = []
-    # 按花色分组
-    suit_groups = {}
-    for card in input_cards:
-        if card not in used_cards:
-            suit_groups.setdefault(card[1], []).append(card)
-    
-    # 对每种花色找顺子
-    for _, suited_cards in suit_groups.items():
-        suited_cards.sort(key=lambda x: x[0])
-        # 对每个可能的起始位置
-        for i in range(len(suited_cards)):
-            straight = [suited_cards[i]]
-            # 尝试构建顺子
-            for j in range(i + 1, len(suited_cards)):
-                if suited_cards[j][0] == straight[-1][0] + 1:
-                    straight.append(suited_cards[j])
-                    if len(straight) >= 3:
-                        result.append(tuple(straight))
-                elif suited_cards[j][0] > straight[-1][0] + 1:
-                    break
-    return result
+    # 1. 把手牌编成位掩码(第i位对应编码为i的牌)，统计每种牌的张数
+    copies = [0] * NUM_NORMAL_CARDS
+    hand_mask = 0
+    for code in input_codes:
+        copies[code] += 1
+        hand_mask |= 1 << code
 
-def _get_card_score(card):
-    """获取单张牌的负分值
-    Args:
-        card: (点数,花色)元组
-    Returns:
-        int: 负分值
-             问号=0分
-             6-10=10分
-             J-K=20分
-             A=30分
-    """
-    point = card[0]
-    if point == 0:  # 问号
-        return 0
-    elif 6 <= point <= 10:  # 6-10
-        return 10
-    elif 11 <= point <= 13:  # J-Q-K
-        return 20
-    elif point == 14:  # A
-        return 30
-    return 0
+    # 2. 从牌型目录中挑出手牌(加上癞子)能组成的牌型，按其中手牌里编码最小的牌分组，
+    #    记录牌型用到的手牌掩码和需要的癞子数
+    candidates = [[] for _ in range(NUM_NORMAL_CARDS)]
+    for code in iter_card_codes(hand_mask):
+        lower_mask = (1 << code) - 1
+        for meld in CARD_MELDS[code]:
+            if meld.is_run:
+                # 同花顺：手牌里有的牌必须全部用上，缺的牌用癞子补
+                used_mask = meld.mask & hand_mask
+                jokers = bin(meld.mask & ~hand_mask).count('1')
+            elif meld.mask & hand_mask == meld.mask:
+                # 同点数：只用手牌里有的牌，张数不够3张用癞子补
+                used_mask = meld.mask
+                jokers = max(0, 3 - sum(copies[c] for c in meld.codes))
+            else:
+                continue
+            if used_mask & lower_mask or jokers > joker_count:
+                continue
+            candidates[code].append((used_mask, jokers))
+
+    # 3. 对(剩余牌的掩码, 剩余癞子数, 是否已组成牌型)做记忆化搜索：
+    #    最低位的牌要么不组牌型计负分，要么和其他剩余牌、癞子组成一个包含它的牌型
+    memo = {}
+
+    def solve(mask, jokers, has_meld):
+        if mask == 0:
+            return 0 if has_meld or jokers >= 3 else float('inf')
+        key = (mask, jokers, has_meld)
+        if key in memo:
+            return memo[key]
+        low = (mask & -mask).bit_length() - 1
+        best = CARD_SCORES[low] + solve(mask & ~(1 << low), jokers, has_meld)
+        for used_mask, used_jokers in candidates[low]:
+            if best == 0:
+                break
+            if used_mask & mask == used_mask and used_jokers <= jokers:
+                best = min(best, solve(mask & ~used_mask, jokers - used_jokers, True))
+        memo[key] = best
+        return best
+
+    return solve(hand_mask, joker_count, False)
+
+# 每种普通牌的负分，下标为牌的编码
+CARD_SCORES = CODE_SCORE[:NUM_NORMAL_CARDS].tolist()
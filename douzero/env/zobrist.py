@@ -0,0 +1,85 @@
+"""
+Zobrist哈希模块。
+给牌局状态的每个组成部分分配一个固定的64位随机键，局面的哈希是所有键的异或，
+牌移动时只需要异或掉旧位置的键、异或上新位置的键，不用重新序列化整个局面。
+
+键表：
+1. HAND_KEYS[座位][编码][k]: 座位手里第k+1张这种牌(手牌是多重集合，按张数区分)
+2. PUBLIC_KEYS[位置][编码]: 公共牌区第0-3个位置上的牌
+3. PILE_KEYS[深度][编码]: 牌堆中离牌堆底深度为d的牌，按离牌堆底的距离取键，
+   摸走牌堆顶的牌时其他牌的键不变
+4. DISCARD_KEYS[下标][编码]: 废牌区第i张牌
+5. SEAT_KEYS、AUTO_HU_KEYS、BU_HU_STARTER_KEYS: 当前玩家、已胡牌玩家、开始补胡的玩家
+6. BU_HU_KEY、GAME_OVER_KEY: 补胡状态和牌局结束
+
+随机数种子是固定的，不同进程、不同次运行算出的哈希相同，可以共用置换表。
+"""
+import numpy as np
+
+from douzero.env.cards import NUM_CARD_CODES, DECK
+
+ZOBRIST_SEED = 20240229
+
+NUM_SEATS = 4
+NUM_PUBLIC_SLOTS = 4
+MAX_COPIES = 4  # 同一种牌最多4张(癞子、问号)
+MAX_CARDS = len(DECK)
+
+_rng = np.random.default_rng(ZOBRIST_SEED)
+
+
+def _random_keys(*shape):
+    return _rng.integers(0, 2 ** 64, size=shape, dtype=np.uint64).tolist()
+
+
+HAND_KEYS = _random_keys(NUM_SEATS, NUM_CARD_CODES, MAX_COPIES)
+PUBLIC_KEYS = _random_keys(NUM_PUBLIC_SLOTS, NUM_CARD_CODES)
+PILE_KEYS = _random_keys(MAX_CARDS, NUM_CARD_CODES)
+DISCARD_KEYS = _random_keys(MAX_CARDS, NUM_CARD_CODES)
+SEAT_KEYS = _random_keys(NUM_SEATS)
+AUTO_HU_KEYS = _random_keys(NUM_SEATS)
+BU_HU_STARTER_KEYS = _random_keys(NUM_SEATS)
+BU_HU_KEY, GAME_OVER_KEY = _random_keys(2)
+
+
+def hand_hash(seat, counts):
+    """一个座位手牌的哈希
+    Args:
+        seat: 座位下标(0-3)
+        counts: 每种牌的张数，下标为牌的编码
+    Returns:
+        int: 64位哈希
+    """
+    h = 0
+    keys = HAND_KEYS[seat]
+    for code, count in enumerate(counts):
+        for k in range(count):
+            h ^= keys[code][k]
+    return h
+
+
+def pile_hash(cards):
+    """牌堆的哈希，cards[0]是牌堆顶"""
+    h = 0
+    depth = len(cards)
+    for card in cards:
+        depth -= 1
+        h ^= PILE_KEYS[depth][card]
+    return h
+
+
+def public_hash(cards):
+    """公共牌区的哈希，cards是4个位置上的牌，空位是None"""
+    h = 0
+    for slot, card in enumerate(cards):
+        if card is not None:
+            h ^= PUBLIC_KEYS[slot][card]
+    return h
+
+
+def discard_hash(cards):
+    """废牌区的哈希"""
+    h = 0
+    for i, card in enumerate(cards):
+        h ^= DISCARD_KEYS[i][card]
+    return h
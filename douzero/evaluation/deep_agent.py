@@ -1,7 +1,7 @@
 import torch
 import numpy as np
 
-from douzero.env.env import get_obs
+from douzero.env.env import ObservationBuilder
 
 def _load_model(position, model_path):
     from douzero.dmc.models import model_dict
@@ -21,9 +21,13 @@ def _load_model(position, model_path):
 
 class DeepAgent:
 
-    def __init__(self, position, model_path):
+    def __init__(self, position, model_path, shared_context=False):
         self.model = _load_model(position, model_path)
         self.position = position
+        # With `shared_context`, the context is built once per step
+        # and broadcast by the model (see LstmModel.forward_shared)
+        self.shared_context = shared_context
+        self.obs_builder = ObservationBuilder(shared_context=shared_context)
         
         # 随机分队（在创建agents时完成）
         self.team = None  # 'team1' or 'team2'
@@ -36,13 +40,21 @@ class DeepAgent:
         # 获取队友的信息（如果有）
         team_info = self.get_team_info(infoset)
 
-        obs = get_obs(infoset) 
+        obs = self.obs_builder(infoset)
 
-        z_batch = torch.from_numpy(obs['z_batch']).float()
-        x_batch = torch.from_numpy(obs['x_batch']).float()
-        if torch.cuda.is_available():
-            z_batch, x_batch = z_batch.cuda(), x_batch.cuda()
-        y_pred = self.model.forward(z_batch, x_batch, return_value=True)['values']
+        if self.shared_context:
+            z = torch.from_numpy(obs['z']).float()
+            x_no_action = torch.from_numpy(obs['x_no_action']).float()
+            action_batch = torch.from_numpy(obs['action_batch']).float()
+            if torch.cuda.is_available():
+                z, x_no_action, action_batch = z.cuda(), x_no_action.cuda(), action_batch.cuda()
+            y_pred = self.model.forward_shared(z, x_no_action, action_batch, return_value=True)['values']
+        else:
+            z_batch = torch.from_numpy(obs['z_batch']).float()
+            x_batch = torch.from_numpy(obs['x_batch']).float()
+            if torch.cuda.is_available():
+                z_batch, x_batch = z_batch.cuda(), x_batch.cuda()
+            y_pred = self.model.forward(z_batch, x_batch, return_value=True)['values']
         y_pred = y_pred.detach().cpu().numpy()
 
         best_action_index = np.argmax(y_pred, axis=0)[0]
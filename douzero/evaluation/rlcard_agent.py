@@ -20,6 +20,9 @@ class RLCardAgent(object):
         self.position = position
 
     def act(self, infoset):
+        # The infoset from the engine is read-only and the
+        # rules below rewrite its lists in place
+        infoset = infoset.snapshot()
         try:
             # Hand cards
             hand_cards = infoset.player_hand_cards
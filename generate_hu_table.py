@@ -0,0 +1,20 @@
+import argparse
+
+from douzero.env.hu_pattern_detector import HU_TABLE_PATH, build_hu_table, save_hu_table
+
+def get_parser():
+    parser = argparse.ArgumentParser(description='DouZero: hu pattern table generator')
+    parser.add_argument('--output', default=HU_TABLE_PATH, type=str)
+    parser.add_argument('--num_workers', default=None, type=int)
+    return parser
+
+
+if __name__ == '__main__':
+    flags = get_parser().parse_args()
+
+    print("output:", flags.output)
+    print("building table...")
+    table = build_hu_table(flags.num_workers)
+
+    print("saving table file...")
+    save_hu_table(table, flags.output)
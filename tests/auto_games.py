@@ -0,0 +1,40 @@
+"""
+测试用的自动牌局：四个座位的智能体第一次行动就宣布胡牌，之后都由引擎自动摸打。
+"""
+import numpy as np
+
+from douzero.env.cards import DECK
+from douzero.env.game import GameEnv, POSITIONS
+
+
+class DeclareHuAgent(object):
+    def act(self, infoset):
+        return [], 'hu'
+
+
+def deal(seed):
+    """按种子洗牌发牌，格式同 GameEnv.card_play_init"""
+    deck = np.random.default_rng(seed).permutation(DECK).tolist()
+    card_play_data = {position: deck[i * 7:(i + 1) * 7]
+                      for i, position in enumerate(POSITIONS)}
+    card_play_data['first_public_card'] = deck[28]
+    card_play_data['remaining'] = deck[29:]
+    return card_play_data
+
+
+def new_env(seed):
+    env = GameEnv({position: DeclareHuAgent() for position in POSITIONS}, seed=seed)
+    env.gold_cards = []
+    # 四人玩法还没有合法动作，智能体不看信息集
+    env.get_infoset = lambda: None
+    return env
+
+
+def play(env, seed):
+    """发一局牌并逐步打完，每一步之后(包括发牌换牌之后)产出一次"""
+    env.reset()
+    env.card_play_init(deal(seed))
+    yield
+    while not env.game_over:
+        env.step()
+        yield
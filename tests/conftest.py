@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 不安装也能直接在仓库根目录下运行测试
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,362 @@
+"""
+旧版检测器的冻结副本，只用于等价性测试。
+1. _check_pattern: 逐个调用 _is_*/_count_* 判断番型的版本(见 hu_pattern_detector.py)
+2. get_negative_score: 枚举所有牌型组合、逐个替换癞子的版本(见 score_detector.py)
+牌都是(点数,花色)元组，不要修改这里的实现。
+"""
+
+
+def _check_pattern(cards):
+    """检查具体牌型"""
+    # 100倍牌型
+    if _count_same_cards(cards, 14) >= 8:
+        return 100, "独一无二"
+    elif _count_same_cards(cards, 13) >= 8:
+        return 100, "君临天下"
+    elif _count_same_cards(cards, 10) >= 8:
+        return 100, "十全十美"
+    elif _count_same_cards(cards, 8) >= 8:
+        return 100, "八方来财"
+    
+    # 50倍牌型：八方来贺（8张同花色或同点数）
+    if _is_eight_same_suit(cards) or _is_eight_same_point(cards):
+        return 50, "八方来贺"
+    
+    # 32倍牌型
+    if _count_n_m_cards(cards, 13, 14) in [(6,2), (2,6)]:
+        return 32, "顶峰相见"
+    elif _count_n_m_cards(cards, 11, 12) in [(6,2), (2,6)]:
+        return 32, "心心相连"
+    elif _count_n_m_cards(cards, 9, 10) in [(6,2), (2,6)]:
+        return 32, "十拿九稳"
+    elif _count_n_m_cards(cards, 6, 7) in [(6,2), (2,6)]:
+        return 32, "六事兴旺"
+    
+    # 16倍牌型
+    if _is_six_two_adjacent(cards):
+        return 16, "比翼为邻"
+    elif _is_six_two_same_color(cards):
+        return 16, "六朝金粉"
+    
+    # 8倍牌型
+    if _is_six_two(cards):
+        return 8, "六六大顺"
+    elif _is_five_three_adjacent(cards):
+        return 8, "永恒相随"
+    elif _is_five_three_same_color(cards):
+        return 8, "五谷丰登"
+    
+    # 4倍牌型
+    if _is_five_three(cards):
+        return 4, "五福临门"
+    elif _is_four_four_adjacent(cards):
+        return 4, "二龙腾飞"
+    elif _is_four_four_same_color(cards):
+        return 4, "四季发财"
+    
+    # 2倍牌型
+    if _is_four_four(cards):
+        return 2, "四季如春"
+    
+    # 1倍牌型
+    if _is_three_three_two(cards):
+        return 1, "平胡"
+    
+    return 0, "不能胡牌"
+
+def _count_same_cards(cards, point):
+    """统计指定点数的牌数量"""
+    return sum(1 for card in cards if card[0] == point)
+
+def _count_n_m_cards(cards, point1, point2):
+    """统计两个点数的牌数量"""
+    count1 = sum(1 for card in cards if card[0] == point1)
+    count2 = sum(1 for card in cards if card[0] == point2)
+    return count1, count2
+
+def _is_eight_same_suit(cards):
+    """判断是否8张同花色"""
+    suits = [card[1] for card in cards]
+    return len(set(suits)) == 1 and len(suits) == 8
+
+def _is_eight_same_point(cards):
+    """判断是否8张同点数"""
+    points = [card[0] for card in cards]
+    return len(set(points)) == 1 and len(points) == 8
+
+def _is_same_color(cards):
+    """判断所有牌是否同色(红色或黑色)"""
+    suits = [card[1] for card in cards]
+    return all(suit % 2 == suits[0] % 2 for suit in suits)
+
+def _is_six_two_adjacent(cards):
+    """判断是否是6+2相邻的组合"""
+    point_counts = {}
+    for card in cards:
+        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
+    
+    for point in range(6, 14):
+        if (point_counts.get(point, 0) == 6 and point_counts.get(point + 1, 0) == 2) or \
+           (point_counts.get(point, 0) == 2 and point_counts.get(point + 1, 0) == 6):
+            return True
+    return False
+
+def _is_six_two_same_color(cards):
+    """判断是否是6+2同色的组合"""
+    if not _is_same_color(cards):
+        return False
+    
+    point_counts = {}
+    for card in cards:
+        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
+    
+    counts = sorted(point_counts.values())
+    return len(counts) == 2 and counts == [2, 6]
+
+def _is_six_two(cards):
+    """判断是否是6+2的组合"""
+    point_counts = {}
+    for card in cards:
+        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
+    
+    counts = sorted(point_counts.values())
+    return len(counts) == 2 and counts == [2, 6]
+
+def _is_five_three_adjacent(cards):
+    """判断是否是5+3相邻的组合"""
+    point_counts = {}
+    for card in cards:
+        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
+    
+    for point in range(6, 14):
+        if (point_counts.get(point, 0) == 5 and point_counts.get(point + 1, 0) == 3) or \
+           (point_counts.get(point, 0) == 3 and point_counts.get(point + 1, 0) == 5):
+            return True
+    return False
+
+def _is_five_three_same_color(cards):
+    """判断是否是5+3同色的组合"""
+    if not _is_same_color(cards):
+        return False
+    
+    point_counts = {}
+    for card in cards:
+        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
+    
+    counts = sorted(point_counts.values())
+    return len(counts) == 2 and counts == [3, 5]
+
+def _is_five_three(cards):
+    """判断是否是5+3的组合"""
+    point_counts = {}
+    for card in cards:
+        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
+    
+    counts = sorted(point_counts.values())
+    return len(counts) == 2 and counts == [3, 5]
+
+def _is_four_four_adjacent(cards):
+    """判断是否是4+4相邻的组合"""
+    point_counts = {}
+    for card in cards:
+        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
+    
+    for point in range(6, 14):
+        if point_counts.get(point, 0) == 4 and point_counts.get(point + 1, 0) == 4:
+            return True
+    return False
+
+def _is_four_four_same_color(cards):
+    """判断是否是4+4同色的组合"""
+    if not _is_same_color(cards):
+        return False
+    
+    point_counts = {}
+    for card in cards:
+        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
+    
+    counts = sorted(point_counts.values())
+    return len(counts) == 2 and counts == [4, 4]
+
+def _is_four_four(cards):
+    """判断是否是4+4的组合"""
+    point_counts = {}
+    for card in cards:
+        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
+    
+    counts = sorted(point_counts.values())
+    return len(counts) == 2 and counts == [4, 4]
+
+def _is_three_three_two(cards):
+    """判断是否是3+3+2的组合(平胡)"""
+    point_counts = {}
+    for card in cards:
+        point_counts[card[0]] = point_counts.get(card[0], 0) + 1
+    
+    counts = sorted(point_counts.values())
+    return len(counts) == 3 and counts == [2, 3, 3]
+
+
+def get_negative_score(input_cards):
+    """计算7张牌的最小负分
+    Args:
+        input_cards: 玩家手牌列表(7张)，每张牌是一个元组(点数,花色)
+                    点数：6-10=6-10, J=11, Q=12, K=13, A=14, 问号=0
+                    花色：黑桃=0, 红桃=1, 梅花=2, 方片=3, 癞子=-1
+    Returns:
+        int: 最小负分值
+    """
+    # 1. 分离普通牌、问号和癞子
+    normal_cards = []
+    question_marks = []
+    joker_count = 0
+    for card in input_cards:
+        if card[1] == -1:  # 癞子
+            joker_count += 1
+        elif card[0] == 0:  # 问号
+            question_marks.append(card)
+        else:  # 普通牌
+            normal_cards.append(card)
+    
+    # 2. 生成所有可能的牌（6-A的四种花色）
+    all_possible_cards = [(p, s) for p in range(6, 15) for s in range(4)]
+    
+    def try_all_replacements(remaining_jokers, current_cards):
+        """递归尝试所有可能的癞子替换方案
+        Args:
+            remaining_jokers: 剩余待替换的癞子数量
+            current_cards: 当前已经替换的牌组
+        Returns:
+            int: 当前替换方案下的最小负分
+        """
+        # 基础情况：所有癞子都已替换完
+        if remaining_jokers == 0:
+            combinations = []
+            _find_all_combinations(current_cards, [], set(), combinations)
+            
+            # 计算最小负分
+            min_score = float('inf')
+            for used_groups in combinations:
+                used_cards = set()
+                for group in used_groups:
+                    used_cards.update(group)
+                unused_cards = set(current_cards) - used_cards
+                score = sum(_get_card_score(card) for card in unused_cards)
+                if score == 0:  # 找到负分为0的组合就直接返回
+                    return 0
+                min_score = min(min_score, score)
+            return min_score
+        
+        # 递归情况：尝试所有可能的替换
+        min_score = float('inf')
+        for card in all_possible_cards:
+            score = try_all_replacements(remaining_jokers - 1, current_cards + [card])
+            if score == 0:  # 找到负分为0的组合就直接返回
+                return 0
+            min_score = min(min_score, score)
+        return min_score
+    
+    # 3. 开始计算最小负分
+    min_score = try_all_replacements(joker_count, normal_cards)
+    return min_score if min_score != float('inf') else sum(_get_card_score(card) for card in normal_cards)
+
+def _find_all_combinations(input_cards, current_groups, used_cards, result):
+    """找出所有可能的有效牌型组合（同花顺或同点数）
+    Args:
+        input_cards: 输入的牌组
+        current_groups: 当前已找到的组合
+        used_cards: 当前已使用的牌
+        result: 存储所有找到的组合
+    """
+    # 把当前组合加入结果
+    if current_groups:
+        result.append(current_groups[:])
+    
+    # 找出所有可能的同点数和同花顺组合
+    point_groups = _find_point_groups(input_cards, used_cards)
+    straight_groups = _find_straight_groups(input_cards, used_cards)
+    
+    # 尝试添加每个可能的组合
+    for group in point_groups + straight_groups:
+        if not (set(group) & used_cards):  # 确保没有重复使用的牌
+            current_groups.append(group)
+            new_used = used_cards | set(group)
+            _find_all_combinations(input_cards, current_groups, new_used, result)
+            current_groups.pop()
+
+def _find_point_groups(input_cards, used_cards):
+    """找出所有可能的同点数组合（3张及以上）
+    Args:
+        input_cards: 输入的牌组
+        used_cards: 已使用的牌
+    Returns:
+        list: 所有可能的同点数组合列表
+    """
+    result = []
+    # 按点数分组
+    point_groups = {}
+    for card in input_cards:
+        if card not in used_cards:
+            point_groups.setdefault(card[0], []).append(card)
+    
+    # 对每个点数，找出所有可能的组合（3-7张）
+    for _, same_cards in point_groups.items():
+        for i in range(len(same_cards)):
+            for j in range(i + 2, len(same_cards) + 1):
+                group = same_cards[i:j]
+                if len(group) >= 3:
+                    result.append(tuple(sorted(group)))
+    return result
+
+def _find_straight_groups(input_cards, used_cards):
+    """找出所有可能的同花顺组合（3张及以上）
+    Args:
+        input_cards: 输入的牌组
+        used_cards: 已使用的牌
+    Returns:
+        list: 所有可能的同花顺组合列表
+    """
+    result = []
+    # 按花色分组
+    suit_groups = {}
+    for card in input_cards:
+        if card not in used_cards:
+            suit_groups.setdefault(card[1], []).append(card)
+    
+    # 对每种花色找顺子
+    for _, suited_cards in suit_groups.items():
+        suited_cards.sort(key=lambda x: x[0])
+        # 对每个可能的起始位置
+        for i in range(len(suited_cards)):
+            straight = [suited_cards[i]]
+            # 尝试构建顺子
+            for j in range(i + 1, len(suited_cards)):
+                if suited_cards[j][0] == straight[-1][0] + 1:
+                    straight.append(suited_cards[j])
+                    if len(straight) >= 3:
+                        result.append(tuple(straight))
+                elif suited_cards[j][0] > straight[-1][0] + 1:
+                    break
+    return result
+
+def _get_card_score(card):
+    """获取单张牌的负分值
+    Args:
+        card: (点数,花色)元组
+    Returns:
+        int: 负分值
+             问号=0分
+             6-10=10分
+             J-K=20分
+             A=30分
+    """
+    point = card[0]
+    if point == 0:  # 问号
+        return 0
+    elif 6 <= point <= 10:  # 6-10
+        return 10
+    elif 11 <= point <= 13:  # J-Q-K
+        return 20
+    elif point == 14:  # A
+        return 30
+    return 0
@@ -0,0 +1,44 @@
+"""
+DrawPile 的切片和遍历只读取到的牌，结果和 to_list 一致。
+"""
+import random
+import tracemalloc
+
+from douzero.env.card_piles import DrawPile
+from douzero.env.cards import DECK
+
+
+def test_slices_and_iteration_match_the_remaining_cards():
+    rng = random.Random(0)
+    bounds = [None] + list(range(-12, 12))
+    for _ in range(500):
+        pile = DrawPile(rng.sample(range(38), rng.randint(0, 10)))
+        for _ in range(rng.randint(0, len(pile))):
+            pile.pop()
+        remaining = pile.to_list()
+        assert list(pile) == remaining
+        for _ in range(10):
+            index = slice(rng.choice(bounds), rng.choice(bounds),
+                          rng.choice((None, 1, 2, -1, -3)))
+            assert pile[index] == remaining[index]
+
+
+def _peak_memory(function):
+    """调用 function 时新分配内存的峰值(字节)，取两次中较小的一次"""
+    peaks = []
+    for _ in range(2):
+        tracemalloc.start()
+        function()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return min(peaks)
+
+
+def test_top_four_and_iteration_do_not_copy_the_pile():
+    # 只读顶部几张牌时分配的内存和牌堆大小无关，复制剩余的牌时会多出几百字节
+    small = DrawPile(DECK.tolist()[:10])
+    large = DrawPile(DECK.tolist())
+    for pile in (small, large):
+        pile.pop()
+    for read in (lambda pile: pile[:4], lambda pile: next(iter(pile))):
+        assert _peak_memory(lambda: read(large)) <= _peak_memory(lambda: read(small)) + 64
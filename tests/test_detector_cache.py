@@ -0,0 +1,50 @@
+"""
+LRUCache 的淘汰顺序和统计，以及检测器缓存的命中。
+"""
+from douzero.env import detector_cache
+from douzero.env.detector_cache import LRUCache, cached_detector
+
+
+def test_lru_cache_evicts_the_least_recently_used_key():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # b 变成最久未使用
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'evictions': 1,
+                             'size': 2, 'hit_rate': 0.75}
+
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'evictions': 0,
+                             'size': 0, 'hit_rate': 0.0}
+
+
+def test_cached_detector_counts_hits_on_the_canonical_key():
+    calls = []
+
+    @cached_detector('hu', detector_cache.hu_cache_key)
+    def detect(cards):
+        calls.append(list(cards))
+        return len(calls)
+
+    # 缓存关闭时每次都调用
+    detect([(6, 0), (7, 1)])
+    detect([(6, 0), (7, 1)])
+    assert len(calls) == 2
+
+    detector_cache.enable_detector_cache(2)
+    try:
+        assert detect([(6, 0), (7, 1)]) == 3
+        # 顺序不同的同一手牌命中缓存
+        assert detect([(7, 1), (6, 0)]) == 3
+        # 花色不同是另一手牌
+        assert detect([(6, 0), (7, 0)]) == 4
+        detect([(8, 0), (9, 0)])
+        assert detector_cache.get_detector_cache_stats()['hu'] == {
+            'hits': 1, 'misses': 3, 'evictions': 1, 'size': 2, 'hit_rate': 0.25}
+    finally:
+        detector_cache.disable_detector_cache()
+    assert detector_cache.get_detector_cache_stats() == {}
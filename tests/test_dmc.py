@@ -0,0 +1,42 @@
+"""
+训练用的缓冲区、优化器和模型按传入的座位创建，形状都来自座位的特征集合。
+"""
+import types
+
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from douzero.dmc.models import Model
+from douzero.dmc.utils import DOUDIZHU_POSITIONS, _cards2tensor, create_buffers, create_optimizers
+from douzero.env.features import get_feature_set
+from douzero.env.game import POSITIONS
+
+
+@pytest.mark.parametrize('positions', [DOUDIZHU_POSITIONS, POSITIONS])
+def test_buffers_optimizers_and_models_follow_the_positions(positions):
+    flags = types.SimpleNamespace(unroll_length=5, num_buffers=2, learning_rate=1e-4,
+                                  momentum=0, epsilon=1e-5, alpha=0.99)
+    buffers = create_buffers(flags, ['cpu'], positions)['cpu']
+    model = Model(device='cpu', positions=positions)
+    optimizers = create_optimizers(flags, model, positions)
+    assert set(buffers) == set(optimizers) == set(model.get_models()) == set(positions)
+
+    for position in positions:
+        feature_set = get_feature_set(position)
+        position_buffers = buffers[position]
+        assert len(position_buffers['obs_z']) == flags.num_buffers
+        obs_x_no_action = position_buffers['obs_x_no_action'][0].zero_()
+        obs_action = position_buffers['obs_action'][0].zero_()
+        obs_z = position_buffers['obs_z'][0].zero_()
+        assert obs_x_no_action.shape == (5, feature_set.width)
+        assert obs_action.shape == (5, feature_set.action_dim)
+        assert obs_z.shape == (5,) + feature_set.z_shape
+
+        # 和 learn 一样拼出模型输入
+        obs_x = torch.cat((obs_x_no_action, obs_action), dim=1).float()
+        values = model.forward(position, obs_z.float(), obs_x, True)['values']
+        assert values.shape == (5, 1)
+
+        action = [0] if position in POSITIONS else [3, 3]
+        assert _cards2tensor(position, action).shape == (feature_set.action_dim,)
@@ -0,0 +1,107 @@
+"""
+同一个种子的 Env 发同样的牌、打出同样的牌局，不同的种子发的牌不同。
+"""
+import types
+
+import numpy as np
+import pytest
+
+from douzero.env.env import Env
+from douzero.env.game import POSITIONS
+
+from auto_games import DeclareHuAgent
+
+
+def _seeded_env(seed):
+    env = Env('adp', seed=seed)
+    game = env._env
+    game.players = {position: DeclareHuAgent() for position in POSITIONS}
+    game.gold_cards = []
+
+    def get_infoset():
+        # 四人玩法还没有合法动作，用手里的单张代替，其余字段和 get_infoset 一样引用引擎
+        infoset = game.info_sets[game.acting_player_position]
+        if not game._hand_views_valid:
+            game._rebuild_hand_views()
+        infoset.num_cards_left_dict = game.num_cards_left_dict
+        infoset.other_hand_cards = game._other_hand_cards[infoset.player_position]
+        infoset.all_handcards = game.all_handcards
+        infoset.played_cards = game.played_cards
+        infoset.last_move_dict = game.last_move_dict
+        infoset.card_play_action_seq = game.card_play_action_seq
+        infoset.legal_actions = [[code] for code in infoset.hand.codes().tolist()]
+        return infoset.view()
+    game.get_infoset = get_infoset
+    return env
+
+
+def _frozen(obs):
+    return {key: value.copy() if isinstance(value, np.ndarray) else value
+            for key, value in obs.items()}
+
+
+def _play(env, num_games=3):
+    """打几局，记下每一步的观测和每一局的结果"""
+    trace = []
+    game = env._env
+    for _ in range(num_games):
+        trace.append(_frozen(env.reset()))
+        while not game.game_over:
+            game.step()
+            trace.append(_frozen(env._obs_builder(game.get_infoset())))
+        trace.append((game.state_hash, dict(game.hu_sequences), dict(game.beans)))
+    return trace
+
+
+def _same(trace, other):
+    if len(trace) != len(other):
+        return False
+    for item, other_item in zip(trace, other):
+        if isinstance(item, dict) and 'x_no_action' in item:
+            if item.keys() != other_item.keys():
+                return False
+            for key, value in item.items():
+                if isinstance(value, np.ndarray):
+                    if not np.array_equal(value, other_item[key]):
+                        return False
+                elif value != other_item[key]:
+                    return False
+        elif item != other_item:
+            return False
+    return True
+
+
+def _first_deal(env):
+    env.reset()
+    return {position: list(cards) for position, cards in env._env.all_handcards.items()}
+
+
+def test_same_seed_replays_the_same_games():
+    for seed in (0, 7, np.random.SeedSequence(3, spawn_key=(1,))):
+        trace = _play(_seeded_env(seed))
+        assert _same(trace, _play(_seeded_env(seed)))
+    assert not _same(_play(_seeded_env(0)), _play(_seeded_env(1)))
+
+
+def test_different_seeds_deal_different_cards():
+    deals = [_first_deal(_seeded_env(seed)) for seed in range(5)]
+    assert all(deals[i] != deals[j] for i in range(5) for j in range(i))
+    assert _first_deal(_seeded_env(2)) == deals[2]
+
+
+def test_create_env_gives_each_actor_its_own_stream():
+    pytest.importorskip('torch')
+    from douzero.dmc.utils import create_env
+
+    def actor_deal(seed, actor_key):
+        flags = types.SimpleNamespace(seed=seed, objective='adp', shared_context=False)
+        env = create_env(flags, actor_key)
+        env._env.players = {position: DeclareHuAgent() for position in POSITIONS}
+        env._env.gold_cards = []
+        env._env.get_infoset = lambda: None
+        env._obs_builder = lambda infoset: None
+        return _first_deal(env)
+
+    assert actor_deal(5, (0, 1)) == actor_deal(5, (0, 1))
+    assert actor_deal(5, (0, 1)) != actor_deal(5, (0, 2))
+    assert actor_deal(5, (0, 1)) != actor_deal(6, (0, 1))
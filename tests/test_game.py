@@ -0,0 +1,240 @@
+"""
+GameEnv 的自动胡牌流程。
+"""
+from douzero.env.card_piles import DrawPile, PublicCards
+from douzero.env.cards import CARD2CODE, HandCards, QUESTION_MARK
+from douzero.env.game import GameEnv, POSITIONS
+from douzero.env.hu_pattern_detector import get_ting_multipliers
+
+from auto_games import DeclareHuAgent, new_env, play
+
+# 牌的编码：(点数-6)*4+花色
+K_SPADE, K_HEART, K_CLUB = 28, 29, 30
+A_SPADE, A_HEART, A_CLUB = 32, 33, 34
+SIX_SPADE, SEVEN_SPADE, NINE_SPADE = 0, 4, 12
+
+
+def _make_env(hands, pile, public_cards=()):
+    """按给定的手牌、牌堆和公共牌区摆好一局，不发牌也不换牌"""
+    env = GameEnv({}, seed=0)
+    env.gold_cards = []
+    for position, codes in hands.items():
+        env.info_sets[position].hand = HandCards(codes)
+        env._hand_changed(position)
+    env._rebuild_hand_views()
+    env.remaining_cards = DrawPile(pile)
+    env.public_cards = PublicCards(list(public_cards) + [None] * (4 - len(public_cards)))
+    env.acting_player_position = 'first'
+    env._rebuild_state_hash()
+    return env
+
+
+def test_auto_hu_picks_a_winning_card_after_drawing_a_question_mark():
+    # 6张A加1张K听K(顶峰相见)，摸到问号后从牌堆顶4张中选出红桃K胡掉
+    hand = [A_SPADE, A_SPADE, A_HEART, A_HEART, A_CLUB, A_CLUB, K_SPADE]
+    env = _make_env({'first': hand},
+                    [QUESTION_MARK, SIX_SPADE, K_HEART, SEVEN_SPADE, NINE_SPADE, SIX_SPADE])
+    env.auto_hu_players.add('first')
+
+    assert env.handle_auto_hu('first') == ('hu', K_HEART)
+    assert env.hu_sequences['first'] == [K_HEART]
+    # 没选中的牌保持原顺序留在牌堆里，胡牌后牌堆顶的牌补到公共牌区最左边
+    assert env.public_cards[0] == SIX_SPADE
+    assert env.remaining_cards.to_list() == [SEVEN_SPADE, NINE_SPADE, SIX_SPADE]
+
+
+def test_question_mark_drawn_last_is_played():
+    # 问号是牌堆最后一张时没有牌可选，直接打出
+    hand = [A_SPADE, A_SPADE, A_HEART, A_HEART, A_CLUB, A_CLUB, K_SPADE]
+    env = _make_env({'first': hand}, [QUESTION_MARK])
+    env.auto_hu_players.add('first')
+
+    assert env.handle_auto_hu('first') == ('play', QUESTION_MARK)
+    assert env.public_cards[0] == QUESTION_MARK
+
+
+def test_question_mark_picks_the_most_valuable_winning_card():
+    # 4张A加3张K：胡A是永恒相随(8倍)，胡K是二龙腾飞(4倍)，虽然K在前面也要选A
+    hand = [A_SPADE, A_SPADE, A_HEART, A_HEART, K_SPADE, K_SPADE, K_HEART]
+    env = _make_env({'first': hand},
+                    [QUESTION_MARK, K_CLUB, A_CLUB, SIX_SPADE, SEVEN_SPADE, NINE_SPADE])
+    env.auto_hu_players.add('first')
+    # 三家各输 底分*倍数*硬胡2倍，价值再除以硬胡系数
+    assert env.calculate_hu_values('first', [K_CLUB, A_CLUB]).tolist() == [
+        450 * 4 * 3, 450 * 8 * 3]
+
+    assert env.handle_auto_hu('first') == ('hu', A_CLUB)
+    # 问号用掉进入废牌区，手牌回到原来的7张
+    assert env.discard_cards == [QUESTION_MARK]
+    assert sorted(env.info_sets['first'].hand) == sorted(hand)
+    assert env.remaining_cards.to_list() == [SIX_SPADE, SEVEN_SPADE, NINE_SPADE]
+
+
+def test_declaring_hu_passes_the_turn_like_an_auto_hu_turn():
+    # 智能体宣布胡牌后轮到下家，不会被 fast_forward 再替它摸打一次
+    hand = [A_SPADE, A_SPADE, A_HEART, A_HEART, A_CLUB, A_CLUB, K_SPADE]
+    env = _make_env({'first': hand}, [SIX_SPADE, SEVEN_SPADE, NINE_SPADE])
+    env.players = {'first': DeclareHuAgent()}
+    env.game_infoset = None
+
+    env.step()
+    assert env.auto_hu_players == {'first'}
+    assert env.acting_player_position == 'first_up'
+    assert env.fast_forward() == []
+    assert env.remaining_cards.to_list() == [SIX_SPADE, SEVEN_SPADE, NINE_SPADE]
+
+    # 已胡牌玩家的回合由 step 和 fast_forward 处理都一样：摸打一次后轮到下家
+    env.acting_player_position = 'first'
+    env.step()
+    assert env.acting_player_position == 'first_up'
+    assert env.remaining_cards.to_list() == [SEVEN_SPADE, NINE_SPADE]
+
+
+class _EventHook(object):
+    """当作牌局记录器挂在引擎上，每个事件之后调用 check(env)"""
+
+    def __init__(self, env, check):
+        self.env = env
+        self.check = check
+        self.num_checked = 0
+
+    def begin_game(self, card_play_data, beans):
+        pass
+
+    def set_exchange_direction(self, direction):
+        pass
+
+    def record(self, position, action, card=None):
+        self.check(self.env)
+        self.num_checked += 1
+
+
+def _check_ting_index(env):
+    # 顺便把听牌索引算好，之后手牌有变化却没有失效时就会查到旧结果
+    for pos in POSITIONS:
+        hand = tuple(env.info_sets[pos].hand.codes().tolist())
+        assert env.get_ting_cards(pos) == get_ting_multipliers(hand)
+
+
+def test_ting_index_follows_every_hand_change():
+    env = new_env(0)
+    env.recorder = hook = _EventHook(env, _check_ting_index)
+    for seed in range(30):
+        for _ in play(env, seed):
+            pass
+    assert hook.num_checked > 1000
+
+
+def _check_hand_views(env):
+    # 由手牌从头算出的派生字段
+    all_handcards = {pos: env.info_sets[pos].hand.to_list() for pos in POSITIONS}
+    assert env.num_cards_left_dict == {pos: len(all_handcards[pos]) for pos in POSITIONS}
+    assert env.all_handcards == all_handcards
+    for pos in POSITIONS:
+        others = [card for other in POSITIONS if other != pos
+                  for card in all_handcards[other]]
+        assert env._other_hand_cards[pos] == sorted(others, key=CARD2CODE.__getitem__)
+
+
+def test_hand_views_match_a_full_recompute_after_every_event():
+    env = new_env(0)
+    env.recorder = hook = _EventHook(env, _check_hand_views)
+    for seed in range(30):
+        for _ in play(env, seed):
+            _check_hand_views(env)
+    assert hook.num_checked > 1000
+
+
+def _rebuilt_state_hash(env):
+    """在新的 GameEnv 上摆出同样的局面，从头算出的 state_hash"""
+    fresh = GameEnv({}, seed=0)
+    for pos in POSITIONS:
+        fresh.info_sets[pos].hand = HandCards(env.info_sets[pos].hand.codes())
+    fresh.remaining_cards = DrawPile(env.remaining_cards.to_list())
+    fresh.public_cards = PublicCards(env.public_cards.to_list())
+    fresh.discard_cards = list(env.discard_cards)
+    fresh.acting_player_position = env.acting_player_position
+    fresh.auto_hu_players = set(env.auto_hu_players)
+    fresh.bu_hu_state = env.bu_hu_state
+    fresh.bu_hu_starter = env.bu_hu_starter
+    fresh.game_over = env.game_over
+    fresh._rebuild_state_hash()
+    return fresh.state_hash
+
+
+def _check_state_hash(env):
+    assert env.state_hash == _rebuilt_state_hash(env)
+
+
+def test_state_hash_matches_a_full_recompute_after_every_event():
+    env = new_env(0)
+    env.recorder = hook = _EventHook(env, _check_state_hash)
+    hashes = set()
+    for seed in range(30):
+        for _ in play(env, seed):
+            _check_state_hash(env)
+            hashes.add(env.state_hash)
+    assert hook.num_checked > 1000
+    # 不同的局面哈希不同
+    assert len(hashes) > 1000
+
+
+def _game_state(env):
+    """snapshot 应该保存的全部牌局状态"""
+    return ({pos: env.info_sets[pos].hand.codes().tolist() for pos in POSITIONS},
+            {pos: env.get_ting_cards(pos) for pos in POSITIONS},
+            env.remaining_cards.to_list(),
+            env.public_cards.to_list(),
+            list(env.discard_cards),
+            {pos: list(env.played_cards[pos]) for pos in POSITIONS},
+            {pos: list(env.last_move_dict[pos]) for pos in POSITIONS},
+            [list(move) for move in env.card_play_action_seq],
+            {pos: list(env.hu_sequences[pos]) for pos in POSITIONS},
+            dict(env.beans),
+            set(env.auto_hu_players),
+            env.bu_hu_state,
+            env.bu_hu_starter,
+            env.acting_player_position,
+            env.game_over,
+            env.state_hash)
+
+
+def _play_to_the_end(env):
+    states = []
+    while not env.game_over:
+        env.step()
+        states.append(_game_state(env))
+    return states
+
+
+def _rng_draws(env):
+    return env.rng.integers(1 << 30, size=8).tolist()
+
+
+def test_restore_returns_to_the_snapshot():
+    env = new_env(0)
+    for seed in range(12, 18):
+        for step, _ in enumerate(play(env, seed)):
+            # 分别在对局中途和补胡阶段保存
+            if step == 20 or env.bu_hu_state:
+                break
+        token = env.snapshot()
+        saved = _game_state(env)
+        draws = _rng_draws(env)
+        env.restore(token)
+        continuation = _play_to_the_end(env)
+
+        # 打完这一局再打一整局(换牌会用掉随机数)，再改掉豆子
+        for _ in play(env, seed + 100):
+            pass
+        for pos in POSITIONS:
+            env.beans[pos] += 1
+        assert _game_state(env) != saved
+
+        for _ in range(2):
+            env.restore(token)
+            assert _game_state(env) == saved
+            assert env.state_hash == _rebuilt_state_hash(env)
+            assert _rng_draws(env) == draws
+            env.restore(token)
+            assert _play_to_the_end(env) == continuation
@@ -0,0 +1,27 @@
+"""
+牌局记录回放到任意一步时，局面和记录时的牌局一致。
+"""
+from douzero.env import game_record as gr
+
+from auto_games import new_env, play
+
+
+def test_replay_matches_the_live_table_after_every_step(tmp_path):
+    path = str(tmp_path / 'games')
+    checkpoints = []
+    env = new_env(0)
+    with gr.GameRecordWriter(path) as writer:
+        env.recorder = writer
+        for seed in range(20):
+            checkpoints.append([(len(writer._events) // gr.EVENT_DTYPE.itemsize,
+                                 env.state_hash, env.acting_player_position)
+                                for _ in play(env, seed)])
+
+    reader = gr.GameRecordReader(path)
+    assert len(reader) == 20
+    replay_env = new_env(0)
+    for record, steps in zip(reader, checkpoints):
+        for num_events, state_hash, position in steps:
+            gr.replay(record, num_events, game_env=replay_env)
+            assert replay_env.acting_player_position == position
+            assert replay_env.state_hash == state_hash
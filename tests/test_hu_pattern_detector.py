@@ -0,0 +1,92 @@
+"""
+hu_pattern_detector 的番型判断和旧版 _check_pattern 逐个比较，
+批量判断、听牌和逐手调用 get_hu_multiplier 逐个比较。
+"""
+import random
+
+import numpy as np
+import pytest
+
+from douzero.env.cards import CODE2CARD, JOKER, NUM_NORMAL_CARDS, QUESTION_MARK
+from douzero.env.hu_pattern_detector import (HAND_SIZE, PATTERN_NAMES, _check_pattern,
+                                             _iter_histograms, get_hu_multiplier,
+                                             get_hu_multiplier_batch, get_ting_multipliers)
+
+import legacy_detectors
+
+# 第k张牌的花色，覆盖同花、同色不同花和杂色
+SUIT_LAYOUTS = (
+    [0] * 8, [1] * 8, [2] * 8, [3] * 8,
+    [0, 2] * 4, [1, 3] * 4,
+    [0, 2, 2, 2, 2, 2, 2, 2], [3, 3, 3, 3, 3, 3, 3, 1],
+    [0, 1, 2, 3] * 2, [0, 1] * 4, [0, 0, 0, 0, 0, 0, 0, 1],
+)
+
+
+def _assert_same(codes):
+    expected = legacy_detectors._check_pattern([CODE2CARD[code] for code in codes])
+    assert _check_pattern(codes) == expected, [CODE2CARD[code] for code in codes]
+
+
+def test_every_histogram_and_suit_layout():
+    """8张牌在9个点数上的全部12870种直方图，每种配上所有花色情况"""
+    for counts in _iter_histograms():
+        points = [i for i, count in enumerate(counts) for _ in range(count)]
+        for suits in SUIT_LAYOUTS:
+            _assert_same([point * 4 + suit for point, suit in zip(points, suits)])
+
+
+def test_random_hands():
+    rng = random.Random(0)
+    for _ in range(20000):
+        _assert_same([rng.randrange(NUM_NORMAL_CARDS) for _ in range(HAND_SIZE)])
+
+
+def test_wrong_size():
+    assert _check_pattern([0] * 7) == (0, "不能胡牌")
+
+
+def _wild_hand(rng):
+    """点数和花色都集中的一手牌，带0-4张癞子，偶尔带问号"""
+    low = rng.randrange(9)
+    points = range(low, min(low + rng.randrange(1, 4), 9))
+    suits = rng.sample(range(4), rng.randrange(1, 5))
+    num_jokers = rng.randrange(5)
+    codes = [rng.choice(points) * 4 + rng.choice(suits)
+             for _ in range(HAND_SIZE - num_jokers)] + [JOKER] * num_jokers
+    if rng.random() < 0.1:
+        codes[rng.randrange(HAND_SIZE)] = QUESTION_MARK
+    rng.shuffle(codes)
+    return codes
+
+
+def test_batch_matches_get_hu_multiplier():
+    rng = random.Random(1)
+    hands = [_wild_hand(rng) for _ in range(5000)]
+    hands += [[rng.randrange(NUM_NORMAL_CARDS) for _ in range(HAND_SIZE)] for _ in range(1000)]
+    multipliers, pattern_ids = get_hu_multiplier_batch(np.array(hands))
+    for codes, multiplier, pattern_id in zip(hands, multipliers.tolist(), pattern_ids.tolist()):
+        expected = get_hu_multiplier([CODE2CARD[code] for code in codes])
+        assert (multiplier, PATTERN_NAMES[pattern_id]) == expected, codes
+    # 覆盖了能胡的手牌、癞子和问号
+    assert (multipliers > 0).sum() > 500
+    assert any(JOKER in codes and multiplier > 0
+               for codes, multiplier in zip(hands, multipliers.tolist()))
+    assert any(QUESTION_MARK in codes for codes in hands)
+
+
+def test_batch_rejects_wrong_shape():
+    with pytest.raises(ValueError):
+        get_hu_multiplier_batch(np.zeros((3, HAND_SIZE - 1), dtype=np.int64))
+
+
+def test_ting_multipliers_match_get_hu_multiplier():
+    rng = random.Random(2)
+    for _ in range(300):
+        hand = _wild_hand(rng)[:HAND_SIZE - 1]
+        expected = {}
+        for code in range(NUM_NORMAL_CARDS + 2):
+            multiplier, _ = get_hu_multiplier([CODE2CARD[c] for c in hand + [code]])
+            if multiplier > 0:
+                expected[code] = multiplier
+        assert get_ting_multipliers(tuple(hand)) == expected, hand
@@ -0,0 +1,103 @@
+"""
+InfoSet.view 交给智能体的只读视图改不了引擎状态，snapshot 和引擎状态互不影响。
+"""
+import pytest
+
+from douzero.env.game import InfoSet, POSITIONS
+
+from auto_games import new_env, play
+
+
+def _engine_infoset(env, position='first'):
+    """像 get_infoset 一样让信息集直接引用引擎里的字段"""
+    infoset = env.info_sets[position]
+    infoset.num_cards_left_dict = env.num_cards_left_dict
+    infoset.other_hand_cards = env._other_hand_cards[position]
+    infoset.all_handcards = env.all_handcards
+    infoset.card_play_action_seq = [[1, 2], [3]]
+    infoset.legal_actions = [[card] for card in infoset.hand.codes().tolist()]
+    infoset.last_move = [3]
+    infoset.last_two_moves = [[1, 2], [3]]
+    infoset.last_move_dict = {pos: [] for pos in POSITIONS}
+    infoset.played_cards = {pos: [] for pos in POSITIONS}
+    infoset.bomb_num = 0
+    return infoset
+
+
+def _started_env():
+    env = new_env(0)
+    next(play(env, 0))
+    return env
+
+
+def test_view_rejects_mutation_and_follows_the_engine():
+    env = _started_env()
+    infoset = _engine_infoset(env)
+    view = infoset.view()
+
+    with pytest.raises(TypeError):
+        view.legal_actions[0] = []
+    with pytest.raises(AttributeError):
+        view.legal_actions.append([0])
+    with pytest.raises(AttributeError):
+        view.legal_actions[0].append(0)
+    with pytest.raises(TypeError):
+        view.num_cards_left_dict['first'] = 0
+    with pytest.raises(AttributeError):
+        view.all_handcards['first_up'].pop()
+    with pytest.raises(TypeError):
+        del view.last_two_moves[0]
+    with pytest.raises(AttributeError):
+        view.played_cards['first'].extend([0])
+    assert infoset.legal_actions == view.legal_actions
+
+    # 视图和引擎共用数据，引擎之后的改动在视图里也能看到
+    # (宣布胡牌后自动摸打的手牌不变，这里直接让引擎摸一张)
+    before = infoset.snapshot()
+    env.draw_card('first_up')
+    assert view.all_handcards != before.all_handcards
+    assert view.num_cards_left_dict == env.num_cards_left_dict
+    assert view.all_handcards == env.all_handcards
+    assert view.other_hand_cards == env._other_hand_cards['first']
+
+
+def test_snapshot_is_detached_from_the_engine():
+    env = _started_env()
+    infoset = _engine_infoset(env)
+    for source in (infoset, infoset.view()):
+        snapshot = source.snapshot()
+        assert isinstance(snapshot, InfoSet)
+        assert snapshot.all_handcards == env.all_handcards
+
+        # 改快照不影响引擎
+        before = {pos: list(cards) for pos, cards in env.all_handcards.items()}
+        snapshot.all_handcards['first'].clear()
+        snapshot.num_cards_left_dict['first'] = 0
+        snapshot.last_two_moves[0][0] = 'x'
+        snapshot.hand.remove(snapshot.hand.codes()[0])
+        assert env.all_handcards == before
+        assert env.num_cards_left_dict['first'] == len(before['first'])
+        assert infoset.last_two_moves == [[1, 2], [3]]
+        assert len(infoset.hand) == len(before['first'])
+
+    # 引擎之后的改动也不会出现在快照里
+    snapshot = infoset.snapshot()
+    frozen = {pos: list(cards) for pos, cards in snapshot.all_handcards.items()}
+    env.draw_card('first')
+    assert env.all_handcards != frozen
+    assert snapshot.all_handcards == frozen
+    assert len(snapshot.hand) == len(frozen['first'])
+
+
+def test_rlcard_agent_works_on_a_snapshot():
+    pytest.importorskip('rlcard')
+    from douzero.evaluation.rlcard_agent import RLCardAgent
+
+    env = _started_env()
+    infoset = _engine_infoset(env)
+    # 交给智能体原始的信息集，它原地改写的只是自己的快照
+    action = RLCardAgent('first').act(infoset)
+    assert action in infoset.legal_actions
+    assert infoset.last_move == [3]
+    assert infoset.last_two_moves == [[1, 2], [3]]
+    assert RLCardAgent('first').act(infoset.view()) in infoset.legal_actions
@@ -0,0 +1,82 @@
+"""
+LstmModel.forward_shared 和把上下文复制到每个动作再调用 forward 的结果一致，
+DeepAgent 两种观测方式选出同样的动作。
+"""
+import random
+import types
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from douzero.dmc.models import model_dict
+from douzero.env.env import ObservationBuilder
+from douzero.evaluation.deep_agent import DeepAgent
+
+LANDLORD_POSITIONS = ('landlord', 'landlord_up', 'landlord_down')
+LANDLORD_CARDS = [3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 17] * 4 + [20, 30]
+
+
+def _infoset(rng, position):
+    def cards(num_cards):
+        return sorted(rng.sample(LANDLORD_CARDS, num_cards))
+    return types.SimpleNamespace(
+        player_position=position,
+        player_hand_cards=cards(17),
+        other_hand_cards=cards(20),
+        last_move=cards(2),
+        played_cards={p: cards(rng.randint(0, 8)) for p in LANDLORD_POSITIONS},
+        num_cards_left_dict={'landlord': rng.randint(1, 20),
+                             'landlord_up': rng.randint(1, 17),
+                             'landlord_down': rng.randint(1, 17)},
+        bomb_num=rng.randint(0, 3),
+        last_move_dict={p: cards(rng.randint(0, 4)) for p in LANDLORD_POSITIONS},
+        legal_actions=[cards(rng.randint(1, 4)) for _ in range(40)],
+        card_play_action_seq=[cards(rng.randint(0, 4)) for _ in range(20)],
+        all_handcards={})
+
+
+def _observations(infoset):
+    obs = ObservationBuilder()(infoset)
+    shared = ObservationBuilder(shared_context=True)(infoset)
+    return ({key: torch.from_numpy(np.array(obs[key])).float()
+             for key in ('x_batch', 'z_batch')},
+            {key: torch.from_numpy(np.array(shared[key])).float()
+             for key in ('z', 'x_no_action', 'action_batch')})
+
+
+@pytest.mark.parametrize('position', ['landlord', 'landlord_up'])
+def test_forward_shared_matches_forward(position):
+    torch.manual_seed(0)
+    model = model_dict[position]().eval()
+    rng = random.Random(0)
+    for _ in range(5):
+        obs, shared = _observations(_infoset(rng, position))
+        z, x_no_action, actions = shared['z'], shared['x_no_action'], shared['action_batch']
+        num_actions = actions.shape[0]
+        with torch.no_grad():
+            values = model.forward_shared(z, x_no_action, actions, return_value=True)['values']
+            expanded = model.forward(z.expand(num_actions, *z.shape),
+                                     torch.cat([x_no_action.expand(num_actions, -1), actions], dim=1),
+                                     return_value=True)['values']
+            batched = model.forward(obs['z_batch'], obs['x_batch'], return_value=True)['values']
+            action = model.forward_shared(z, x_no_action, actions)['action']
+        assert values.shape == (num_actions, 1)
+        assert torch.allclose(values, expanded, atol=1e-5)
+        assert torch.allclose(values, batched, atol=1e-5)
+        assert int(action) == int(torch.argmax(expanded, dim=0)[0])
+
+
+@pytest.mark.parametrize('position', ['landlord', 'landlord_up'])
+def test_deep_agent_acts_the_same_in_both_modes(position, tmp_path):
+    torch.manual_seed(1)
+    model_path = str(tmp_path / 'model.ckpt')
+    torch.save(model_dict[position]().state_dict(), model_path)
+    agent = DeepAgent(position, model_path)
+    shared_agent = DeepAgent(position, model_path, shared_context=True)
+    assert not agent.obs_builder.shared_context
+    rng = random.Random(1)
+    for _ in range(5):
+        infoset = _infoset(rng, position)
+        assert agent.act(infoset) == shared_agent.act(infoset)
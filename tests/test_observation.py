@@ -0,0 +1,146 @@
+"""
+get_obs 和 ObservationBuilder 按注册的特征集合编码观测：旧的三人座位和旧版编码
+(legacy_observation.py)一致，四人座位的动作宽度、历史出牌形状和编码都来自它们自己的特征集合。
+"""
+import random
+import types
+
+import numpy as np
+
+from douzero.env.cards import HandCards, NUM_CARD_CODES
+from douzero.env.env import ObservationBuilder, get_obs
+from douzero.env.features import get_feature_set
+from douzero.env.game import GameEnv, POSITIONS
+
+import legacy_observation
+from auto_games import new_env, play
+
+LANDLORD_POSITIONS = ('landlord', 'landlord_up', 'landlord_down')
+LANDLORD_CARDS = [3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 17] * 4 + [20, 30]
+
+
+def _landlord_infoset(rng, position, action_seq):
+    def cards(num_cards):
+        return sorted(rng.sample(LANDLORD_CARDS, num_cards))
+    return types.SimpleNamespace(
+        player_position=position,
+        player_hand_cards=cards(10),
+        other_hand_cards=cards(20),
+        last_move=cards(2),
+        played_cards={p: cards(rng.randint(0, 8)) for p in LANDLORD_POSITIONS},
+        num_cards_left_dict={'landlord': rng.randint(1, 20),
+                             'landlord_up': rng.randint(1, 17),
+                             'landlord_down': rng.randint(1, 17)},
+        bomb_num=rng.randint(0, 14),
+        last_move_dict={p: cards(rng.randint(0, 4)) for p in LANDLORD_POSITIONS},
+        legal_actions=[cards(rng.randint(0, 5)) for _ in range(rng.randint(1, 300))],
+        card_play_action_seq=action_seq)
+
+
+def test_landlord_observations_match_get_obs():
+    rng = random.Random(0)
+    builder = ObservationBuilder(max_legal_actions=4)
+    shared_builder = ObservationBuilder(max_legal_actions=4, shared_context=True)
+    action_seq = []
+    for _ in range(100):
+        action_seq.append(sorted(rng.sample(LANDLORD_CARDS, rng.randint(0, 4))))
+        infoset = _landlord_infoset(rng, rng.choice(LANDLORD_POSITIONS), action_seq)
+        expected = legacy_observation.get_obs(infoset)
+        for obs in (get_obs(infoset), builder(infoset)):
+            assert obs['position'] == expected['position']
+            for key in ('x_batch', 'z_batch', 'x_no_action', 'z'):
+                assert obs[key].dtype == expected[key].dtype
+                assert np.array_equal(obs[key], expected[key])
+        shared_obs = shared_builder(infoset)
+        width = get_feature_set(infoset.player_position).width
+        assert np.array_equal(shared_obs['action_batch'], expected['x_batch'][:, width:])
+
+
+def _seat_infoset(position, legal_actions, action_seq):
+    env = GameEnv({}, seed=0)
+    codes = list(range(28))
+    for i, pos in enumerate(POSITIONS):
+        env.info_sets[pos].hand = HandCards(codes[i * 7:(i + 1) * 7])
+        env._hand_changed(pos)
+    env._rebuild_hand_views()
+    return types.SimpleNamespace(
+        player_position=position,
+        hand=env.info_sets[position].hand,
+        other_hand_cards=env._other_hand_cards[position],
+        played_cards={pos: [] for pos in POSITIONS},
+        last_move_dict={pos: [] for pos in POSITIONS},
+        num_cards_left_dict=env.num_cards_left_dict,
+        legal_actions=legal_actions,
+        card_play_action_seq=action_seq)
+
+
+def test_four_seat_observations_use_their_feature_set():
+    legal_actions = [[0], [5], [36], [37]]
+    action_seq = [[code] for code in range(10)]
+    for shared_context in (False, True):
+        builder = ObservationBuilder(shared_context=shared_context)
+        for position in POSITIONS:
+            feature_set = get_feature_set(position)
+            obs = builder(_seat_infoset(position, legal_actions, action_seq))
+            assert obs['x_no_action'].shape == feature_set.shape
+            assert obs['z'].shape == feature_set.z_shape
+            if shared_context:
+                actions = obs['action_batch']
+            else:
+                assert obs['x_batch'].shape == feature_set.batch_shape(len(legal_actions))
+                assert obs['z_batch'].shape == (len(legal_actions),) + feature_set.z_shape
+                actions = obs['x_batch'][:, feature_set.width:]
+            # 每个动作是它的牌的计数向量
+            assert actions.shape == (len(legal_actions), NUM_CARD_CODES)
+            assert np.array_equal(actions, np.eye(NUM_CARD_CODES)[[0, 5, 36, 37]])
+            # 最近16步，每行一轮4步，前面不足的补零
+            assert np.array_equal(obs['z'].reshape(-1, NUM_CARD_CODES)[6:],
+                                  np.eye(NUM_CARD_CODES)[:10])
+            assert not obs['z'].reshape(-1, NUM_CARD_CODES)[:6].any()
+
+            specs = feature_set.buffer_specs(8)
+            assert specs['obs_action']['size'] == (8, NUM_CARD_CODES)
+            assert specs['obs_z']['size'] == (8,) + obs['z'].shape
+
+
+def test_four_seat_observations_follow_the_played_cards():
+    env = new_env(0)
+    steps = play(env, 0)
+    next(steps)
+    # 四个座位都出过牌之后再多走几步
+    while not all(env.played_cards.values()):
+        next(steps)
+    for _ in range(6):
+        next(steps)
+    assert len(env.card_play_action_seq) == sum(map(len, env.played_cards.values()))
+
+    builder = ObservationBuilder()
+    for position in POSITIONS:
+        env._rebuild_hand_views()
+        infoset = types.SimpleNamespace(
+            player_position=position,
+            hand=env.info_sets[position].hand,
+            other_hand_cards=env._other_hand_cards[position],
+            played_cards=env.played_cards,
+            last_move_dict=env.last_move_dict,
+            num_cards_left_dict=env.num_cards_left_dict,
+            legal_actions=[[code] for code in env.info_sets[position].hand.codes().tolist()],
+            card_play_action_seq=env.card_play_action_seq)
+        obs = builder(infoset)
+        feature_set = get_feature_set(position)
+        index = POSITIONS.index(position)
+        others = (POSITIONS[(index - 1) % 4], POSITIONS[(index + 2) % 4],
+                  POSITIONS[(index + 1) % 4])
+        for relation, other in zip(('up', 'across', 'down'), others):
+            played = obs['x_no_action'][feature_set.offsets[relation + '_played_cards']]
+            last_move = obs['x_no_action'][feature_set.offsets[relation + '_last_move']]
+            assert played.sum() == len(env.played_cards[other]) > 0
+            assert np.array_equal(played, np.bincount(env.played_cards[other],
+                                                      minlength=NUM_CARD_CODES))
+            assert np.array_equal(last_move, np.eye(NUM_CARD_CODES)[env.last_move_dict[other][0]])
+        # 历史出牌是最近16步打出的牌，前面不足的补零
+        moves = [move[0] for move in env.card_play_action_seq[-16:]]
+        expected = np.zeros((16, NUM_CARD_CODES))
+        expected[16 - len(moves):] = np.eye(NUM_CARD_CODES)[moves]
+        assert np.array_equal(obs['z'].reshape(-1, NUM_CARD_CODES), expected)
+        assert obs['z'].any()
@@ -0,0 +1,61 @@
+"""
+score_detector 的最小负分和旧版 get_negative_score(枚举所有牌型组合)逐个比较。
+"""
+import random
+
+from douzero.env.cards import CODE2CARD, DECK, JOKER, QUESTION_MARK, NUM_NORMAL_CARDS
+from douzero.env.score_detector import get_negative_score
+
+import legacy_detectors
+
+
+def _random_hand(rng, points, num_jokers):
+    """从给定点数的牌里抽7张，点数少时更容易组成牌型"""
+    codes = [code for code in DECK.tolist()
+             if code < NUM_NORMAL_CARDS and CODE2CARD[code][0] in points]
+    hand = rng.sample(codes, 7 - num_jokers)
+    hand += [rng.choice((JOKER, QUESTION_MARK)) for _ in range(num_jokers)]
+    rng.shuffle(hand)
+    return [CODE2CARD[code] for code in hand]
+
+
+def _assert_same(hand):
+    assert get_negative_score(hand) == legacy_detectors.get_negative_score(hand), hand
+
+
+def test_hands_without_jokers():
+    rng = random.Random(0)
+    for _ in range(5000):
+        low = rng.randrange(6, 14)
+        points = range(low, min(low + rng.randrange(2, 5), 15))
+        _assert_same(_random_hand(rng, points, 0))
+
+
+def test_hands_with_one_joker():
+    rng = random.Random(1)
+    for _ in range(1000):
+        low = rng.randrange(6, 13)
+        _assert_same(_random_hand(rng, range(low, low + 3), 1))
+
+
+def test_hands_with_two_jokers():
+    rng = random.Random(2)
+    for _ in range(100):
+        low = rng.randrange(6, 12)
+        _assert_same(_random_hand(rng, range(low, low + 4), 2))
+
+
+def test_hands_with_three_jokers():
+    # 旧版把每个癞子替换成36种牌，3个癞子每手要半秒以上
+    rng = random.Random(3)
+    for _ in range(20):
+        low = rng.randrange(6, 12)
+        _assert_same(_random_hand(rng, range(low, low + 4), 3))
+
+
+def test_hands_with_four_jokers():
+    # 旧版4个癞子每手要几秒，只比较几手
+    rng = random.Random(4)
+    for _ in range(4):
+        low = rng.randrange(6, 13)
+        _assert_same(_random_hand(rng, range(low, low + 3), 4))